@@ -1,99 +1,136 @@
+import os
+
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-import yfinance as yf
 import pandas as pd
 import numpy as np
-from scipy.optimize import minimize
+
+from alinhamento import POLITICAS, alinhar
+from armazenamento import ArmazemPrecos
+from backtest import backtest_walk_forward
+from cache import memorizar
+from graficos import decimar, mostrar_grafico
+from ibovespa import obter_empresas_ibovespa
+from instrumentacao import PORTA_METRICAS, etapa, exportar_json, mostrar_diagnostico, servir_prometheus, texto_prometheus
+from otimizacao import fronteira_eficiente, maximizar_sharpe, simular_carteiras_aleatorias
+from painel import chave_painel, obter_painel
+from precos import baixar_precos
+from selecao import melhores_k
+from servidor import MODO_SERVIDOR, obter_snapshot, snapshot_compartilhado, versao_dados
+from simulacao import simular_carteira
+
+# Armazém local de preços: as consultas repetidas são lidas do disco
+ARMAZEM = ArmazemPrecos()
+
+# Validade (em segundos) dos resultados guardados em cache entre reruns e sessões
+TTL_CACHE = 60 * 60
+
+# Endpoint Prometheus com as métricas do processo, se CN1_PORTA_METRICAS estiver definida
+if PORTA_METRICAS:
+    servir_prometheus(PORTA_METRICAS)
 
 def obter_lista_acoes_ibovespa():
-    # URL da página da Wikipedia
-    url = "https://pt.wikipedia.org/wiki/Lista_de_companhias_citadas_no_Ibovespa"
-
-    # Fazendo a requisição para obter o conteúdo da página
-    response = requests.get(url)
-
-    # Verificando se a requisição foi bem-sucedida
-    if response.status_code == 200:
-        # Criando o objeto BeautifulSoup
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        # Encontrando a tabela que contém a lista de ações
-        table = soup.find("table", {"class": "wikitable sortable"})
-
-        # Verificando se a tabela foi encontrada
-        if table:
-            # Iterando pelas linhas da tabela para obter os nomes das ações
-            companies = []
-            for row in table.find_all("tr")[1:]:
-                cells = row.find_all("td")
-                if len(cells) >= 2:  # Verifica se há pelo menos duas células na linha
-                    nome_acao = cells[0].text.strip()  # Obtém o nome da ação
-                    companies.append(nome_acao)
-            return companies
-        else:
-            st.error("Tabela não encontrada.")
-            return None
-    else:
-        st.error("Erro ao acessar a página.")
+    # No modo servidor, a lista vem do snapshot publicado pelo atualizador (a sessão não acessa a rede)
+    snapshot = snapshot_compartilhado(start_date, end_date) if MODO_SERVIDOR else None
+    if snapshot is not None:
+        return list(snapshot.empresas)
+    # A lista vem do serviço compartilhado (memória -> snapshot em disco -> Wikipedia)
+    try:
+        return obter_empresas_ibovespa()
+    except Exception as e:
+        st.error(f"Erro ao obter a lista de ações: {str(e)}")
         return None
 
 def get_adj_close_prices(tickers, start_date, end_date):
-    # Cria um DataFrame vazio para armazenar os preços ajustados de fechamento
-    df_prices = pd.DataFrame()
-
-    # Itera sobre os tickers para obter os preços de cada empresa
-    for ticker in tickers:
-        # Obtém os dados do ticker no intervalo de datas especificado
-        data = yf.download(ticker + ".SA", start=start_date, end=end_date)
-        # Adiciona os preços ajustados de fechamento ao DataFrame
-        df_prices[ticker] = data["Adj Close"]
-
-    return df_prices
-
-def calculate_sharpe_ratio(df_prices, weights):
-    if isinstance(weights, list):
-        weights = np.array(weights)
-    # Calcula os retornos diários das ações
-    daily_returns = df_prices.pct_change()
-
-    # Calcula o retorno anualizado médio das ações
-    annual_returns = daily_returns.mean() * 252  # 252 dias úteis em um ano
-
-    # Calcula a matriz de covariância dos retornos diários das ações
-    cov_matrix = daily_returns.cov()
-
-    # Calcula o retorno e a volatilidade da carteira
-    portfolio_return = np.dot(annual_returns, weights)
-    portfolio_std_dev = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights))) * np.sqrt(252)
-
-    # Define a taxa livre de risco (geralmente usa-se a taxa de juros de títulos do governo)
-    risk_free_rate = 0.05  # Exemplo: 5% ao ano
-
-    # Calcula o índice de Sharpe
-    sharpe_ratio = (portfolio_return - risk_free_rate) / portfolio_std_dev
-
-    return sharpe_ratio
-
-def maximize_sharpe_ratio(df_prices):
-    # Função objetivo a ser minimizada
-    def negative_sharpe_ratio(weights):
-        return -calculate_sharpe_ratio(df_prices, weights)
-
-    # Restrição: a soma dos pesos deve ser igual a 1
-    constraints = ({'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1})
-
-    # Limites dos pesos (0 <= peso <= 1)
-    bounds = [(0, 1) for _ in range(len(df_prices.columns))]
-
-    # Chute inicial para os pesos
-    initial_guess = np.ones(len(df_prices.columns)) / len(df_prices.columns)
-
-    # Minimiza a função objetivo negativa para maximizar o índice de Sharpe
-    result = minimize(negative_sharpe_ratio, initial_guess, method='SLSQP', bounds=bounds, constraints=constraints)
-
-    # Retorna os pesos ótimos que maximizam o índice de Sharpe
-    return result.x
+    # Baixa os preços ajustados de fechamento em lotes concorrentes e monta o DataFrame de uma só vez
+    # Os lotes são lidos do armazém local, que só busca na rede os intervalos faltantes
+    df_prices, relatorio = baixar_precos(tickers, start_date, end_date, fonte=ARMAZEM.como_fonte("Adj Close"))
+
+    return df_prices, relatorio
+
+# Versão dos dados publicados pelo atualizador (modo servidor, ver servidor.py); entra na chave dos caches
+# abaixo, para que uma versão nova dos dados refaça as análises
+def versao_compartilhada():
+    return versao_dados(start_date, end_date)
+
+# Etapas pesadas da análise, memorizadas por (tickers, datas, parâmetros):
+# mexer em um widget não refaz o download nem a otimização, e usuários simultâneos
+# pedindo a mesma análise disparam um único cálculo
+# Os preços ficam em um painel float32 mapeado em memória a partir do disco: sessões e processos
+# do servidor compartilham uma única cópia, e o DataFrame devolvido é só uma visão sobre ela
+@memorizar(max_itens=8, ttl=TTL_CACHE, versao=versao_compartilhada)
+def carregar_precos(tickers, start_date, end_date):
+    # No modo servidor, a janela mantida pelo atualizador é lida do snapshot publicado
+    snapshot = obter_snapshot(start_date, end_date) if MODO_SERVIDOR else None
+    if snapshot is not None and snapshot.cobre(tickers):
+        return snapshot.precos(tickers), []
+
+    relatorio = []
+
+    def construir():
+        df_prices, relatorio_download = get_adj_close_prices(list(tickers), start_date, end_date)
+        relatorio.extend(relatorio_download)
+        return df_prices
+
+    # Janelas que chegam até hoje ganham um painel novo a cada dia
+    hoje = pd.Timestamp.today().normalize()
+    versao = hoje.date() if pd.Timestamp(end_date) >= hoje else None
+    # Painel com tickers que falharam no download não é gravado: a próxima execução tenta baixá-los de novo
+    painel = obter_painel(chave_painel(tickers, start_date, end_date, versao), construir,
+                          completo=lambda: not any(lote["falhas"] for lote in relatorio))
+    return painel.como_dataframe(), relatorio
+
+# Painel alinhado (calendário comum, lacunas e tickers sem dados tratados pela política escolhida):
+# a limpeza é feita uma vez, e otimização, fronteira, backtest e simulação usam os mesmos arrays
+@memorizar(max_itens=8, ttl=TTL_CACHE, versao=versao_compartilhada)
+def alinhar_precos(tickers, start_date, end_date, politica="preencher"):
+    df_prices, _ = carregar_precos(tickers, start_date, end_date)
+    return alinhar(df_prices, **POLITICAS[politica])
+
+@memorizar(max_itens=8, ttl=TTL_CACHE, versao=versao_compartilhada)
+def otimizar_carteira(tickers, start_date, end_date, estimador="amostral", politica="preencher"):
+    estatisticas = alinhar_precos(tickers, start_date, end_date, politica).estatisticas(estimador)
+    optimal_weights = maximizar_sharpe(estatisticas)
+    return estatisticas, optimal_weights, estatisticas.sharpe(optimal_weights)
+
+# Carteira ótima com exatamente k ações (seleção com cardinalidade, ver selecao.py), partindo das mesmas
+# estatísticas da otimização completa; sem limite de peso por ação, a otimização completa já é a relaxação
+@memorizar(max_itens=16, ttl=TTL_CACHE, versao=versao_compartilhada)
+def selecionar_melhores(tickers, start_date, end_date, k, peso_minimo, peso_maximo, estimador="amostral",
+                        politica="preencher"):
+    estatisticas, optimal_weights, _ = otimizar_carteira(tickers, start_date, end_date, estimador, politica)
+    return melhores_k(estatisticas, k, peso_minimo, peso_maximo,
+                      pesos_relaxados=optimal_weights if peso_maximo >= 1 else None, processos=os.cpu_count())
+
+@memorizar(max_itens=16, ttl=TTL_CACHE, versao=versao_compartilhada)
+def analisar_fronteira(tickers, start_date, end_date, num_carteiras, estimador="amostral", politica="preencher"):
+    estatisticas, _, _ = otimizar_carteira(tickers, start_date, end_date, estimador, politica)
+    retornos_mc, volatilidades_mc, sharpes_mc, _ = simular_carteiras_aleatorias(estatisticas, num_carteiras, semente=0)
+    retornos_fe, volatilidades_fe, _ = fronteira_eficiente(estatisticas)
+
+    # Só uma amostra das carteiras aleatórias vai para o gráfico
+    amostra = np.random.default_rng(0).choice(len(retornos_mc), size=min(2000, len(retornos_mc)), replace=False)
+    df_grafico = pd.concat([
+        pd.DataFrame({"Volatilidade": volatilidades_mc[amostra], "Retorno": retornos_mc[amostra], "Série": "Aleatórias"}),
+        pd.DataFrame({"Volatilidade": volatilidades_fe, "Retorno": retornos_fe, "Série": "Fronteira eficiente"}),
+    ])
+    return df_grafico, sharpes_mc.max()
+
+@memorizar(max_itens=16, ttl=TTL_CACHE, versao=versao_compartilhada)
+def rodar_backtest(tickers, start_date, end_date, janela_estimacao, passo, custo_transacao, estimador="amostral",
+                   politica="preencher"):
+    df_prices = alinhar_precos(tickers, start_date, end_date, politica).precos
+    return backtest_walk_forward(df_prices, janela_estimacao, passo, custo_transacao, estimador=estimador,
+                                 processos=os.cpu_count())
+
+# Simulação Monte Carlo do valor da carteira ótima, para um investimento de 1
+# (o valor investido só escala o resultado, então não entra na chave do cache)
+@memorizar(max_itens=16, ttl=TTL_CACHE, versao=versao_compartilhada)
+def simular_carteira_otima(tickers, start_date, end_date, horizonte, num_caminhos, metodo, estimador="amostral",
+                           politica="preencher"):
+    alinhado = alinhar_precos(tickers, start_date, end_date, politica)
+    estatisticas, optimal_weights, _ = otimizar_carteira(tickers, start_date, end_date, estimador, politica)
+    return simular_carteira(optimal_weights, estatisticas, horizonte, num_caminhos, metodo,
+                            retornos_historicos=alinhado.retornos, semente=0)
 
 # Função para calcular o lucro com base no índice de Sharpe e no valor investido
 def calculate_profit(investment_amount, sharpe_ratio):
@@ -103,26 +140,49 @@ def calculate_profit(investment_amount, sharpe_ratio):
 start_date = "2022-01-01"
 end_date = "2022-12-31"
 
+# Cada etapa da página é cronometrada (instrumentacao.py); as etapas internas (lotes de download,
+# SLSQP, simplex) e os contadores aparecem no painel de diagnóstico
 # Obtém a lista de ações da Ibovespa
-tickers_ibovespa = obter_lista_acoes_ibovespa()
+with etapa("pagina.lista_ibovespa"):
+    tickers_ibovespa = obter_lista_acoes_ibovespa()
 
 # Verifica se a lista de ações foi obtida com sucesso
 if tickers_ibovespa is not None:
-    # Obtém os preços ajustados de fechamento das empresas
-    df_adj_close_prices = get_adj_close_prices(tickers_ibovespa, start_date, end_date)
+    tickers = tuple(tickers_ibovespa)
 
-    # Calcula os pesos ótimos que maximizam o índice de Sharpe da carteira
-    optimal_weights = maximize_sharpe_ratio(df_adj_close_prices)
+    # Modo servidor: versão e idade dos dados compartilhados em uso
+    snapshot = obter_snapshot(start_date, end_date) if MODO_SERVIDOR else None
+    if snapshot is not None:
+        st.sidebar.caption(f"Dados compartilhados: versão {snapshot.versao}, publicada há {snapshot.idade / 60:.0f} min")
+
+    # Obtém os preços ajustados de fechamento das empresas (do cache, após a primeira execução)
+    with etapa("pagina.precos"):
+        df_adj_close_prices, relatorio_download = carregar_precos(tickers, start_date, end_date)
 
-    # Calcula o índice de Sharpe da carteira com os pesos ótimos
-    sharpe_ratio_optimal = calculate_sharpe_ratio(df_adj_close_prices, optimal_weights)
+    # Estimador da matriz de covariância dos retornos (a amostral fica mal condicionada
+    # quando o número de ações se aproxima do número de pregões)
+    estimador = st.sidebar.selectbox("Estimador de covariância:", ["amostral", "ledoit_wolf", "ewma", "fatores"])
+
+    # Tratamento de dados faltantes (históricos curtos, suspensões, tickers sem dados; ver alinhamento.POLITICAS)
+    politica = st.sidebar.selectbox("Dados faltantes:", list(POLITICAS))
+    with etapa("pagina.alinhamento"):
+        alinhado = alinhar_precos(tickers, start_date, end_date, politica)
+
+    # Calcula os pesos ótimos que maximizam o índice de Sharpe da carteira
+    # e o índice de Sharpe da carteira com esses pesos
+    with etapa("pagina.otimizacao"):
+        _, optimal_weights, sharpe_ratio_optimal = otimizar_carteira(tickers, start_date, end_date, estimador,
+                                                                     politica)
 
     # Classifica as ações com base nos pesos ótimos
-    df_weights = pd.DataFrame({"Ação": df_adj_close_prices.columns, "Peso Ótimo": optimal_weights})
+    df_weights = pd.DataFrame({"Ação": alinhado.tickers, "Peso Ótimo": optimal_weights})
     df_weights_sorted = df_weights.sort_values(by="Peso Ótimo", ascending=False)
 
-    # Obtém as 3 melhores opções de ações
-    top_3_actions = df_weights_sorted.head(3)["Ação"].tolist()
+    # Número de ações da carteira sugerida e limites de peso de cada uma
+    num_acoes = st.sidebar.number_input("Número de ações da carteira sugerida:", min_value=1,
+                                        max_value=len(alinhado.tickers), value=3)
+    peso_minimo = st.sidebar.slider("Peso mínimo por ação (%):", 0, 100, 0) / 100
+    peso_maximo = st.sidebar.slider("Peso máximo por ação (%):", 1, 100, 100) / 100
 
     # Interface do Streamlit
     st.title("Análise de Carteira de Ações - Ibovespa")
@@ -130,14 +190,65 @@ if tickers_ibovespa is not None:
     st.write(tickers_ibovespa)
     st.subheader("Preços ajustados de fechamento das empresas:")
     st.write(df_adj_close_prices)
+    with st.expander("Tempo de download por lote"):
+        st.write(pd.DataFrame(relatorio_download))
+    if alinhado.descartados:
+        st.warning(f"Ações descartadas por falta de dados: {', '.join(alinhado.descartados)}")
+    with st.expander("Cobertura dos dados por ação"):
+        st.write(alinhado.cobertura)
     st.subheader("Pesos ótimos para maximizar o índice de Sharpe:")
     st.write(optimal_weights)
     st.subheader("Índice de Sharpe da carteira com pesos ótimos:")
     st.write(sharpe_ratio_optimal)
 
-    # Sugere as 3 melhores opções de ações
-    st.subheader("As 3 melhores opções de ações com base nos pesos ótimos:")
-    st.write(top_3_actions)
+    # Fronteira eficiente e carteiras aleatórias (Monte Carlo), avaliadas em lote
+    if st.checkbox("Mostrar fronteira eficiente e carteiras aleatórias"):
+        num_carteiras = st.number_input("Número de carteiras aleatórias:", min_value=1000, value=100000, step=10000)
+        with etapa("pagina.fronteira"):
+            df_grafico, melhor_sharpe_mc = analisar_fronteira(tickers, start_date, end_date, int(num_carteiras),
+                                                              estimador, politica)
+        st.subheader("Fronteira eficiente:")
+        st.scatter_chart(df_grafico, x="Volatilidade", y="Retorno", color="Série")
+        st.write(f"Maior índice de Sharpe entre as carteiras aleatórias: {melhor_sharpe_mc:.4f}")
+
+    # Backtest walk-forward: reotimiza a carteira em janelas móveis e mede o desempenho realizado
+    if st.checkbox("Mostrar backtest walk-forward"):
+        inicio_backtest = st.date_input("Início do histórico do backtest:", value=pd.Timestamp("2018-01-01"))
+        janela_estimacao = st.slider("Janela de estimação (pregões):", 63, 504, 252, step=21)
+        passo = st.slider("Rebalancear a cada (pregões):", 5, 126, 21)
+        custo_transacao = st.number_input("Custo de transação (% do valor negociado):", min_value=0.0, value=0.1, step=0.05) / 100
+        try:
+            with etapa("pagina.backtest"):
+                resultado = rodar_backtest(tickers, str(inicio_backtest), end_date, janela_estimacao, passo,
+                                           custo_transacao, estimador, politica)
+        except ValueError as e:
+            st.warning(str(e))
+        else:
+            st.subheader("Patrimônio (investimento inicial = 1):")
+            mostrar_grafico(st, resultado.patrimonio.rename("Carteira"), rotulo_y="Patrimônio")
+            st.subheader("Drawdown:")
+            # Mínimo-máximo preserva o pior drawdown de cada trecho no gráfico reduzido
+            st.area_chart(decimar(resultado.drawdown, metodo="minmax"))
+            st.subheader("Métricas realizadas:")
+            st.write(pd.Series(resultado.resumo(), name="Valor"))
+            with st.expander("Pesos e giro em cada rebalanceamento"):
+                st.write(resultado.pesos.assign(Giro=resultado.giro))
+
+    # Sugere as melhores opções de ações: a carteira de Sharpe máximo com exatamente num_acoes ações
+    # (e não as maiores posições da carteira completa, que em geral não formam a melhor combinação)
+    st.subheader(f"As {num_acoes} melhores opções de ações (carteira ótima com {num_acoes} ações):")
+    try:
+        with etapa("pagina.melhores_k"):
+            selecao = selecionar_melhores(tickers, start_date, end_date, num_acoes, peso_minimo, peso_maximo,
+                                          estimador, politica)
+    except ValueError as e:
+        st.warning(str(e))
+    else:
+        st.write(selecao.tabela())
+        st.write(f"Índice de Sharpe: {selecao.sharpe:.4f} "
+                 + ("(ótimo provado)" if selecao.exato else f"(gap de otimalidade: {selecao.gap:.2%})"))
+        with st.expander("Detalhes da busca"):
+            st.write(pd.Series(selecao.resumo(), name="Valor"))
 
     # Mostra as ações nas quais o dinheiro foi investido com base nos pesos ótimos
     st.subheader("Ações nas quais o dinheiro foi investido:")
@@ -153,5 +264,30 @@ if tickers_ibovespa is not None:
         profit = calculate_profit(investment_amount, sharpe_ratio_optimal)
         st.subheader("Lucro estimado com base no índice de Sharpe:")
         st.write(profit)
+
+        # Distribuição simulada do valor da carteira ótima ao fim do horizonte
+        if st.checkbox("Simular a distribuição do valor da carteira (Monte Carlo)"):
+            horizonte = st.slider("Horizonte (pregões):", 21, 756, 252, step=21)
+            num_caminhos = st.number_input("Número de caminhos:", min_value=1000, value=100000, step=10000)
+            metodo = st.selectbox("Método:", ["cholesky", "bootstrap"])
+            with etapa("pagina.simulacao"):
+                simulacao = simular_carteira_otima(tickers, start_date, end_date, horizonte, int(num_caminhos),
+                                                   metodo, estimador, politica)
+
+            resumo = {nome: valor * investment_amount if nome != "Probabilidade de perda" else valor
+                      for nome, valor in simulacao.resumo().items()}
+            st.subheader("Valor simulado da carteira ao fim do horizonte:")
+            st.write(pd.Series(resumo, name="Valor"))
+
+            contagens, bordas = np.histogram(simulacao.valores_finais * investment_amount, bins=60)
+            st.bar_chart(pd.Series(contagens, index=np.round((bordas[:-1] + bordas[1:]) / 2, 2), name="Caminhos"))
+            st.line_chart(pd.DataFrame(simulacao.caminhos_amostra[:50].T * investment_amount))
     else:
         st.warning("Digite um valor válido para investimento.")
+
+# Painel opcional com as etapas cronometradas, contadores, caches e perfis (CN1_PERFIL liga o cProfile/tracemalloc)
+if st.sidebar.checkbox("Diagnóstico de desempenho"):
+    mostrar_diagnostico(st.sidebar)
+    st.sidebar.download_button("Baixar métricas (Prometheus)", texto_prometheus(), "metricas.prom")
+    if st.sidebar.button("Gravar métricas em JSON"):
+        st.sidebar.write(f"Métricas gravadas em {exportar_json()}")
@@ -1,111 +1,96 @@
 import numpy as np
+import pandas as pd
 import streamlit as st
 
-def simplex_method(c, A_eq, b_eq, A_ineq, b_ineq):
-    num_vars = len(c)
-    num_eq_constraints = len(b_eq)
-    num_ineq_constraints = len(b_ineq)
-    
-    # Adicionar variáveis de folga
-    if num_eq_constraints > 0:
-        A_eq = np.hstack([A_eq, np.eye(num_eq_constraints)])
-    if num_ineq_constraints > 0:
-        A_ineq = np.hstack([A_ineq, np.zeros((num_ineq_constraints, num_eq_constraints))])
-    if num_eq_constraints > 0 and num_ineq_constraints > 0:
-        A = np.vstack([A_eq, A_ineq])
-    elif num_eq_constraints > 0:
-        A = A_eq
-    else:
-        A = A_ineq
-
-    c = np.concatenate([c, np.zeros(num_eq_constraints)])
-    
-    # Montar a tabela inicial do Simplex
-    tableau = np.zeros((num_eq_constraints + num_ineq_constraints + 1, num_vars + num_eq_constraints + 1))
-    tableau[:-1, :-1] = A
-    tableau[:-1, -1] = np.concatenate([b_eq, b_ineq])
-    tableau[-1, :-1] = -c
-    
-    while True:
-        # Passo 1: Encontrar a coluna de entrada (variável entrando na base)
-        pivot_col = np.argmin(tableau[-1, :-1])
-        if tableau[-1, pivot_col] >= 0:
-            break  # Solução ótima encontrada
-        
-        # Passo 2: Encontrar a linha de saída (variável saindo da base)
-        ratios = np.divide(tableau[:-1, -1], tableau[:-1, pivot_col], 
-                           out=np.full_like(tableau[:-1, -1], np.inf), where=tableau[:-1, pivot_col]>0)
-        pivot_row = np.argmin(ratios)
-        
-        if np.isinf(ratios[pivot_row]):
-            raise Exception("Problema não tem solução limitada.")
-        
-        # Passo 3: Pivotear
-        pivot = tableau[pivot_row, pivot_col]
-        tableau[pivot_row, :] /= pivot
-        for r in range(len(tableau)):
-            if r != pivot_row:
-                tableau[r, :] -= tableau[r, pivot_col] * tableau[pivot_row, :]
-    
-    solution = np.zeros(num_vars)
-    for i in range(num_vars):
-        col = tableau[:, i]
-        if sum(col == 1) == 1 and sum(col) == 1:
-            row = np.where(col == 1)[0][0]
-            solution[i] = tableau[row, -1]
-    
-    max_profit = -tableau[-1, -1]
-    return solution, max_profit
+from cache import memorizar
 
 st.title("Simplex Method Solver")
 
-num_vars = st.number_input("Número de variáveis (n)", min_value=1, step=1)
-num_eq_constraints = st.number_input("Número de restrições de igualdade (m1)", min_value=0, step=1)
-num_ineq_constraints = st.number_input("Número de restrições de desigualdade (m2)", min_value=0, step=1)
+# Modo do solver: automático, tabela densa (problemas pequenos) ou simplex revisado (problemas grandes)
+modo = st.selectbox("Modo do solver", ["auto", "tableau", "revisado"])
+
+# Problemas grandes vêm de arquivo (lidos em blocos por modelo_lp); os pequenos podem ser digitados em tabelas
+origem = st.radio("Origem do problema", ["Arquivo (MPS, CSV ou NPZ)", "Digitar coeficientes"], horizontal=True)
+
+
+# Lê o modelo enviado uma vez por conteúdo: reruns e outras sessões reaproveitam o modelo já lido
+# (o leitor e o SciPy só são importados quando há arquivo: a página abre mais rápido)
+@memorizar(max_itens=4)
+def carregar_modelo(conteudo, nome, maximizar):
+    from modelo_lp import ler_modelo
+
+    return ler_modelo(conteudo, nome=nome, maximizar=maximizar)
+
+
+# Tabela editável de zeros (um único widget para a matriz inteira, em vez de um campo por coeficiente)
+# A chave inclui o formato: mudar as dimensões começa uma tabela nova
+def editar_tabela(nome, linhas, colunas):
+    df = pd.DataFrame(np.zeros((len(linhas), len(colunas))), index=linhas, columns=colunas)
+    return st.data_editor(df, key=f"{nome}_{len(linhas)}_{len(colunas)}").to_numpy(dtype=float)
 
-c = []
-A_eq = []
-b_eq = []
-A_ineq = []
-b_ineq = []
 
-if num_vars > 0:
+modelo = None
+if origem.startswith("Arquivo"):
+    arquivo = st.file_uploader("Modelo (.mps, .csv ou .npz; também compactado com gzip)",
+                               type=["mps", "csv", "npz", "gz"])
+    maximizar = st.radio("Objetivo (modelos em CSV)", ["Maximizar", "Minimizar"], horizontal=True) == "Maximizar"
+    st.caption("CSV de coordenadas: colunas linha, coluna, valor e sentido (opcional). A linha \"objetivo\" traz "
+               "os custos, a coluna \"lado_direito\" os lados direitos e as linhas \"inferior\"/\"superior\" "
+               "os limites das variáveis.")
+    st.caption("Restrições <=, >= e = com qualquer lado direito são aceitas (as que a origem não satisfaz "
+               "ganham variáveis artificiais). Toda variável precisa de limite inferior finito: variáveis livres "
+               "(limite -inf, como FR/MI no MPS) não são aceitas.")
+    if arquivo is None:
+        st.stop()
+    try:
+        modelo = carregar_modelo(arquivo.getvalue(), arquivo.name, maximizar)
+    except ValueError as e:
+        st.error(f"Não foi possível ler o modelo: {e}")
+        st.stop()
+    st.subheader("Resumo do modelo")
+    st.dataframe(pd.Series(modelo.resumo(), name="Valor").astype(str))
+else:
+    num_vars = st.number_input("Número de variáveis (n)", min_value=1, step=1)
+    num_eq_constraints = st.number_input("Número de restrições de igualdade (m1)", min_value=0, step=1)
+    num_ineq_constraints = st.number_input("Número de restrições de desigualdade (m2)", min_value=0, step=1)
+
+    variaveis = [f"x{i+1}" for i in range(num_vars)]
     st.subheader("Coeficientes de lucro")
-    for i in range(num_vars):
-        c.append(st.number_input(f"Lucro unitário da variável {i+1}", key=f"c{i}"))
-
-if num_eq_constraints > 0:
-    st.subheader("Matriz de coeficientes das restrições de igualdade")
-    for j in range(num_eq_constraints):
-        row = []
-        for i in range(num_vars):
-            row.append(st.number_input(f"Coeficiente de x{i+1} na restrição de igualdade {j+1}", key=f"A_eq{j}{i}"))
-        A_eq.append(row)
-    st.subheader("Vetor de constantes das restrições de igualdade")
-    for j in range(num_eq_constraints):
-        b_eq.append(st.number_input(f"Constante da restrição de igualdade {j+1}", key=f"b_eq{j}"))
-
-if num_ineq_constraints > 0:
-    st.subheader("Matriz de coeficientes das restrições de desigualdade")
-    for j in range(num_ineq_constraints):
-        row = []
-        for i in range(num_vars):
-            row.append(st.number_input(f"Coeficiente de x{i+1} na restrição de desigualdade {j+1}", key=f"A_ineq{j}{i}"))
-        A_ineq.append(row)
-    st.subheader("Vetor de constantes das restrições de desigualdade")
-    for j in range(num_ineq_constraints):
-        b_ineq.append(st.number_input(f"Constante da restrição de desigualdade {j+1}", key=f"b_ineq{j}"))
+    c = editar_tabela("c", ["Lucro unitário"], variaveis)[0]
+
+    A_eq, b_eq = np.empty((0, num_vars)), np.empty(0)
+    if num_eq_constraints > 0:
+        st.subheader("Restrições de igualdade (coeficientes e constante)")
+        tabela = editar_tabela("eq", [f"Igualdade {j+1}" for j in range(num_eq_constraints)], variaveis + ["Constante"])
+        A_eq, b_eq = tabela[:, :-1], tabela[:, -1]
+
+    A_ineq, b_ineq = np.empty((0, num_vars)), np.empty(0)
+    if num_ineq_constraints > 0:
+        st.subheader("Restrições de desigualdade (coeficientes e constante)")
+        tabela = editar_tabela("ineq", [f"Desigualdade {j+1}" for j in range(num_ineq_constraints)],
+                               variaveis + ["Constante"])
+        A_ineq, b_ineq = tabela[:, :-1], tabela[:, -1]
 
 if st.button("Resolver"):
-    c = np.array(c)
-    A_eq = np.array(A_eq) if num_eq_constraints > 0 else np.empty((0, num_vars))
-    b_eq = np.array(b_eq) if num_eq_constraints > 0 else np.empty(0)
-    A_ineq = np.array(A_ineq) if num_ineq_constraints > 0 else np.empty((0, num_vars))
-    b_ineq = np.array(b_ineq) if num_ineq_constraints > 0 else np.empty(0)
-    
-    solution, max_profit = simplex_method(c, A_eq, b_eq, A_ineq, b_ineq)
-    
-    st.subheader("Solução ótima")
-    for i in range(num_vars):
-        st.write(f"x{i+1}: {solution[i]:.2f}")
-    st.write(f"Lucro máximo: {max_profit}")
+    if modelo is not None:
+        try:
+            solucao = modelo.resolver(modo)
+        except Exception as e:
+            st.error(str(e))
+            st.stop()
+        resumo = solucao.resumo()
+        st.subheader("Solução ótima")
+        st.dataframe(pd.Series(resumo, name="Valor"))
+        st.write("Variáveis não nulas:")
+        st.dataframe(solucao.tabela(), hide_index=True)
+        completa = solucao.tabela(apenas_nao_nulas=False).to_csv(index=False)
+        st.download_button("Baixar a solução completa (CSV)", completa, file_name="solucao.csv", mime="text/csv")
+    else:
+        # O solver (e o SciPy) só é importado quando o usuário manda resolver: a página abre mais rápido
+        from simplex import simplex_method
+
+        solution, max_profit = simplex_method(c, A_eq, b_eq, A_ineq, b_ineq, modo=modo)
+
+        st.subheader("Solução ótima")
+        st.dataframe(pd.DataFrame({"Variável": variaveis, "Valor": solution}), hide_index=True)
+        st.write(f"Lucro máximo: {max_profit}")
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+from covariancia import covariancia_amostral
+from otimizacao import EstatisticasCarteira
+
+# Alinhamento do painel de preços (datas x tickers) antes das estatísticas: calendário comum de pregões,
+# política de preenchimento de lacunas e de descarte de tickers, e relatório de cobertura de cada ticker
+# O painel alinhado guarda os preços e os retornos diários em arrays contíguos, calculados uma única vez:
+# otimização, backtest e simulação usam os mesmos dados limpos, sem refazer a limpeza a cada chamada
+
+# Políticas de dados faltantes (parâmetros de alinhar):
+#   preencher: repete o último preço em lacunas de até 5 pregões (suspensões curtas viram retorno zero)
+#   periodo_comum: além disso, corta o calendário ao período em que todos os tickers mantidos têm preço
+#   par_a_par: não preenche nada; as estatísticas usam, para cada par, os dias em que os dois têm dados
+POLITICAS = {
+    "preencher": {"cobertura_minima": 0.8, "limite_preenchimento": 5, "periodo_comum": False},
+    "periodo_comum": {"cobertura_minima": 0.8, "limite_preenchimento": 5, "periodo_comum": True},
+    "par_a_par": {"cobertura_minima": 0.5, "limite_preenchimento": 0, "periodo_comum": False},
+}
+
+# Situação de cada ticker no relatório de cobertura
+INCLUIDO = "incluído"
+SEM_DADOS = "sem dados"
+COBERTURA_BAIXA = "cobertura baixa"
+
+
+# Primeira e última linha com preço de cada coluna da máscara (-1 nas colunas sem nenhum preço)
+def _extremos(validos):
+    num_dias = len(validos)
+    tem_dados = validos.any(axis=0)
+    primeira = np.where(tem_dados, validos.argmax(axis=0), -1)
+    ultima = np.where(tem_dados, num_dias - 1 - validos[::-1].argmax(axis=0), -1)
+    return primeira, ultima
+
+
+# Para cada dia e ticker, a linha do último preço válido até aquele dia (-1 se ainda não houve nenhum)
+# e a do próximo preço válido a partir dele (len(validos) se não houver mais nenhum)
+def _vizinhos_validos(validos):
+    num_dias = len(validos)
+    linhas = np.arange(num_dias)[:, None]
+    ultimo = np.maximum.accumulate(np.where(validos, linhas, -1), axis=0)
+    proximo = np.minimum.accumulate(np.where(validos, linhas, num_dias)[::-1], axis=0)[::-1]
+    return ultimo, proximo
+
+
+# Calendário comum: dias em que pelo menos fracao_pregao dos tickers já listados (entre o primeiro e o
+# último preço de cada um) têm preço; descarta feriados e datas com dados de poucos tickers
+def calendario_comum(validos, fracao_pregao=0.5):
+    primeira, ultima = _extremos(validos)
+    linhas = np.arange(len(validos))[:, None]
+    listados = ((linhas >= primeira) & (linhas <= ultima)).sum(axis=1)
+    com_preco = validos.sum(axis=1)
+    return (com_preco > 0) & (com_preco >= fracao_pregao * listados)
+
+
+# Estatísticas par a par dos retornos (dias x ativos, NaN onde falta dado), vetorizadas: média de cada
+# ativo, covariância e correlação de cada par nos dias em que os dois têm dados (iguais às de
+# DataFrame.mean(), cov() e corr()) e o número desses dias
+def estatisticas_pares(retornos):
+    retornos = np.asarray(retornos, dtype=np.float64)
+    mascara = ~np.isnan(retornos)
+    X = np.where(mascara, retornos, 0.0)
+    M = mascara.astype(np.float64)
+    sobreposicao = M.T @ M
+    covariancia = covariancia_amostral(retornos)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        medias = X.sum(axis=0) / np.diag(sobreposicao)
+        # Variância de cada ativo só nos dias em comum com o outro ativo do par
+        soma = X.T @ M
+        variancias = ((X * X).T @ M - soma * soma / sobreposicao) / (sobreposicao - 1)
+        correlacao = covariancia / np.sqrt(variancias * variancias.T)
+    return medias, covariancia, correlacao, sobreposicao.astype(np.int64)
+
+
+# Painel alinhado: preços no calendário comum (só os tickers mantidos), retornos diários em um array
+# float64 contíguo (dias - 1 x ativos) e o relatório de cobertura de todos os tickers recebidos
+class PainelAlinhado:
+    def __init__(self, precos, retornos, cobertura):
+        self.precos = precos
+        self.retornos = retornos
+        self.cobertura = cobertura
+
+    @property
+    def tickers(self):
+        return list(self.precos.columns)
+
+    @property
+    def datas(self):
+        return self.precos.index
+
+    @property
+    def descartados(self):
+        return self.cobertura.index[self.cobertura["Situação"] != INCLUIDO].tolist()
+
+    # Sem nenhum dado faltante: as estatísticas par a par coincidem com as de dias completos
+    @property
+    def completo(self):
+        return not np.isnan(self.retornos).any()
+
+    # Estatísticas da carteira direto dos retornos alinhados (sem voltar aos preços)
+    def estatisticas(self, estimador="amostral", **opcoes):
+        return EstatisticasCarteira.de_retornos(self.retornos, self.tickers, estimador, **opcoes)
+
+    def estatisticas_pares(self):
+        return estatisticas_pares(self.retornos)
+
+
+# Alinha o painel largo de preços (datas x tickers, como o de precos.baixar_precos):
+# 1. calendário comum de pregões (calendario_comum); preços não positivos contam como faltantes
+# 2. lacunas de até limite_preenchimento pregões dentro do histórico de cada ticker recebem o último preço
+#    (lacunas maiores ficam inteiras sem preço; antes do primeiro e depois do último preço nada é preenchido)
+# 3. tickers sem dados ou com menos de cobertura_minima dos pregões do calendário são descartados
+# 4. com periodo_comum=True, o calendário é cortado ao período em que todos os tickers mantidos estão listados
+#    (do primeiro preço mais tardio ao último preço mais cedo)
+def alinhar(df_prices, cobertura_minima=0.8, limite_preenchimento=5, periodo_comum=False, fracao_pregao=0.5):
+    tickers = list(df_prices.columns)
+    valores = df_prices.to_numpy(dtype=np.float64, copy=True)
+    with np.errstate(invalid="ignore"):
+        validos = np.isfinite(valores) & (valores > 0)
+    valores[~validos] = np.nan
+
+    pregoes = calendario_comum(validos, fracao_pregao)
+    calendario = df_prices.index[pregoes]
+    valores, validos = valores[pregoes], validos[pregoes]
+    num_dias = len(calendario)
+
+    primeira, ultima = _extremos(validos)
+    linhas = np.arange(num_dias)[:, None]
+    listado = (linhas >= primeira) & (linhas <= ultima)
+    ultimo, proximo = _vizinhos_validos(validos)
+    faltantes = listado & ~validos
+    lacuna = np.where(faltantes, proximo - ultimo - 1, 0)
+    maior_lacuna = lacuna.max(axis=0, initial=0)
+
+    preencher = faltantes & (lacuna <= limite_preenchimento)
+    if preencher.any():
+        valores[preencher] = np.take_along_axis(valores, np.maximum(ultimo, 0), axis=0)[preencher]
+
+    dias_com_preco = validos.sum(axis=0)
+    cobertura = dias_com_preco / num_dias if num_dias else np.zeros(len(tickers))
+    situacao = np.where(dias_com_preco == 0, SEM_DADOS,
+                        np.where(cobertura < cobertura_minima, COBERTURA_BAIXA, INCLUIDO))
+    mantidos = np.flatnonzero(situacao == INCLUIDO)
+
+    datas = calendario
+    if periodo_comum and len(mantidos):
+        inicio, fim = primeira[mantidos].max(), ultima[mantidos].min()
+        if inicio > fim:
+            raise ValueError("Os tickers mantidos não têm nenhum período em comum.")
+        valores, datas = valores[inicio:fim + 1], datas[inicio:fim + 1]
+    valores = np.ascontiguousarray(valores[:, mantidos])
+    retornos = np.ascontiguousarray(valores[1:] / valores[:-1] - 1)
+
+    relatorio = pd.DataFrame({
+        "Primeira data": [calendario[linha] if linha >= 0 else pd.NaT for linha in primeira],
+        "Última data": [calendario[linha] if linha >= 0 else pd.NaT for linha in ultima],
+        "Dias com preço": dias_com_preco,
+        "Dias preenchidos": preencher.sum(axis=0),
+        "Maior lacuna (pregões)": maior_lacuna,
+        "Cobertura (%)": cobertura * 100,
+        "Situação": situacao,
+    }, index=pd.Index(tickers, name="Ação"))
+
+    precos = pd.DataFrame(valores, index=datas, columns=[tickers[i] for i in mantidos])
+    return PainelAlinhado(precos, retornos, relatorio)
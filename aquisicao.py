@@ -0,0 +1,233 @@
+import asyncio
+import os
+import queue
+import threading
+
+import pandas as pd
+
+from instrumentacao import contar
+
+# Endereço base da API de gráficos do Yahoo Finance (pode apontar para um servidor local de testes
+# pela variável de ambiente CN1_URL_YAHOO)
+URL_BASE_YAHOO = os.environ.get("CN1_URL_YAHOO", "https://query1.finance.yahoo.com")
+
+# Colunas no mesmo formato do yf.download(auto_adjust=False)
+COLUNAS_OHLCV = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+# Respostas HTTP que valem uma nova tentativa (limite de requisições e erros do servidor)
+_STATUS_TEMPORARIOS = {429, 500, 502, 503, 504}
+
+
+# Limita o ritmo das requisições: no máximo por_segundo inícios de requisição por segundo
+class LimitadorTaxa:
+    def __init__(self, por_segundo=None):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._proximo = 0.0
+        self._trava = asyncio.Lock()
+
+    async def aguardar(self):
+        if not self.intervalo:
+            return
+        async with self._trava:
+            agora = asyncio.get_running_loop().time()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+# Converte a resposta JSON do endpoint /v8/finance/chart em um DataFrame OHLCV indexado por data
+def converter_grafico(dados):
+    resultados = (dados.get("chart") or {}).get("result") or []
+    if not resultados or not resultados[0].get("timestamp"):
+        return pd.DataFrame(columns=COLUNAS_OHLCV)
+
+    resultado = resultados[0]
+    cotacoes = resultado["indicators"]["quote"][0]
+    ajustado = (resultado["indicators"].get("adjclose") or [{}])[0].get("adjclose", cotacoes.get("close"))
+    deslocamento = pd.to_timedelta(resultado.get("meta", {}).get("gmtoffset", 0), unit="s")
+    datas = (pd.to_datetime(resultado["timestamp"], unit="s") + deslocamento).normalize()
+
+    df = pd.DataFrame({
+        "Open": cotacoes.get("open"),
+        "High": cotacoes.get("high"),
+        "Low": cotacoes.get("low"),
+        "Close": cotacoes.get("close"),
+        "Adj Close": ajustado,
+        "Volume": cotacoes.get("volume"),
+    }, index=pd.DatetimeIndex(datas, name="Date"), dtype=float)
+    df = df.dropna(how="all")
+    return df[~df.index.duplicated(keep="last")]
+
+
+# Cliente HTTP assíncrono com conexões reaproveitadas (pool), limite de requisições simultâneas,
+# limite de taxa, timeout e novas tentativas com espera exponencial
+# Uso: async with ClienteYahoo() as cliente: df = await cliente.buscar_ohlcv("PETR4.SA", inicio, fim)
+class ClienteYahoo:
+    def __init__(self, url_base=URL_BASE_YAHOO, max_simultaneas=8, por_segundo=10, timeout=10,
+                 tentativas=3, espera=0.5):
+        self.url_base = url_base.rstrip("/")
+        self.max_simultaneas = max_simultaneas
+        self.por_segundo = por_segundo
+        self.timeout = timeout
+        self.tentativas = max(1, tentativas)
+        self.espera = espera
+        self._sessao = None
+
+    async def __aenter__(self):
+        import aiohttp
+
+        self._semaforo = asyncio.Semaphore(self.max_simultaneas)
+        self._limitador = LimitadorTaxa(self.por_segundo)
+        self._sessao = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_simultaneas),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": "Mozilla/5.0 (Cn1)"},
+        )
+        return self
+
+    async def __aexit__(self, *erro):
+        await self._sessao.close()
+        self._sessao = None
+
+    # Faz um GET e devolve (status, JSON), repetindo em falhas temporárias
+    async def _obter_json(self, url, params):
+        import aiohttp
+
+        erro = None
+        for tentativa in range(self.tentativas):
+            if tentativa:
+                contar("aquisicao.novas_tentativas")
+                await asyncio.sleep(self.espera * 2 ** (tentativa - 1))
+            await self._limitador.aguardar()
+            contar("aquisicao.requisicoes")
+            try:
+                async with self._semaforo, self._sessao.get(url, params=params) as resposta:
+                    if resposta.status in _STATUS_TEMPORARIOS:
+                        erro = RuntimeError(f"HTTP {resposta.status} em {url}")
+                        continue
+                    if resposta.status == 404:
+                        return resposta.status, {}
+                    resposta.raise_for_status()
+                    return resposta.status, await resposta.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                erro = e
+        raise erro
+
+    # Busca os preços diários de um símbolo no intervalo [inicio, fim)
+    # Símbolo inexistente devolve um DataFrame vazio
+    async def buscar_ohlcv(self, simbolo, inicio, fim):
+        params = {
+            "period1": int(pd.Timestamp(inicio).tz_localize("UTC").timestamp()),
+            "period2": int(pd.Timestamp(fim).tz_localize("UTC").timestamp()),
+            "interval": "1d",
+            "events": "div,splits",
+            "includeAdjustedClose": "true",
+        }
+        _, dados = await self._obter_json(f"{self.url_base}/v8/finance/chart/{simbolo}", params)
+        return converter_grafico(dados)
+
+    # Busca vários pedidos (simbolo, inicio, fim) ao mesmo tempo e entrega cada um assim que termina:
+    # produz (simbolo, inicio, fim, df, erro), com df vazio e o erro preenchido quando a busca falha
+    async def fluxo_ohlcv(self, pedidos):
+        async def buscar(simbolo, inicio, fim):
+            try:
+                return simbolo, inicio, fim, await self.buscar_ohlcv(simbolo, inicio, fim), None
+            except Exception as e:
+                return simbolo, inicio, fim, pd.DataFrame(columns=COLUNAS_OHLCV), e
+
+        tarefas = [asyncio.create_task(buscar(*pedido)) for pedido in pedidos]
+        try:
+            for tarefa in asyncio.as_completed(tarefas):
+                yield await tarefa
+        finally:
+            for tarefa in tarefas:
+                tarefa.cancel()
+
+
+# Executa um gerador assíncrono em um laço de eventos próprio, em outra thread,
+# e entrega os itens à thread que chamou (o script do Streamlit) à medida que chegam
+# A thread começa a trabalhar imediatamente, antes do primeiro item ser pedido
+def _iterar_em_thread(criar_fluxo):
+    fila = queue.Queue()
+    parar = threading.Event()
+    fim = object()
+
+    async def consumir():
+        async for item in criar_fluxo():
+            fila.put(item)
+            if parar.is_set():
+                break
+
+    def rodar():
+        try:
+            asyncio.run(consumir())
+        except BaseException as e:
+            fila.put(e)
+        finally:
+            fila.put(fim)
+
+    def entregar():
+        try:
+            while True:
+                item = fila.get()
+                if item is fim:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            parar.set()
+
+    threading.Thread(target=rodar, daemon=True).start()
+    return entregar()
+
+
+# Lê os preços OHLCV de vários símbolos e entrega (simbolo, df) assim que cada um fica pronto
+# Com um armazém, o que já está no disco sai primeiro e só os trechos faltantes vão para a rede;
+# o que chega é gravado no armazém antes de ser entregue
+def iterar_ohlcv(simbolos, inicio, fim, armazem=None, **opcoes_cliente):
+    inicio = pd.Timestamp(inicio).normalize()
+    fim = pd.Timestamp(fim).normalize()
+
+    pedidos = []
+    faltantes = {}
+    no_disco = []
+    for simbolo in simbolos:
+        intervalos = armazem.intervalos_faltantes(simbolo, inicio, fim) if armazem is not None else [(inicio, fim)]
+        if intervalos:
+            faltantes[simbolo] = len(intervalos)
+            pedidos.extend((simbolo, a, b) for a, b in intervalos)
+        else:
+            no_disco.append(simbolo)
+
+    async def fluxo():
+        async with ClienteYahoo(**opcoes_cliente) as cliente:
+            async for item in cliente.fluxo_ohlcv(pedidos):
+                yield item
+
+    # As buscas começam antes de entregar o que já está no disco
+    chegadas = _iterar_em_thread(fluxo) if pedidos else iter(())
+    for simbolo in no_disco:
+        yield simbolo, armazem.ler_disco(simbolo, inicio, fim)
+
+    recebidos = {simbolo: ([], []) for simbolo in faltantes}
+    for simbolo, a, b, df, erro in chegadas:
+        # Busca que falhou vai como None: o armazém não marca o trecho como coberto
+        recebidos[simbolo][0].append(df if erro is None or armazem is None else None)
+        recebidos[simbolo][1].append((a, b))
+        faltantes[simbolo] -= 1
+        if faltantes[simbolo]:
+            continue
+        novos, intervalos = recebidos.pop(simbolo)
+        if armazem is None:
+            yield simbolo, novos[0]
+        else:
+            armazem.gravar_buscados(simbolo, novos, intervalos)
+            yield simbolo, armazem.ler_disco(simbolo, inicio, fim)
+
+
+# Fonte no formato de ArmazemPrecos: (simbolos, inicio, fim) -> {simbolo: DataFrame},
+# com as buscas feitas em paralelo pelo cliente assíncrono
+def baixar_ohlcv_async(simbolos, inicio, fim, **opcoes_cliente):
+    return {simbolo: df for simbolo, df in iterar_ohlcv(simbolos, inicio, fim, **opcoes_cliente) if not df.empty}
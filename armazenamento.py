@@ -0,0 +1,212 @@
+import json
+import os
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+from aquisicao import COLUNAS_OHLCV
+from instrumentacao import contar, etapa
+
+# Diretório padrão do armazém local (pode ser trocado pela variável de ambiente CN1_DIR_PRECOS)
+DIRETORIO_PADRAO = os.environ.get(
+    "CN1_DIR_PRECOS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "precos")
+)
+
+
+# Fonte padrão de dados OHLCV: baixa vários símbolos de uma vez pelo yfinance
+# Recebe (simbolos, inicio, fim) e devolve um dicionário {simbolo: DataFrame}
+def baixar_ohlcv_yfinance(simbolos, inicio, fim):
+    import yfinance as yf
+
+    data = yf.download(list(simbolos), start=inicio, end=fim, auto_adjust=False,
+                       group_by="ticker", progress=False, threads=False)
+    if data is None or data.empty:
+        return {}
+
+    resultado = {}
+    for simbolo in simbolos:
+        if isinstance(data.columns, pd.MultiIndex):
+            if simbolo not in data.columns.get_level_values(0):
+                continue
+            df = data[simbolo]
+        else:
+            df = data
+        df = df.dropna(how="all")
+        if not df.empty:
+            df.columns.name = None
+            resultado[simbolo] = df
+    return resultado
+
+
+# DataFrame OHLCV vazio, com as colunas de sempre: quem lê df['Close'] recebe uma série vazia, sem KeyError
+def ohlcv_vazio():
+    return pd.DataFrame(columns=COLUNAS_OHLCV, index=pd.DatetimeIndex([], name="Date"), dtype=float)
+
+
+# Converte as datas recebidas (str, date, datetime ou None) para Timestamp sem horário
+def _normalizar_data(valor, padrao):
+    if valor is None or valor == "":
+        return padrao
+    return pd.Timestamp(valor).tz_localize(None).normalize()
+
+
+# Armazém local de preços em Parquet, com um arquivo por ticker
+# Cada arquivo tem ao lado um JSON com o intervalo [inicio, fim) já coberto,
+# de modo que só os trechos faltantes são buscados na rede
+class ArmazemPrecos:
+    def __init__(self, diretorio=DIRETORIO_PADRAO, fonte=None):
+        self.diretorio = diretorio
+        self.fonte = fonte if fonte is not None else baixar_ohlcv_yfinance
+        self._travas = defaultdict(threading.Lock)
+        self._trava_global = threading.Lock()
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def _caminho(self, simbolo, extensao):
+        return os.path.join(self.diretorio, f"{simbolo}.{extensao}")
+
+    def _trava(self, simbolo):
+        with self._trava_global:
+            return self._travas[simbolo]
+
+    # Intervalo [inicio, fim) já presente no disco para o símbolo, ou None
+    def cobertura(self, simbolo):
+        caminho = self._caminho(simbolo, "json")
+        if not os.path.exists(caminho):
+            return None
+        with open(caminho) as arquivo:
+            meta = json.load(arquivo)
+        return pd.Timestamp(meta["inicio"]), pd.Timestamp(meta["fim"])
+
+    def _ler_disco(self, simbolo):
+        caminho = self._caminho(simbolo, "parquet")
+        if not os.path.exists(caminho):
+            return None
+        return pd.read_parquet(caminho)
+
+    # Grava dados e cobertura em arquivos temporários e troca de forma atômica
+    def _gravar_disco(self, simbolo, df, inicio, fim):
+        caminho = self._caminho(simbolo, "parquet")
+        df.to_parquet(caminho + ".tmp")
+        os.replace(caminho + ".tmp", caminho)
+
+        caminho_meta = self._caminho(simbolo, "json")
+        with open(caminho_meta + ".tmp", "w") as arquivo:
+            json.dump({"inicio": inicio.isoformat(), "fim": fim.isoformat()}, arquivo)
+        os.replace(caminho_meta + ".tmp", caminho_meta)
+
+    # Trechos que precisam ser buscados para cobrir [inicio, fim)
+    # Os trechos sempre encostam na cobertura atual, para que ela continue contígua
+    def intervalos_faltantes(self, simbolo, inicio, fim):
+        coberto = self.cobertura(simbolo)
+        if coberto is None:
+            return [(inicio, fim)] if inicio < fim else []
+        coberto_inicio, coberto_fim = coberto
+        faltantes = []
+        if inicio < coberto_inicio:
+            faltantes.append((inicio, coberto_inicio))
+        if fim > coberto_fim:
+            faltantes.append((coberto_fim, fim))
+        return faltantes
+
+    # Acrescenta ao disco os dados buscados e amplia o intervalo coberto
+    def _acrescentar(self, simbolo, novos, intervalos):
+        with self._trava(simbolo):
+            existente = self._ler_disco(simbolo)
+            coberto = self.cobertura(simbolo)
+
+            partes = [df for df in (existente, *novos) if df is not None and not df.empty]
+            if partes:
+                df = pd.concat(partes)
+                df = df[~df.index.duplicated(keep="last")].sort_index()
+            else:
+                # Trecho sem pregões (feriados, antes da listagem): só a cobertura é ampliada
+                df = existente if existente is not None else ohlcv_vazio()
+
+            inicios = [a for a, _ in intervalos]
+            fins = [b for _, b in intervalos]
+            if coberto is not None:
+                inicios.append(coberto[0])
+                fins.append(coberto[1])
+            self._gravar_disco(simbolo, df, min(inicios), max(fins))
+
+    # Lê vários símbolos, buscando na fonte apenas os intervalos que faltam
+    # Símbolos com o mesmo trecho faltante são buscados juntos, em uma única chamada
+    # Os símbolos que a fonte não devolveu ficam fora do resultado (mesmo com parte do intervalo no disco),
+    # para que quem chamou os trate como falha e possa tentar de novo
+    def ler_varios(self, simbolos, inicio=None, fim=None):
+        hoje = pd.Timestamp.today().normalize()
+        inicio = _normalizar_data(inicio, pd.Timestamp("1990-01-01"))
+        fim = _normalizar_data(fim, hoje + pd.Timedelta(days=1))
+
+        pendentes = defaultdict(list)
+        for simbolo in simbolos:
+            for intervalo in self.intervalos_faltantes(simbolo, inicio, fim):
+                pendentes[intervalo].append(simbolo)
+
+        contar("armazem.simbolos_lidos", len(simbolos))
+        buscados = defaultdict(lambda: ([], []))
+        nao_buscados = set()
+        for (a, b), grupo in pendentes.items():
+            contar("armazem.simbolos_buscados", len(grupo))
+            with etapa("armazem.fonte"):
+                baixados = self.fonte(grupo, a.strftime("%Y-%m-%d"), b.strftime("%Y-%m-%d"))
+            # Símbolo ausente do resultado não foi buscado (a fonte devolve {} em qualquer falha):
+            # o trecho dele não entra na cobertura e o símbolo fica fora do resultado
+            for simbolo in grupo:
+                if simbolo in baixados:
+                    buscados[simbolo][0].append(baixados[simbolo])
+                    buscados[simbolo][1].append((a, b))
+                else:
+                    nao_buscados.add(simbolo)
+
+        for simbolo, (novos, intervalos) in buscados.items():
+            self.gravar_buscados(simbolo, novos, intervalos)
+
+        if nao_buscados:
+            contar("armazem.simbolos_nao_buscados", len(nao_buscados))
+
+        resultado = {}
+        for simbolo in simbolos:
+            if simbolo in nao_buscados:
+                continue
+            df = self.ler_disco(simbolo, inicio, fim)
+            if not df.empty:
+                resultado[simbolo] = df
+        return resultado
+
+    # Grava no disco os dados buscados na rede para os intervalos informados
+    # O dia corrente nunca é marcado como coberto, pois o pregão pode não ter fechado; resultado vazio
+    # só amplia a cobertura quando o trecho termina antes de hoje (não há pregão a esperar nele)
+    # Busca que falhou é passada como None e não amplia a cobertura
+    def gravar_buscados(self, simbolo, novos, intervalos):
+        hoje = pd.Timestamp.today().normalize()
+        validos = [(df, (a, min(b, hoje))) for df, (a, b) in zip(novos, intervalos)
+                   if df is not None and (not df.empty or b <= hoje)]
+        if validos:
+            self._acrescentar(simbolo, [df for df, _ in validos], [intervalo for _, intervalo in validos])
+
+    # Lê o que já está no disco para o símbolo no intervalo [inicio, fim), sem buscar na rede
+    def ler_disco(self, simbolo, inicio=None, fim=None):
+        df = self._ler_disco(simbolo)
+        if df is None:
+            return ohlcv_vazio()
+        inicio = _normalizar_data(inicio, pd.Timestamp("1990-01-01"))
+        fim = _normalizar_data(fim, pd.Timestamp.today().normalize() + pd.Timedelta(days=1))
+        return df.loc[(df.index >= inicio) & (df.index < fim)]
+
+    # Lê os dados OHLCV de um símbolo no intervalo [inicio, fim)
+    def ler(self, simbolo, inicio=None, fim=None):
+        return self.ler_varios([simbolo], inicio, fim).get(simbolo, ohlcv_vazio())
+
+    # Adapta o armazém ao formato de fonte usado por precos.baixar_precos
+    def como_fonte(self, coluna="Adj Close", sufixo=".SA"):
+        def fonte(tickers, start_date, end_date):
+            dados = self.ler_varios([ticker + sufixo for ticker in tickers], start_date, end_date)
+            series = {}
+            for ticker in tickers:
+                df = dados.get(ticker + sufixo)
+                if df is not None and coluna in df.columns:
+                    series[ticker] = df[coluna].dropna()
+            return series
+        return fonte
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+from covariancia import estimar_covariancia
+from otimizacao import DIAS_UTEIS, TAXA_LIVRE_DE_RISCO, EstatisticasCarteira, maximizar_sharpe
+
+# Retornos diários compartilhados com os processos do pool (preenchido pelo inicializador de cada processo)
+_retornos_compartilhados = None
+_memoria_compartilhada = None
+
+
+# Datas de rebalanceamento do walk-forward: a primeira logo após a primeira janela de estimação completa,
+# depois a cada passo pregões. Cada período vai de um rebalanceamento até o seguinte (ou o último dia)
+def periodos_walk_forward(num_dias, janela_estimacao=252, passo=21):
+    rebalanceamentos = list(range(janela_estimacao, num_dias - 1, passo))
+    fins = rebalanceamentos[1:] + [num_dias - 1]
+    return list(zip(rebalanceamentos, fins))
+
+
+# Otimiza uma sequência de janelas consecutivas, cada uma partindo dos pesos da anterior
+# A janela do rebalanceamento no dia t usa os retornos observados até o fechamento de t;
+# ativos com algum retorno faltante na janela ficam de fora (peso zero)
+def _otimizar_janelas(retornos, rebalanceamentos, janela_estimacao, limites, taxa_livre_de_risco, estimador):
+    num_ativos = retornos.shape[1]
+    pesos = np.zeros((len(rebalanceamentos), num_ativos))
+    anteriores = None
+    for k, t in enumerate(rebalanceamentos):
+        janela = retornos[t - janela_estimacao + 1:t + 1]
+        validos = np.flatnonzero(~np.isnan(janela).any(axis=0))
+        if len(validos) == 0:
+            continue
+        if len(validos) == 1:
+            pesos[k, validos] = 1
+            anteriores = pesos[k]
+            continue
+
+        janela = janela[:, validos]
+        estatisticas = EstatisticasCarteira(janela.mean(axis=0), estimar_covariancia(janela, estimador))
+        iniciais = None
+        if anteriores is not None and anteriores[validos].sum() > 0:
+            iniciais = anteriores[validos] / anteriores[validos].sum()
+        pesos[k, validos] = maximizar_sharpe(estatisticas, taxa_livre_de_risco, pesos_iniciais=iniciais, limites=limites)
+        anteriores = pesos[k]
+    return pesos
+
+
+def _anexar_retornos(nome, forma):
+    global _retornos_compartilhados, _memoria_compartilhada
+    from multiprocessing import shared_memory
+
+    _memoria_compartilhada = shared_memory.SharedMemory(name=nome)
+    _retornos_compartilhados = np.ndarray(forma, dtype=np.float64, buffer=_memoria_compartilhada.buf)
+
+
+def _otimizar_janelas_compartilhadas(rebalanceamentos, janela_estimacao, limites, taxa_livre_de_risco, estimador):
+    return _otimizar_janelas(_retornos_compartilhados, rebalanceamentos, janela_estimacao, limites,
+                             taxa_livre_de_risco, estimador)
+
+
+# Otimiza todas as janelas; com processos > 1, blocos de janelas consecutivas vão para um pool de processos
+# que leem os retornos de um bloco de memória compartilhada, sem copiar o painel para cada tarefa
+def otimizar_janelas(retornos, rebalanceamentos, janela_estimacao, limites=(0, 1),
+                     taxa_livre_de_risco=TAXA_LIVRE_DE_RISCO, estimador="amostral", processos=None):
+    retornos = np.ascontiguousarray(retornos, dtype=np.float64)
+    if not processos or processos <= 1 or len(rebalanceamentos) < 2:
+        return _otimizar_janelas(retornos, rebalanceamentos, janela_estimacao, limites, taxa_livre_de_risco,
+                                 estimador)
+
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    memoria = shared_memory.SharedMemory(create=True, size=max(retornos.nbytes, 1))
+    try:
+        np.ndarray(retornos.shape, dtype=np.float64, buffer=memoria.buf)[:] = retornos
+        blocos = [bloco for bloco in np.array_split(np.asarray(rebalanceamentos), processos) if len(bloco)]
+        with ProcessPoolExecutor(max_workers=len(blocos), initializer=_anexar_retornos,
+                                 initargs=(memoria.name, retornos.shape)) as executor:
+            futuros = [executor.submit(_otimizar_janelas_compartilhadas, bloco.tolist(), janela_estimacao,
+                                       limites, taxa_livre_de_risco, estimador) for bloco in blocos]
+            return np.vstack([futuro.result() for futuro in futuros])
+    finally:
+        memoria.close()
+        memoria.unlink()
+
+
+# Resultado do backtest: curva de patrimônio, pesos em cada rebalanceamento, giro e drawdown
+class ResultadoBacktest:
+    def __init__(self, patrimonio, pesos, giro, taxa_livre_de_risco=TAXA_LIVRE_DE_RISCO):
+        self.patrimonio = patrimonio
+        self.pesos = pesos
+        self.giro = giro
+        self.drawdown = patrimonio / patrimonio.cummax() - 1
+        self.taxa_livre_de_risco = taxa_livre_de_risco
+
+    # Métricas realizadas (anualizadas) do período simulado
+    def resumo(self):
+        retornos = self.patrimonio.pct_change().dropna()
+        retorno_anual = retornos.mean() * DIAS_UTEIS
+        volatilidade_anual = retornos.std() * np.sqrt(DIAS_UTEIS)
+        return {
+            "Retorno total": self.patrimonio.iloc[-1] / self.patrimonio.iloc[0] - 1,
+            "Retorno anual": retorno_anual,
+            "Volatilidade anual": volatilidade_anual,
+            "Índice de Sharpe": (retorno_anual - self.taxa_livre_de_risco) / volatilidade_anual,
+            "Drawdown máximo": self.drawdown.min(),
+            "Giro médio": self.giro.iloc[1:].mean() if len(self.giro) > 1 else np.nan,
+            "Rebalanceamentos": len(self.giro),
+        }
+
+
+# Backtest walk-forward da carteira de Sharpe máximo: a cada passo pregões, reotimiza os pesos com a
+# janela de estimação mais recente e rebalanceia; entre rebalanceamentos os pesos variam com os preços
+# O custo de transação (fração do valor negociado) é descontado do patrimônio a cada rebalanceamento
+# estimador escolhe a covariância de cada janela (ver covariancia.ESTIMADORES)
+def backtest_walk_forward(df_prices, janela_estimacao=252, passo=21, custo_transacao=0.0, limites=(0, 1),
+                          taxa_livre_de_risco=TAXA_LIVRE_DE_RISCO, investimento_inicial=1.0, estimador="amostral",
+                          processos=None):
+    retornos = df_prices.pct_change().to_numpy(dtype=float)
+    num_dias, num_ativos = retornos.shape
+    periodos = periodos_walk_forward(num_dias, janela_estimacao, passo)
+    if not periodos:
+        raise ValueError("Histórico de preços menor que a janela de estimação.")
+
+    rebalanceamentos = [t for t, _ in periodos]
+    pesos = otimizar_janelas(retornos, rebalanceamentos, janela_estimacao, limites, taxa_livre_de_risco, estimador,
+                             processos)
+
+    # Ativo sem preço em um dia do período de manutenção fica com retorno zero nesse dia
+    retornos_mantidos = np.nan_to_num(retornos, nan=0.0)
+    curva = np.full(num_dias, np.nan)
+    curva[rebalanceamentos[0]] = investimento_inicial
+    patrimonio = investimento_inicial
+    pesos_atuais = np.zeros(num_ativos)
+    giro = np.zeros(len(periodos))
+
+    for k, (t, fim) in enumerate(periodos):
+        giro[k] = np.abs(pesos[k] - pesos_atuais).sum()
+        patrimonio *= 1 - custo_transacao * giro[k]
+
+        crescimento = np.cumprod(1 + retornos_mantidos[t + 1:fim + 1], axis=0)
+        # Sem nenhum ativo com dados na janela, o período fica em caixa
+        valor = crescimento @ pesos[k] if pesos[k].any() else np.ones(fim - t)
+        curva[t + 1:fim + 1] = patrimonio * valor
+        patrimonio *= valor[-1]
+        pesos_atuais = pesos[k] * crescimento[-1] / valor[-1] if valor[-1] > 0 else np.zeros(num_ativos)
+
+    datas = df_prices.index
+    return ResultadoBacktest(
+        pd.Series(curva, index=datas).iloc[rebalanceamentos[0]:],
+        pd.DataFrame(pesos, index=datas[rebalanceamentos], columns=df_prices.columns),
+        pd.Series(giro, index=datas[rebalanceamentos]),
+        taxa_livre_de_risco,
+    )
@@ -0,0 +1,332 @@
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.optimize import minimize
+
+from alinhamento import alinhar
+from backtest import backtest_walk_forward
+from covariancia import ESTIMADORES, CovarianciaIncremental, estimar_covariancia
+from dados_sinteticos import gerar_lp, gerar_lp_esparso, gerar_precos
+from graficos import MAX_PONTOS, METODOS_DECIMACAO, dados_grafico
+from otimizacao import DIAS_UTEIS, EstatisticasCarteira, maximizar_sharpe
+from painel import PainelPrecos
+from selecao import melhores_k, resolver_restrito
+from simplex import resolver_lote, simplex_method
+from simulacao import simular_carteira
+
+
+# Implementação original de calculate_sharpe_ratio (Projeto 1.py), mantida como referência
+def _sharpe_original(df_prices, weights):
+    daily_returns = df_prices.pct_change()
+    annual_returns = daily_returns.mean() * 252
+    cov_matrix = daily_returns.cov()
+    portfolio_return = np.dot(annual_returns, weights)
+    portfolio_std_dev = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights))) * np.sqrt(252)
+    return (portfolio_return - 0.05) / portfolio_std_dev
+
+
+# Implementação original de maximize_sharpe_ratio (Projeto 1.py), mantida como referência
+def _maximizar_original(df_prices):
+    n = len(df_prices.columns)
+    constraints = ({'type': 'eq', 'fun': lambda weights: np.sum(weights) - 1})
+    result = minimize(lambda weights: -_sharpe_original(df_prices, weights), np.ones(n) / n,
+                      method='SLSQP', bounds=[(0, 1)] * n, constraints=constraints)
+    return result.x
+
+
+# Compara o otimizador original com o motor de estatísticas pré-calculadas e gradiente analítico
+def bench_sharpe(num_ativos, num_dias, comparar=True):
+    df_prices = gerar_precos(num_ativos, num_dias)
+
+    inicio = time.perf_counter()
+    estatisticas = EstatisticasCarteira.de_precos(df_prices)
+    pesos = maximizar_sharpe(estatisticas)
+    tempo_novo = time.perf_counter() - inicio
+    print(f"sharpe  ativos={num_ativos} dias={num_dias}  motor: {tempo_novo:.3f}s  "
+          f"sharpe={estatisticas.sharpe(pesos):.6f}")
+
+    if comparar:
+        inicio = time.perf_counter()
+        pesos_originais = _maximizar_original(df_prices)
+        tempo_original = time.perf_counter() - inicio
+        print(f"sharpe  ativos={num_ativos} dias={num_dias}  original: {tempo_original:.3f}s  "
+              f"sharpe={estatisticas.sharpe(pesos_originais):.6f}  "
+              f"aceleração={tempo_original / tempo_novo:.1f}x  "
+              f"maior diferença de peso={np.max(np.abs(pesos - pesos_originais)):.2e}")
+
+
+# Resolve um LP esparso pelo caminho esparso do simplex revisado
+def bench_simplex_esparso(num_restricoes, num_vars):
+    c, A, b = gerar_lp_esparso(num_restricoes, num_vars)
+    inicio = time.perf_counter()
+    _, max_profit = simplex_method(c, A, b, sp.csr_matrix((0, num_vars)), np.empty(0))
+    print(f"simplex esparso restrições={num_restricoes} variáveis={num_vars} não nulos={A.nnz}: "
+          f"{time.perf_counter() - inicio:.3f}s  objetivo={max_profit:.6f}")
+
+
+# Compara os modos tabela e revisado do simplex em um LP gerado
+def bench_simplex(num_restricoes, num_vars):
+    c, A, b = gerar_lp(num_restricoes, num_vars)
+    vazio_A, vazio_b = np.empty((0, num_vars)), np.empty(0)
+    for modo in ("tableau", "revisado"):
+        inicio = time.perf_counter()
+        _, max_profit = simplex_method(c, A, b, vazio_A, vazio_b, modo=modo)
+        print(f"simplex restrições={num_restricoes} variáveis={num_vars}  {modo}: "
+              f"{time.perf_counter() - inicio:.3f}s  objetivo={max_profit:.6f}")
+
+
+# Varre cenários de lado direito do mesmo LP esparso: resolução em lote (warm start) x resoluções a frio
+def bench_simplex_lote(num_restricoes, num_vars, num_cenarios=50):
+    c, A, b = gerar_lp_esparso(num_restricoes, num_vars)
+    lados_direitos = b * np.random.default_rng(1).uniform(0.95, 1.05, (num_cenarios, num_restricoes))
+    vazio_A, vazio_b = sp.csr_matrix((0, num_vars)), np.empty(0)
+
+    inicio = time.perf_counter()
+    resolver_lote(c, A, b, vazio_A, vazio_b, lados_direitos=lados_direitos)
+    tempo_lote = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for b_cenario in lados_direitos:
+        simplex_method(c, A, b_cenario, vazio_A, vazio_b)
+    tempo_frio = time.perf_counter() - inicio
+    print(f"simplex lote cenários={num_cenarios} restrições={num_restricoes} variáveis={num_vars}  "
+          f"lote: {tempo_lote:.3f}s  a frio: {tempo_frio:.3f}s")
+
+
+# Backtest walk-forward do Sharpe máximo: sequencial x pool de processos
+def bench_backtest(num_ativos, num_dias, processos):
+    df_prices = gerar_precos(num_ativos, num_dias)
+    for num_processos in (None, processos):
+        inicio = time.perf_counter()
+        resultado = backtest_walk_forward(df_prices, processos=num_processos)
+        print(f"backtest ativos={num_ativos} dias={num_dias} processos={num_processos or 1}: "
+              f"{time.perf_counter() - inicio:.3f}s  janelas={len(resultado.giro)}  "
+              f"retorno total={resultado.resumo()['Retorno total']:.4f}")
+
+
+# Simulação Monte Carlo da carteira de Sharpe máximo (100 mil caminhos de um ano) nos dois métodos e tipos
+def bench_simulacao(num_ativos, num_dias, num_caminhos=100_000):
+    df_prices = gerar_precos(num_ativos, num_dias)
+    estatisticas = EstatisticasCarteira.de_precos(df_prices)
+    pesos = maximizar_sharpe(estatisticas)
+    retornos = df_prices.pct_change().iloc[1:].to_numpy()
+    for metodo in ("cholesky", "bootstrap"):
+        for dtype in (np.float64, np.float32):
+            inicio = time.perf_counter()
+            resultado = simular_carteira(pesos, estatisticas, num_caminhos=num_caminhos, metodo=metodo,
+                                         retornos_historicos=retornos, semente=0, dtype=dtype)
+            print(f"simulação {metodo} {np.dtype(dtype).name} caminhos={num_caminhos}: "
+                  f"{time.perf_counter() - inicio:.3f}s  VaR 95%={resultado.var():.4f}  CVaR 95%={resultado.cvar():.4f}")
+
+
+# Painel float64 em memória x painel float32 mapeado do disco: tamanho, tempo de abertura e de indicadores
+def bench_painel(num_ativos, num_dias):
+    df_prices = gerar_precos(num_ativos, num_dias)
+    with tempfile.TemporaryDirectory() as diretorio:
+        PainelPrecos.de_dataframe(df_prices).salvar(os.path.join(diretorio, "painel"))
+        inicio = time.perf_counter()
+        painel = PainelPrecos.abrir(os.path.join(diretorio, "painel"))
+        tempo_abertura = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        EstatisticasCarteira.de_precos(painel.como_dataframe())
+        tempo_estatisticas = time.perf_counter() - inicio
+        print(f"painel ativos={num_ativos} dias={num_dias}  float64: {df_prices.to_numpy().nbytes / 2**20:.1f} MiB  "
+              f"float32 mapeado: {painel.valores.nbytes / 2**20:.1f} MiB  abertura: {tempo_abertura * 1000:.2f}ms  "
+              f"estatísticas: {tempo_estatisticas:.3f}s")
+        del painel
+
+
+# Tempo do otimizador de Sharpe para cada estimador de covariância, com ativos próximos do número de dias,
+# e atualização incremental (um dia novo) x recálculo completo da covariância amostral
+def bench_covariancia(num_ativos, num_dias):
+    df_prices = gerar_precos(num_ativos, num_dias)
+    df_prices.iloc[:num_dias // 3, ::7] = np.nan  # parte dos ativos sem histórico no início
+    retornos = df_prices.pct_change().to_numpy()
+    medias = np.nanmean(retornos, axis=0)
+
+    for estimador in ESTIMADORES:
+        inicio = time.perf_counter()
+        covariancia = estimar_covariancia(retornos, estimador)
+        tempo_estimacao = time.perf_counter() - inicio
+
+        estatisticas = EstatisticasCarteira(medias, covariancia)
+        inicio = time.perf_counter()
+        pesos = maximizar_sharpe(estatisticas)
+        tempo_otimizacao = time.perf_counter() - inicio
+        print(f"covariância {estimador:<12} ativos={num_ativos} dias={num_dias}  estimação: {tempo_estimacao:.3f}s  "
+              f"otimização: {tempo_otimizacao:.3f}s  condição: {np.linalg.cond(covariancia):.3g}  "
+              f"ativos com peso: {np.sum(pesos > 1e-4)}")
+
+    incremental = CovarianciaIncremental.de_retornos(retornos[:-1])
+    inicio = time.perf_counter()
+    incremental.adicionar(retornos[-1])
+    incremental.covariancia()
+    tempo_incremental = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    estimar_covariancia(retornos)
+    print(f"covariância novo dia  incremental: {tempo_incremental * 1000:.2f}ms  "
+          f"recálculo: {(time.perf_counter() - inicio) * 1000:.2f}ms")
+
+
+# Decimação de uma série longa (ex.: dados intradiários) e montagem dos dados de um gráfico de vários
+# tickers com EMA: pontos enviados ao navegador x pontos originais
+def bench_graficos(num_ativos, num_dias, num_pontos_serie=1_000_000):
+    rng = np.random.default_rng(0)
+    serie = np.cumsum(rng.normal(size=num_pontos_serie))
+    x = np.arange(num_pontos_serie, dtype=np.float64)
+    for nome, metodo in METODOS_DECIMACAO.items():
+        inicio = time.perf_counter()
+        indices = metodo(x, serie, MAX_PONTOS)
+        print(f"decimação {nome:<6} {num_pontos_serie} -> {len(indices)} pontos: "
+              f"{(time.perf_counter() - inicio) * 1000:.1f}ms")
+
+    df_prices = gerar_precos(num_ativos, num_dias)
+    inicio = time.perf_counter()
+    dados = dados_grafico(df_prices, span_ema=10)
+    print(f"gráfico ativos={num_ativos} dias={num_dias} com EMA: {2 * df_prices.size} -> {len(dados)} pontos  "
+          f"{time.perf_counter() - inicio:.3f}s")
+
+
+# Painel com buracos (históricos curtos, suspensões e um ticker sem dados): estatísticas direto do painel
+# bruto com pandas (pct_change, mean e cov par a par) x alinhamento feito uma vez + estatísticas dos arrays
+def bench_alinhamento(num_ativos, num_dias, fracao_faltante=0.02):
+    df_prices = gerar_precos(num_ativos, num_dias)
+    rng = np.random.default_rng(1)
+    valores = df_prices.to_numpy().copy()
+    valores[rng.random(valores.shape) < fracao_faltante] = np.nan
+    valores[:num_dias // 4, :num_ativos // 10] = np.nan
+    valores[:, -1] = np.nan
+    df_prices = pd.DataFrame(valores, index=df_prices.index, columns=df_prices.columns)
+
+    inicio = time.perf_counter()
+    retornos = df_prices.pct_change()
+    retornos.mean(), retornos.cov()
+    tempo_pandas = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    alinhado = alinhar(df_prices)
+    tempo_alinhar = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    alinhado.estatisticas()
+    tempo_estatisticas = time.perf_counter() - inicio
+    print(f"alinhamento ativos={num_ativos} dias={num_dias}  pandas: {tempo_pandas:.3f}s  "
+          f"alinhar: {tempo_alinhar:.3f}s  estatísticas: {tempo_estatisticas:.3f}s  "
+          f"mantidos={len(alinhado.tickers)}  descartados={len(alinhado.descartados)}")
+
+
+# Leitura de um LP esparso gravado em MPS, CSV de coordenadas e .npz (modelo_lp) e conversão para o simplex
+def bench_modelo_lp(num_restricoes, num_vars):
+    from modelo_lp import ModeloLP, ler_modelo
+
+    c, A, b = gerar_lp_esparso(num_restricoes, num_vars)
+    modelo = ModeloLP.de_matriz(c, A, b)
+    with tempfile.TemporaryDirectory() as diretorio:
+        for formato in ("mps", "csv", "npz"):
+            caminho = os.path.join(diretorio, f"modelo.{formato}")
+            getattr(modelo, f"salvar_{formato}")(caminho)
+            inicio = time.perf_counter()
+            lido = ler_modelo(caminho)
+            tempo_leitura = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            lido.para_simplex()
+            print(f"modelo lp {formato} restrições={num_restricoes} variáveis={num_vars} "
+                  f"não nulos={lido.num_coeficientes} ({os.path.getsize(caminho) / 2**20:.1f} MiB): "
+                  f"leitura {tempo_leitura:.3f}s  conversão {time.perf_counter() - inicio:.3f}s")
+
+
+# Carteira com k ativos: as k maiores posições da otimização completa (o antigo head(3) do Projeto 1)
+# x seleção com cardinalidade (busca local + branch-and-bound), sequencial e com pool de processos
+def bench_selecao(num_ativos, num_dias, processos, k=3, peso_minimo=0.0, peso_maximo=1.0):
+    estatisticas = EstatisticasCarteira.de_precos(gerar_precos(num_ativos, num_dias))
+    pesos = maximizar_sharpe(estatisticas, limites=(0, peso_maximo))
+    maiores = sorted(np.argsort(-pesos)[:k].tolist())
+    sharpe_maiores, _ = resolver_restrito(estatisticas, maiores, maiores, peso_minimo, peso_maximo)
+    print(f"seleção ativos={num_ativos} k={k}  maiores pesos: Sharpe={sharpe_maiores:.4f}")
+    for num_processos in (None, processos):
+        resultado = melhores_k(estatisticas, k, peso_minimo, peso_maximo, processos=num_processos)
+        print(f"seleção ativos={num_ativos} k={k} processos={num_processos or 1}: {resultado.segundos:.3f}s  "
+              f"Sharpe={resultado.sharpe:.4f}  gap={resultado.gap:.2%}  nós={resultado.nos}  "
+              f"avaliações={resultado.avaliacoes}")
+
+
+# Aplicativos e módulos de entrada cujo tempo de importação é auditado
+APLICATIVOS = ["primeiro.py", "primeiro rev 02.py", "terceiro.py", "quarto.py", "quinto.py",
+               "Projeto 1.py", "Projeto 2.py", "cli.py"]
+
+
+# Tempo de importação (em segundos) das importações de topo de um arquivo, medido com python -X importtime
+# em um processo novo (como o de um worker recém-iniciado); devolve o total e o tempo de cada módulo de topo
+def tempo_importacao(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        arvore = ast.parse(arquivo.read())
+    codigo = "\n".join(ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom)))
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(caminho)), check=True)
+    modulos = {}
+    for linha in processo.stderr.splitlines():
+        partes = linha.removeprefix("import time:").split("|")
+        if len(partes) == 3 and partes[1].strip().isdigit() and not partes[2].startswith("  "):
+            modulos[partes[2].strip()] = int(partes[1]) / 1e6
+    return sum(modulos.values()), modulos
+
+
+# Auditoria de inicialização: tempo de importação de cada aplicativo (o menor de algumas repetições)
+# e os módulos mais pesados que ele carrega logo no início
+def bench_importacao(repeticoes=3):
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    for nome in APLICATIVOS:
+        total, modulos = min((tempo_importacao(os.path.join(diretorio, nome)) for _ in range(repeticoes)),
+                             key=lambda resultado: resultado[0])
+        pesados = sorted(modulos.items(), key=lambda item: -item[1])[:3]
+        print(f"importação {nome:<20} {total * 1000:7.1f}ms  "
+              + "  ".join(f"{modulo}: {tempo * 1000:.0f}ms" for modulo, tempo in pesados))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de desempenho do projeto")
+    parser.add_argument("testes", nargs="*", help="sharpe, simplex, simplex-esparso, simplex-lote, modelo-lp, backtest, simulacao, painel, covariancia, graficos, selecao, alinhamento, importacao (padrão: todos)")
+    parser.add_argument("--ativos", type=int, default=90)
+    parser.add_argument("--dias", type=int, default=250)
+    parser.add_argument("--restricoes", type=int, default=500)
+    parser.add_argument("--processos", type=int, default=os.cpu_count())
+    parser.add_argument("--sem-original", action="store_true", help="não roda a implementação original (lenta)")
+    args = parser.parse_args()
+    args.testes = args.testes or ["sharpe", "simplex", "simplex-esparso", "simplex-lote", "modelo-lp", "backtest", "simulacao", "painel", "covariancia",
+                                   "graficos", "selecao", "alinhamento", "importacao"]
+
+    if "sharpe" in args.testes:
+        bench_sharpe(args.ativos, args.dias, comparar=not args.sem_original)
+    if "simplex" in args.testes:
+        bench_simplex(args.restricoes, args.restricoes)
+    if "simplex-esparso" in args.testes:
+        bench_simplex_esparso(args.restricoes, 5 * args.restricoes)
+    if "simplex-lote" in args.testes:
+        bench_simplex_lote(args.restricoes // 2, 5 * args.restricoes // 2)
+    if "modelo-lp" in args.testes:
+        bench_modelo_lp(40 * args.restricoes, 200 * args.restricoes)
+    if "backtest" in args.testes:
+        bench_backtest(args.ativos, 4 * DIAS_UTEIS, args.processos)
+    if "simulacao" in args.testes:
+        bench_simulacao(args.ativos, args.dias)
+    if "painel" in args.testes:
+        bench_painel(10 * args.ativos, 20 * args.dias)
+    if "covariancia" in args.testes:
+        bench_covariancia(args.ativos, args.ativos + args.ativos // 2)
+    if "graficos" in args.testes:
+        bench_graficos(10, 20 * args.dias)
+    if "selecao" in args.testes:
+        bench_selecao(args.ativos, args.dias, args.processos)
+        bench_selecao(args.ativos, args.dias, args.processos, k=5, peso_minimo=0.05, peso_maximo=0.4)
+    if "alinhamento" in args.testes:
+        bench_alinhamento(5 * args.ativos, 20 * args.dias)
+    if "importacao" in args.testes:
+        bench_importacao()
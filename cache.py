@@ -0,0 +1,153 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Caches criados por memorizar, por função (módulo + nome qualificado + arquivo + assinatura do código)
+# Ficam no módulo importado, então sobrevivem aos reruns do Streamlit e são compartilhados entre sessões
+_registro = {}
+_trava_registro = threading.Lock()
+
+
+# Cache LRU com tamanho máximo e validade (TTL, em segundos), seguro para várias threads
+# Chamadas simultâneas para a mesma chave calculam o valor uma única vez: as demais esperam o resultado
+class CacheLRU:
+    def __init__(self, max_itens=128, ttl=None):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.acertos = 0
+        self.falhas = 0
+        self._itens = OrderedDict()
+        self._em_andamento = {}
+        self._trava = threading.Lock()
+
+    def __len__(self):
+        return len(self._itens)
+
+    # Devolve o valor guardado para a chave ou o calcula com calcular() e o guarda
+    def obter_ou_calcular(self, chave, calcular):
+        while True:
+            with self._trava:
+                item = self._itens.get(chave)
+                if item is not None:
+                    expira_em, valor = item
+                    if expira_em is None or time.monotonic() < expira_em:
+                        self._itens.move_to_end(chave)
+                        self.acertos += 1
+                        return valor
+                    del self._itens[chave]
+
+                evento = self._em_andamento.get(chave)
+                dono = evento is None
+                if dono:
+                    evento = self._em_andamento[chave] = threading.Event()
+                    self.falhas += 1
+
+            if not dono:
+                # Outra thread já está calculando: espera e tenta ler de novo
+                # (se o cálculo dela falhar, esta thread passa a calcular)
+                evento.wait()
+                continue
+
+            try:
+                valor = calcular()
+                with self._trava:
+                    expira_em = time.monotonic() + self.ttl if self.ttl is not None else None
+                    self._itens[chave] = (expira_em, valor)
+                    self._itens.move_to_end(chave)
+                    while len(self._itens) > self.max_itens:
+                        self._itens.popitem(last=False)
+                return valor
+            finally:
+                with self._trava:
+                    del self._em_andamento[chave]
+                evento.set()
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def estatisticas(self):
+        return {"itens": len(self._itens), "acertos": self.acertos, "falhas": self.falhas}
+
+
+# Converte um argumento em algo que possa ser chave de dicionário
+# Listas viram tuplas; arrays e DataFrames são identificados pelo hash do conteúdo
+def _normalizar(valor):
+    if isinstance(valor, (list, tuple)):
+        return tuple(_normalizar(item) for item in valor)
+    if isinstance(valor, (set, frozenset)):
+        return frozenset(_normalizar(item) for item in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((chave, _normalizar(item)) for chave, item in valor.items()))
+    if isinstance(valor, np.ndarray):
+        conteudo = hashlib.sha1(np.ascontiguousarray(valor).tobytes()).hexdigest()
+        return ("ndarray", valor.shape, valor.dtype.str, conteudo)
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        conteudo = hashlib.sha1(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes()).hexdigest()
+        colunas = tuple(map(str, valor.columns)) if isinstance(valor, pd.DataFrame) else str(valor.name)
+        return (type(valor).__name__, valor.shape, colunas, conteudo)
+    try:
+        hash(valor)
+    except TypeError:
+        raise TypeError(f"Argumento do tipo {type(valor).__name__} não pode ser usado como chave de cache.") from None
+    return valor
+
+
+# Chave de cache para uma chamada (argumentos posicionais e nomeados)
+def chave_de(args, kwargs):
+    return _normalizar(args), _normalizar(kwargs)
+
+
+# Assinatura do código de uma função: bytecode, nomes e constantes (inclusive das funções internas)
+# Editar um literal ou um nome usado muda a assinatura; mudar só a posição da função no arquivo, não
+def _assinatura_codigo(codigo):
+    resumo = hashlib.sha1(codigo.co_code)
+    resumo.update(repr((codigo.co_names, codigo.co_varnames, codigo.co_freevars)).encode("utf-8"))
+    for constante in codigo.co_consts:
+        if hasattr(constante, "co_code"):
+            resumo.update(_assinatura_codigo(constante).encode("ascii"))
+        else:
+            resumo.update(repr((type(constante).__name__, constante)).encode("utf-8"))
+    return resumo.hexdigest()
+
+
+# Decorador: memoriza os resultados da função em um CacheLRU compartilhado
+# O mesmo cache é reaproveitado quando o script é executado de novo (rerun do Streamlit);
+# se o código da função mudar, ela ganha um cache novo
+# Os valores devolvidos são compartilhados entre chamadas e sessões: não devem ser modificados
+# versao: função sem argumentos cujo resultado entra na chave (ex.: a versão dos dados compartilhados);
+# quando ela muda, as chamadas seguintes recalculam e os resultados antigos saem pelo LRU/TTL
+def memorizar(max_itens=128, ttl=None, versao=None):
+    def decorador(funcao):
+        # Os aplicativos do Streamlit rodam todos como __main__: o arquivo separa funções de mesmo nome
+        nome = (funcao.__module__, funcao.__qualname__, funcao.__code__.co_filename,
+                _assinatura_codigo(funcao.__code__))
+        with _trava_registro:
+            cache = _registro.get(nome)
+            if cache is None:
+                cache = _registro[nome] = CacheLRU(max_itens, ttl)
+            else:
+                cache.max_itens, cache.ttl = max_itens, ttl
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            chave = chave_de(args, kwargs)
+            if versao is not None:
+                chave = (_normalizar(versao()), chave)
+            return cache.obter_ou_calcular(chave, lambda: funcao(*args, **kwargs))
+
+        envoltorio.cache = cache
+        return envoltorio
+    return decorador
+
+
+# Estatísticas de todos os caches registrados, por função
+def estatisticas_caches():
+    with _trava_registro:
+        caches = list(_registro.items())
+    return {f"{modulo}.{nome}": cache.estatisticas() for (modulo, nome, _, _), cache in caches}
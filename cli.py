@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import sys
+
+from tarefas import TAREFAS
+
+# Linha de comando para rodar os cálculos sem o Streamlit (cron, servidores de lote)
+# Exemplos:
+#   python cli.py optimize --tickers PETR4 VALE3 ITUB4 --inicio 2022-01-01 --fim 2022-12-31
+#   python cli.py optimize --precos precos.parquet --k 5 --peso-maximo 0.4
+#   python cli.py screen --precos precos.parquet --saida indicadores.parquet
+#   python cli.py solve-lp jobs.jsonl --processos 4 --saida resultados.jsonl
+#   python cli.py solve-lp --modelo problema.mps.gz
+# Arquivos de jobs: .json (um objeto ou uma lista) ou .jsonl (um job por linha); "-" lê da entrada padrão
+
+
+# Lê os jobs dos arquivos, um de cada vez (os arquivos JSON Lines não são carregados inteiros)
+def ler_jobs(caminhos):
+    for caminho in caminhos:
+        arquivo = sys.stdin if caminho == "-" else open(caminho, encoding="utf-8")
+        try:
+            if caminho.endswith(".json"):
+                conteudo = json.load(arquivo)
+                yield from conteudo if isinstance(conteudo, list) else [conteudo]
+            else:
+                for linha in arquivo:
+                    if linha.strip():
+                        yield json.loads(linha)
+        finally:
+            if arquivo is not sys.stdin:
+                arquivo.close()
+
+
+# Escreve as linhas de resultado à medida que ficam prontas, em JSON Lines (padrão: saída padrão)
+class SaidaJsonl:
+    def __init__(self, caminho=None):
+        self.arquivo = open(caminho, "w", encoding="utf-8") if caminho else sys.stdout
+
+    def escrever(self, linhas):
+        for linha in linhas:
+            self.arquivo.write(json.dumps(linha, ensure_ascii=False) + "\n")
+        self.arquivo.flush()
+
+    def fechar(self):
+        if self.arquivo is not sys.stdout:
+            self.arquivo.close()
+
+
+# Escreve as linhas em Parquet, um grupo de linhas por job, sem acumular tudo na memória
+class SaidaParquet:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.escritor = None
+
+    def escrever(self, linhas):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not linhas:
+            return
+        if self.escritor is None:
+            tabela = pa.Table.from_pylist(linhas)
+            self.escritor = pq.ParquetWriter(self.caminho, tabela.schema)
+        else:
+            tabela = pa.Table.from_pylist(linhas, schema=self.escritor.schema)
+        self.escritor.write_table(tabela)
+
+    def fechar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+
+
+def _executar(nome_tarefa, job):
+    return TAREFAS[nome_tarefa](job)
+
+
+# Roda os jobs (em sequência ou em um pool de processos) e entrega (job, linhas, erro) conforme terminam
+def executar_jobs(nome_tarefa, jobs, processos=None):
+    if not processos or processos <= 1:
+        for job in jobs:
+            try:
+                yield job, _executar(nome_tarefa, job), None
+            except Exception as e:
+                yield job, [], e
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = {executor.submit(_executar, nome_tarefa, job): job for job in jobs}
+        for futuro in as_completed(futuros):
+            try:
+                yield futuros[futuro], futuro.result(), None
+            except Exception as e:
+                yield futuros[futuro], [], e
+
+
+# Job único montado a partir das opções da linha de comando
+def _job_das_opcoes(args):
+    job = {"id": "cli"}
+    for chave in ("tickers", "precos", "inicio", "fim", "estimador", "arquivo", "modelo", "maximizar", "modo", "k",
+                  "peso_minimo", "peso_maximo", "politica"):
+        valor = getattr(args, chave, None)
+        if valor is not None:
+            job[chave] = valor
+    return job
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cálculos do projeto sem interface (otimização, triagem e LP)")
+    subparsers = parser.add_subparsers(dest="tarefa", required=True)
+
+    for nome, ajuda in (("optimize", "carteira de Sharpe máximo"), ("screen", "tendência e volatilidade"),
+                        ("solve-lp", "problema de programação linear")):
+        sub = subparsers.add_parser(nome, help=ajuda)
+        sub.add_argument("jobs", nargs="*", help="arquivos de jobs (.json, .jsonl ou - para a entrada padrão)")
+        sub.add_argument("--saida", help="arquivo de saída (.jsonl ou .parquet; padrão: saída padrão em JSON Lines)")
+        sub.add_argument("--processos", type=int, default=None, help="processos para rodar jobs em paralelo")
+        if nome == "solve-lp":
+            sub.add_argument("--arquivo", help="LP em .npz (c, A_eq, b_eq, A_ineq, b_ineq)")
+            sub.add_argument("--modelo", help="modelo em .mps, .csv de coordenadas ou .npz (ver modelo_lp.py)")
+            sub.add_argument("--minimizar", dest="maximizar", action="store_false", default=None,
+                             help="minimiza o objetivo de um --modelo em CSV")
+            sub.add_argument("--modo", choices=["auto", "tableau", "revisado"])
+        else:
+            sub.add_argument("--tickers", nargs="+")
+            sub.add_argument("--precos", help="painel de preços em CSV ou Parquet (datas x tickers)")
+            sub.add_argument("--inicio")
+            sub.add_argument("--fim")
+            if nome == "optimize":
+                sub.add_argument("--estimador", choices=["amostral", "ledoit_wolf", "ewma", "fatores"])
+                sub.add_argument("--k", type=int, help="carteira com exatamente k ativos (seleção com cardinalidade)")
+                sub.add_argument("--peso-minimo", type=float, help="peso mínimo de cada ativo escolhido (com --k)")
+                sub.add_argument("--peso-maximo", type=float, help="peso máximo de cada ativo escolhido (com --k)")
+                sub.add_argument("--politica", choices=["preencher", "periodo_comum", "par_a_par"],
+                                 help="tratamento de dados faltantes (padrão: preencher)")
+
+    args = parser.parse_args(argv)
+    jobs = ler_jobs(args.jobs) if args.jobs else [_job_das_opcoes(args)]
+    saida = SaidaParquet(args.saida) if args.saida and args.saida.endswith(".parquet") else SaidaJsonl(args.saida)
+
+    falhas = 0
+    try:
+        for job, linhas, erro in executar_jobs(args.tarefa, jobs, args.processos):
+            if erro is not None:
+                falhas += 1
+                print(json.dumps({"id": job.get("id"), "erro": f"{type(erro).__name__}: {erro}"}, ensure_ascii=False),
+                      file=sys.stderr)
+                continue
+            saida.escrever(linhas)
+    except BrokenPipeError:
+        # Quem lia a saída (ex.: head) fechou o pipe: encerra sem erro
+        sys.stdout = open(os.devnull, "w")
+    finally:
+        saida.fechar()
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+import numpy as np
+
+# Estimadores de covariância dos retornos diários (matriz dias x ativos, com NaN onde falta histórico)
+# Todos usam as observações disponíveis de cada par de ativos, sem descartar dias inteiros
+
+
+# Retornos como float64, máscara de observações válidas (1/0) e retornos com os NaN trocados por zero
+def _preparar(retornos):
+    retornos = np.asarray(retornos, dtype=np.float64)
+    mascara = ~np.isnan(retornos)
+    return np.where(mascara, retornos, 0.0), mascara.astype(np.float64)
+
+
+# Covariância amostral par a par, igual a DataFrame.cov(): cada par usa os dias em que os dois têm dados
+# Calculada com três produtos de matrizes, em vez de um laço por par de ativos
+def covariancia_amostral(retornos):
+    X, M = _preparar(retornos)
+    n = M.T @ M
+    soma = X.T @ M
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariancia = (X.T @ X - soma * soma.T / n) / (n - 1)
+    covariancia[n < 2] = np.nan
+    return covariancia
+
+
+# Retornos centrados na média de cada ativo, com zero onde falta dado
+def _centrar(retornos):
+    X, M = _preparar(retornos)
+    with np.errstate(invalid="ignore"):
+        media = X.sum(axis=0) / M.sum(axis=0)
+    return np.where(M > 0, X - np.nan_to_num(media), 0.0)
+
+
+# Intensidade de encolhimento de Ledoit e Wolf (2004) em direção a mu * I, a partir dos retornos centrados
+# (dias sem dado de um ativo entram como desvio zero)
+def intensidade_ledoit_wolf(centrados):
+    num_dias, num_ativos = centrados.shape
+    empirica = centrados.T @ centrados / num_dias
+    mu = np.trace(empirica) / num_ativos
+    quadrados = centrados ** 2
+    beta = (quadrados.T @ quadrados).sum()
+    delta_ = (empirica ** 2).sum()
+    delta = (delta_ - 2 * mu * np.trace(empirica) + num_ativos * mu ** 2) / num_ativos
+    beta = min((beta / num_dias - delta_) / (num_ativos * num_dias), delta)
+    return 0.0 if beta <= 0 else beta / delta
+
+
+# Ledoit-Wolf: média ponderada entre a covariância amostral e o alvo mu * I (mu = variância média),
+# com o peso ótimo estimado dos dados; fica bem condicionada mesmo com ativos próximos do número de dias
+def ledoit_wolf(retornos):
+    amostral = covariancia_amostral(retornos)
+    intensidade = intensidade_ledoit_wolf(_centrar(retornos))
+    mu = np.nanmean(np.diag(amostral))
+    return (1 - intensidade) * amostral + intensidade * mu * np.eye(len(amostral))
+
+
+# EWMA (RiskMetrics): cada dia pesa decaimento vezes o dia seguinte; média dos retornos suposta zero
+# Os pesos de cada par são normalizados pelos dias em que os dois ativos têm dados
+def ewma(retornos, decaimento=0.94):
+    X, M = _preparar(retornos)
+    pesos = decaimento ** np.arange(len(X) - 1, -1, -1, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return ((X * pesos[:, None]).T @ X) / ((M * pesos[:, None]).T @ M)
+
+
+# Modelo de fatores estatísticos: os num_fatores componentes principais da correlação explicam a parte
+# comum e cada ativo ganha uma variância específica (diagonal); o resultado é sempre positivo definido
+def modelo_fatores(retornos, num_fatores=3):
+    amostral = covariancia_amostral(retornos)
+    desvios = np.sqrt(np.diag(amostral))
+    correlacao = np.nan_to_num(amostral / np.outer(desvios, desvios))
+    np.fill_diagonal(correlacao, 1.0)
+
+    autovalores, autovetores = np.linalg.eigh(correlacao)
+    k = min(num_fatores, len(autovalores))
+    cargas = autovetores[:, -k:] * np.sqrt(np.maximum(autovalores[-k:], 0)) if k else np.zeros((len(desvios), 0))
+    comum = cargas @ cargas.T
+    especifica = np.maximum(1 - np.diag(comum), 1e-6)
+    return (comum + np.diag(especifica)) * np.outer(desvios, desvios)
+
+
+ESTIMADORES = {
+    "amostral": covariancia_amostral,
+    "ledoit_wolf": ledoit_wolf,
+    "ewma": ewma,
+    "fatores": modelo_fatores,
+}
+
+
+# Estima a covariância dos retornos diários com o estimador escolhido (opções extras vão para o estimador)
+def estimar_covariancia(retornos, metodo="amostral", **opcoes):
+    if metodo not in ESTIMADORES:
+        raise ValueError(f"Estimador desconhecido: {metodo}")
+    return ESTIMADORES[metodo](retornos, **opcoes)
+
+
+# Covariância amostral par a par mantida por somas: cada novo dia entra com atualizações de posto 1
+# (produtos externos), em O(N^2), sem recalcular o histórico; o resultado é igual a covariancia_amostral
+class CovarianciaIncremental:
+    def __init__(self, num_ativos):
+        self.contagens = np.zeros((num_ativos, num_ativos))
+        self.somas = np.zeros((num_ativos, num_ativos))
+        self.produtos = np.zeros((num_ativos, num_ativos))
+
+    @classmethod
+    def de_retornos(cls, retornos):
+        incremental = cls(np.shape(retornos)[1])
+        incremental.adicionar_varios(retornos)
+        return incremental
+
+    # Acrescenta um dia de retornos (NaN onde o ativo não tem dado)
+    def adicionar(self, retorno):
+        retorno = np.asarray(retorno, dtype=np.float64)
+        m = (~np.isnan(retorno)).astype(np.float64)
+        x = np.where(m > 0, retorno, 0.0)
+        self.contagens += np.outer(m, m)
+        self.somas += np.outer(x, m)
+        self.produtos += np.outer(x, x)
+
+    # Acrescenta vários dias de uma vez (mesmo resultado de chamar adicionar para cada dia)
+    def adicionar_varios(self, retornos):
+        X, M = _preparar(retornos)
+        self.contagens += M.T @ M
+        self.somas += X.T @ M
+        self.produtos += X.T @ X
+
+    # Média de cada ativo sobre os seus dias com dados
+    def media(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.diag(self.somas) / np.diag(self.contagens)
+
+    def covariancia(self):
+        n = self.contagens
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covariancia = (self.produtos - self.somas * self.somas.T / n) / (n - 1)
+        covariancia[n < 2] = np.nan
+        return covariancia
+
+
+# EWMA incremental: a cada dia, numerador e denominador decaem e recebem o produto externo do novo retorno
+# O resultado é igual a ewma() sobre todos os dias acrescentados
+class EwmaIncremental:
+    def __init__(self, num_ativos, decaimento=0.94):
+        self.decaimento = decaimento
+        self.numerador = np.zeros((num_ativos, num_ativos))
+        self.denominador = np.zeros((num_ativos, num_ativos))
+
+    def adicionar(self, retorno):
+        retorno = np.asarray(retorno, dtype=np.float64)
+        m = (~np.isnan(retorno)).astype(np.float64)
+        x = np.where(m > 0, retorno, 0.0)
+        self.numerador *= self.decaimento
+        self.numerador += np.outer(x, x)
+        self.denominador *= self.decaimento
+        self.denominador += np.outer(m, m)
+
+    def covariancia(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.numerador / self.denominador
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+
+# Gera preços sintéticos (passeio aleatório geométrico com fatores comuns), usados nos benchmarks
+# e na fonte simulada do teste de carga do modo servidor
+def gerar_precos(num_ativos, num_dias, semente=0):
+    rng = np.random.default_rng(semente)
+    fatores = rng.normal(0, 0.01, size=(num_dias, 3))
+    cargas = rng.normal(0.5, 0.3, size=(3, num_ativos))
+    deriva = rng.normal(0.0005, 0.0005, size=num_ativos)
+    retornos = deriva + fatores @ cargas + rng.normal(0, 0.015, size=(num_dias, num_ativos))
+    precos = 20 * np.cumprod(1 + retornos, axis=0)
+    datas = pd.bdate_range("2022-01-03", periods=num_dias)
+    return pd.DataFrame(precos, index=datas, columns=[f"ATV{i}" for i in range(num_ativos)])
+
+
+# Gera um LP denso e limitado: maximizar c.x com A x <= b, A > 0 e b > 0
+def gerar_lp(num_restricoes, num_vars, semente=0):
+    rng = np.random.default_rng(semente)
+    c = rng.uniform(0, 5, num_vars)
+    A = rng.uniform(0.1, 3, (num_restricoes, num_vars))
+    b = rng.uniform(1, 10, num_restricoes)
+    return c, A, b
+
+
+# Gera um LP esparso e limitado: cada variável aparece em 3 restrições com coeficiente positivo
+def gerar_lp_esparso(num_restricoes, num_vars, semente=0):
+    import scipy.sparse as sp  # importação lenta: só quando um LP esparso é pedido
+
+    rng = np.random.default_rng(semente)
+    colunas = np.repeat(np.arange(num_vars), 3)
+    linhas = rng.integers(0, num_restricoes, 3 * num_vars)
+    A = sp.csr_matrix((rng.uniform(0.1, 3, 3 * num_vars), (linhas, colunas)), shape=(num_restricoes, num_vars))
+    return rng.uniform(0, 5, num_vars), A, rng.uniform(1, 10, num_restricoes)
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from indicadores import calcular_ema
+
+# Número máximo de pontos enviados ao navegador por série de um gráfico
+MAX_PONTOS = 1000
+
+
+# Índices dos pontos escolhidos pelo LTTB (Largest-Triangle-Three-Buckets): o primeiro e o último ponto
+# mais um por balde, o que forma o maior triângulo com o ponto escolhido no balde anterior e a média
+# do balde seguinte; preserva picos, vales e o formato visual da série com num_pontos pontos
+def indices_lttb(x, y, num_pontos=MAX_PONTOS):
+    n = len(y)
+    if num_pontos >= n or num_pontos < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # num_pontos - 2 baldes entre o primeiro e o último ponto; as médias de todos os baldes
+    # são calculadas de uma vez (somas por balde com reduceat)
+    bordas = np.linspace(1, n - 1, num_pontos - 1).astype(np.int64)
+    tamanhos = np.diff(bordas)
+    media_x = np.append(np.add.reduceat(x[:n - 1], bordas[:-1]) / tamanhos, x[-1])
+    media_y = np.append(np.add.reduceat(y[:n - 1], bordas[:-1]) / tamanhos, y[-1])
+
+    indices = np.empty(num_pontos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(num_pontos - 2):
+        inicio, fim = bordas[i], bordas[i + 1]
+        areas = np.abs((x[a] - media_x[i + 1]) * (y[inicio:fim] - y[a])
+                       - (x[a] - x[inicio:fim]) * (media_y[i + 1] - y[a]))
+        a = inicio + int(np.argmax(areas))
+        indices[i + 1] = a
+    return indices
+
+
+# Índices da decimação mínimo-máximo: em cada balde, o menor e o maior valor (mais o primeiro e o último
+# ponto); totalmente vetorizada, garante que nenhum extremo some do gráfico
+def indices_minmax(x, y, num_pontos=MAX_PONTOS):
+    n = len(y)
+    if num_pontos >= n or num_pontos < 4:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    num_baldes = (num_pontos - 2) // 2
+    tamanho = -(-n // num_baldes)
+    baldes = np.pad(y, (0, num_baldes * tamanho - n), constant_values=np.nan).reshape(num_baldes, tamanho)
+    vazios = np.isnan(baldes)
+    inicio = np.arange(num_baldes) * tamanho
+    minimos = inicio + np.argmin(np.where(vazios, np.inf, baldes), axis=1)
+    maximos = inicio + np.argmax(np.where(vazios, -np.inf, baldes), axis=1)
+    indices = np.unique(np.concatenate([[0, n - 1], minimos, maximos]))
+    return indices[indices < n]
+
+
+METODOS_DECIMACAO = {
+    "lttb": indices_lttb,
+    "minmax": indices_minmax,
+}
+
+
+# Eixo x numérico de uma série (datas viram inteiros; só as distâncias relativas importam)
+def _eixo_x(indice):
+    if isinstance(indice, pd.DatetimeIndex):
+        return indice.asi8.astype(np.float64)
+    try:
+        return np.asarray(indice, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.arange(len(indice), dtype=np.float64)
+
+
+# Série reduzida a no máximo max_pontos pontos (os NaN são descartados antes)
+def decimar(serie, max_pontos=MAX_PONTOS, metodo="lttb"):
+    if metodo not in METODOS_DECIMACAO:
+        raise ValueError(f"Método de decimação desconhecido: {metodo}")
+    serie = serie.dropna()
+    if len(serie) <= max_pontos:
+        return serie
+    indices = METODOS_DECIMACAO[metodo](_eixo_x(serie.index), serie.to_numpy(), max_pontos)
+    return serie.iloc[indices]
+
+
+# Dados do gráfico em formato longo (Data, Ativo, Série, Valor) a partir de {(ativo, série): Series},
+# com cada série decimada separadamente para no máximo max_pontos pontos
+def formato_longo(series, max_pontos=MAX_PONTOS, metodo="lttb"):
+    partes = []
+    for (ativo, nome), serie in series.items():
+        serie = decimar(serie, max_pontos, metodo)
+        partes.append(pd.DataFrame({"Data": serie.index, "Ativo": str(ativo), "Série": nome,
+                                    "Valor": serie.to_numpy(dtype=np.float64)}))
+    if not partes:
+        return pd.DataFrame(columns=["Data", "Ativo", "Série", "Valor"])
+    return pd.concat(partes, ignore_index=True)
+
+
+# Dados do gráfico de preços a partir de um painel largo (datas x tickers, ou uma Series): o preço
+# de cada ticker e, com span_ema, a EMA calculada de uma vez para todo o painel
+# normalizar=True põe cada ticker na base 100 (primeiro preço disponível), para comparar ativos
+def dados_grafico(precos, span_ema=None, max_pontos=MAX_PONTOS, metodo="lttb", normalizar=False):
+    if isinstance(precos, pd.Series):
+        precos = precos.to_frame()
+    if normalizar:
+        precos = precos / precos.bfill().iloc[0] * 100
+    paineis = {"Preço": precos}
+    if span_ema:
+        paineis[f"EMA {span_ema}"] = calcular_ema(precos, span=span_ema, min_periods=span_ema)
+    series = {(ativo, nome): painel[ativo] for nome, painel in paineis.items() for ativo in painel.columns}
+    return formato_longo(series, max_pontos, metodo)
+
+
+# Especificação Vega-Lite de um único gráfico de linhas para os dados de dados_grafico():
+# cor por ativo e traço (contínuo ou tracejado) por série, com zoom e arraste no eixo x
+def especificacao_grafico(dados, titulo=None, rotulo_y="Preço (R$)"):
+    temporal = pd.api.types.is_datetime64_any_dtype(dados["Data"])
+    especificacao = {
+        "mark": {"type": "line", "strokeWidth": 1.5},
+        "encoding": {
+            "x": {"field": "Data", "type": "temporal" if temporal else "quantitative", "title": None},
+            "y": {"field": "Valor", "type": "quantitative", "title": rotulo_y, "scale": {"zero": False}},
+            "color": {"field": "Ativo", "type": "nominal", "title": None},
+            "strokeDash": {"field": "Série", "type": "nominal", "title": None},
+            "tooltip": [{"field": "Data", "type": "temporal" if temporal else "quantitative"},
+                        {"field": "Ativo", "type": "nominal"}, {"field": "Série", "type": "nominal"},
+                        {"field": "Valor", "type": "quantitative", "format": ".2f"}],
+        },
+        "params": [{"name": "zoom", "select": {"type": "interval", "encodings": ["x"]}, "bind": "scales"}],
+    }
+    if titulo:
+        especificacao["title"] = titulo
+    return especificacao
+
+
+# Desenha o gráfico de preços em destino (st, uma coluna, um container ou um st.empty() para redesenhar)
+def mostrar_grafico(destino, precos, span_ema=None, max_pontos=MAX_PONTOS, metodo="lttb", normalizar=False,
+                    titulo=None, rotulo_y="Preço (R$)"):
+    dados = dados_grafico(precos, span_ema, max_pontos, metodo, normalizar)
+    return destino.vega_lite_chart(dados, especificacao_grafico(dados, titulo, rotulo_y))
+
+
+# Desenha séries já calculadas ({(ativo, série): Series}, ex.: indicadores acumulados em tempo real)
+def mostrar_series(destino, series, max_pontos=MAX_PONTOS, metodo="lttb", titulo=None, rotulo_y="Preço (R$)"):
+    dados = formato_longo(series, max_pontos, metodo)
+    return destino.vega_lite_chart(dados, especificacao_grafico(dados, titulo, rotulo_y))
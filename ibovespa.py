@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from html.parser import HTMLParser
+
+from instrumentacao import contar, etapa
+
+# URL da página da Wikipedia com a lista de companhias do Ibovespa
+URL_IBOVESPA = "https://pt.wikipedia.org/wiki/Lista_de_companhias_citadas_no_Ibovespa"
+
+# Snapshot local da lista, usado entre execuções e quando a rede falha
+CAMINHO_SNAPSHOT = os.environ.get(
+    "CN1_SNAPSHOT_IBOVESPA",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "ibovespa.json"),
+)
+
+# Tempo (em segundos) em que a lista é considerada atual sem consultar a Wikipedia
+TTL_PADRAO = 24 * 60 * 60
+
+# Espera (em segundos) depois de uma consulta que falhou: até lá o snapshot vencido é servido sem ir à rede
+ESPERA_APOS_FALHA = 5 * 60
+
+_sessao = None
+
+# Abertura da primeira tabela com a classe "wikitable"
+_INICIO_TABELA = re.compile(r"""<table[^>]*class=["'][^"']*\bwikitable\b""", re.IGNORECASE)
+
+_trava = threading.Lock()
+_memoria = {}
+
+
+# Parser leve: percorre o HTML em fluxo, pega só a primeira tabela "wikitable"
+# e guarda o texto da primeira célula <td> de cada linha que tenha pelo menos duas células <td>
+# (linhas de uma célula só, como separadores e notas, não são empresas)
+class _ExtratorTabela(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.empresas = []
+        self._na_tabela = False
+        self._terminou = False
+        self._profundidade = 0
+        self._celulas = 0
+        self._primeira = None
+        self._na_celula = False
+        self._texto = []
+
+    # Guarda o texto da primeira célula ao fim dela (</td> ou início da próxima célula, que o HTML permite)
+    def _fechar_celula(self):
+        if self._na_celula:
+            self._na_celula = False
+            self._primeira = "".join(self._texto).strip()
+
+    def _fechar_linha(self):
+        self._fechar_celula()
+        if self._celulas >= 2 and self._primeira:
+            self.empresas.append(self._primeira)
+        self._celulas = 0
+        self._primeira = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._terminou:
+            return
+        if tag == "table":
+            if self._na_tabela:
+                self._profundidade += 1
+            elif "wikitable" in (dict(attrs).get("class") or "").split():
+                self._na_tabela = True
+        elif not self._na_tabela or self._profundidade > 0:
+            return
+        elif tag == "tr":
+            self._fechar_linha()
+        elif tag in ("td", "th"):
+            self._fechar_celula()
+            if tag == "td":
+                self._celulas += 1
+                self._na_celula = self._celulas == 1
+                self._texto = []
+
+    def handle_endtag(self, tag):
+        if not self._na_tabela or self._terminou:
+            return
+        if tag == "table":
+            if self._profundidade > 0:
+                self._profundidade -= 1
+            else:
+                self._fechar_linha()
+                self._terminou = True
+        elif self._profundidade > 0:
+            return
+        elif tag == "td":
+            self._fechar_celula()
+        elif tag == "tr":
+            self._fechar_linha()
+
+    def handle_data(self, data):
+        if self._na_celula:
+            self._texto.append(data)
+
+
+# Extrai a lista de empresas do HTML da página
+# O parser começa direto na primeira <table> com "wikitable", pulando o resto da página
+def extrair_empresas(html):
+    encontrada = _INICIO_TABELA.search(html)
+    if encontrada:
+        html = html[encontrada.start():]
+
+    extrator = _ExtratorTabela()
+    extrator.feed(html)
+    extrator.close()
+    if not extrator.empresas:
+        raise RuntimeError("Tabela não encontrada.")
+    return extrator.empresas
+
+
+# Identificador curto da versão da lista (muda sempre que a composição muda)
+def versao_lista(empresas):
+    return hashlib.sha1("\n".join(empresas).encode("utf-8")).hexdigest()[:12]
+
+
+def _ler_snapshot(caminho):
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_snapshot(caminho, snapshot):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as arquivo:
+        json.dump(snapshot, arquivo, ensure_ascii=False)
+    os.replace(caminho + ".tmp", caminho)
+
+
+# Sessão HTTP reaproveitada entre as consultas, criada (e o requests importado) só na primeira delas
+def _obter_sessao():
+    global _sessao
+    if _sessao is None:
+        import requests
+
+        _sessao = requests.Session()
+        _sessao.headers["User-Agent"] = "Cn1/1.0 (lista de empresas do Ibovespa)"
+    return _sessao
+
+
+# Consulta a Wikipedia de forma condicional (ETag / If-Modified-Since)
+# e devolve o snapshot atualizado
+@etapa("ibovespa.raspagem")
+def _atualizar(snapshot, caminho, timeout):
+    contar("ibovespa.consultas_wikipedia")
+    cabecalhos = {}
+    if snapshot is not None:
+        if snapshot.get("etag"):
+            cabecalhos["If-None-Match"] = snapshot["etag"]
+        if snapshot.get("last_modified"):
+            cabecalhos["If-Modified-Since"] = snapshot["last_modified"]
+
+    response = _obter_sessao().get(URL_IBOVESPA, headers=cabecalhos, timeout=timeout)
+
+    if response.status_code == 304 and snapshot is not None:
+        # A página não mudou: só renova a validade do snapshot
+        contar("ibovespa.nao_modificada")
+        snapshot = {chave: valor for chave, valor in snapshot.items() if chave != "proxima_tentativa"}
+        snapshot["atualizado_em"] = time.time()
+    elif response.status_code == 200:
+        empresas = extrair_empresas(response.text)
+        snapshot = {
+            "empresas": empresas,
+            "versao": versao_lista(empresas),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "atualizado_em": time.time(),
+        }
+    else:
+        raise RuntimeError("Erro ao acessar a página.")
+
+    _gravar_snapshot(caminho, snapshot)
+    return snapshot
+
+
+# Devolve o snapshot atual da lista (empresas, versão e metadados HTTP)
+# Ordem de consulta: memória -> disco -> Wikipedia; se a rede falhar, usa o snapshot vencido e só tenta
+# de novo depois de ESPERA_APOS_FALHA segundos (campo proxima_tentativa, guardado só na memória), para que
+# os reruns não repitam a consulta lenta segurando a trava de todas as sessões enquanto o site está fora
+def obter_snapshot_ibovespa(ttl=TTL_PADRAO, caminho=CAMINHO_SNAPSHOT, timeout=10, forcar=False,
+                            espera_apos_falha=ESPERA_APOS_FALHA):
+    with _trava:
+        agora = time.time()
+        snapshot = _memoria.get(caminho)
+        if snapshot is None:
+            snapshot = _ler_snapshot(caminho)
+
+        if snapshot is not None and not forcar and (agora - snapshot["atualizado_em"] < ttl
+                                                    or agora < snapshot.get("proxima_tentativa", 0)):
+            _memoria[caminho] = snapshot
+            return snapshot
+
+        import requests
+
+        try:
+            snapshot = _atualizar(snapshot, caminho, timeout)
+        except (requests.RequestException, RuntimeError):
+            if snapshot is None:
+                raise
+            contar("ibovespa.falhas")
+            snapshot = dict(snapshot, proxima_tentativa=agora + espera_apos_falha)
+        _memoria[caminho] = snapshot
+        return snapshot
+
+
+# Função para obter a lista de empresas da Ibovespa
+def obter_empresas_ibovespa(ttl=TTL_PADRAO, caminho=CAMINHO_SNAPSHOT, timeout=10):
+    return list(obter_snapshot_ibovespa(ttl, caminho, timeout)["empresas"])
@@ -0,0 +1,191 @@
+import math
+import warnings
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# Rótulos de tendência (os mesmos usados em determinar_tendencia)
+TENDENCIA_ALTA = "Tendência de alta"
+TENDENCIA_BAIXA = "Tendência de baixa"
+SEM_TENDENCIA = "Sem tendência clara"
+
+
+# Monta o painel largo (datas x tickers) a partir de {simbolo: DataFrame OHLCV}
+def montar_painel(dados, coluna="Close"):
+    series = {simbolo: df[coluna] for simbolo, df in dados.items() if coluna in df.columns}
+    if not series:
+        return pd.DataFrame()
+    return pd.concat(series, axis=1).sort_index()
+
+
+# Empurra os NaN de cada coluna para o topo, mantendo a ordem das observações válidas:
+# a última linha passa a ser a última observação de cada ticker, como na série individual
+def _compactar(valores):
+    ordem = np.argsort(~np.isnan(valores), axis=0, kind="stable")
+    return np.take_along_axis(valores, ordem, axis=0)
+
+
+# Calcula, para todos os tickers do painel de uma vez:
+# preço atual, médias móveis curta e longa, tendência e volatilidade (desvio padrão dos retornos, em %)
+def calcular_indicadores(painel, curto=10, longo=50):
+    valores = _compactar(painel.to_numpy(dtype=float))
+
+    with warnings.catch_warnings():
+        # Tickers sem nenhum dado geram médias de fatias vazias (NaN)
+        warnings.simplefilter("ignore", RuntimeWarning)
+        preco_atual = valores[-1] if len(valores) else np.full(painel.shape[1], np.nan)
+        media_curta = np.nanmean(valores[-curto:], axis=0)
+        media_longa = np.nanmean(valores[-longo:], axis=0)
+        retornos = valores[1:] / valores[:-1] - 1
+        volatilidade = np.nanstd(retornos, axis=0, ddof=1) * 100
+
+    alta = (preco_atual > media_curta) & (media_curta > media_longa)
+    baixa = (preco_atual < media_curta) & (media_curta < media_longa)
+    tendencia = np.where(alta, TENDENCIA_ALTA, np.where(baixa, TENDENCIA_BAIXA, SEM_TENDENCIA))
+
+    return pd.DataFrame({
+        "Preço atual": preco_atual,
+        "Média curta": media_curta,
+        "Média longa": media_longa,
+        "Tendência": tendencia,
+        "Volatilidade (%)": volatilidade,
+    }, index=painel.columns)
+
+
+# Média móvel exponencial de todas as colunas do painel
+# ignore_na=True faz cada ticker ser tratado como a sua série individual, sem os buracos do calendário comum
+def calcular_ema(painel, span=10, min_periods=10):
+    return painel.ewm(span=span, min_periods=min_periods, ignore_na=True).mean().where(painel.notna())
+
+
+# Média móvel simples de janela fixa, atualizada em O(1) por preço
+# Enquanto a janela não está cheia, é a média dos preços disponíveis (como a média das últimas N linhas)
+class MediaMovel:
+    def __init__(self, janela):
+        self.janela = janela
+        self._valores = deque()
+        self._soma = 0.0
+        self._desde_recalculo = 0
+
+    def atualizar(self, preco):
+        self._valores.append(preco)
+        self._soma += preco
+        if len(self._valores) > self.janela:
+            self._soma -= self._valores.popleft()
+        # Refaz a soma a cada janela atualizações para não acumular erro de arredondamento (custo amortizado O(1))
+        self._desde_recalculo += 1
+        if self._desde_recalculo >= self.janela:
+            self._soma = math.fsum(self._valores)
+            self._desde_recalculo = 0
+        return self.valor
+
+    @property
+    def valor(self):
+        return self._soma / len(self._valores) if self._valores else math.nan
+
+
+# Média móvel exponencial incremental, igual a Series.ewm(span, min_periods, adjust=True).mean():
+# guarda numerador e denominador da média ponderada e atualiza os dois a cada preço
+class MediaExponencial:
+    def __init__(self, span=10, min_periods=10):
+        self.alfa = 2 / (span + 1)
+        self.min_periods = min_periods
+        self._numerador = 0.0
+        self._denominador = 0.0
+        self.contagem = 0
+
+    def atualizar(self, preco):
+        self._numerador = self._numerador * (1 - self.alfa) + preco
+        self._denominador = self._denominador * (1 - self.alfa) + 1
+        self.contagem += 1
+        return self.valor
+
+    @property
+    def valor(self):
+        if self.contagem < max(self.min_periods, 1):
+            return math.nan
+        return self._numerador / self._denominador
+
+
+# Volatilidade incremental (desvio padrão dos retornos diários, em %) pelo algoritmo de Welford,
+# igual a pct_change().std() * 100 sobre todo o histórico
+class VolatilidadeIncremental:
+    def __init__(self):
+        self._anterior = None
+        self.contagem = 0
+        self._media = 0.0
+        self._m2 = 0.0
+
+    def atualizar(self, preco):
+        if self._anterior is not None:
+            retorno = preco / self._anterior - 1
+            self.contagem += 1
+            delta = retorno - self._media
+            self._media += delta / self.contagem
+            self._m2 += delta * (retorno - self._media)
+        self._anterior = preco
+        return self.valor
+
+    @property
+    def valor(self):
+        if self.contagem < 2:
+            return math.nan
+        return math.sqrt(self._m2 / (self.contagem - 1)) * 100
+
+
+# Classificação de tendência para um único ticker (mesma regra de calcular_indicadores)
+def classificar_tendencia(preco_atual, media_curta, media_longa):
+    if preco_atual > media_curta > media_longa:
+        return TENDENCIA_ALTA
+    if preco_atual < media_curta < media_longa:
+        return TENDENCIA_BAIXA
+    return SEM_TENDENCIA
+
+
+# Indicadores de um ticker mantidos em estado: cada novo preço atualiza médias, EMA,
+# volatilidade e tendência em O(1), sem reprocessar o histórico
+# Preços ausentes (NaN) são ignorados, como nas funções vetorizadas
+class IndicadoresIncrementais:
+    def __init__(self, curto=10, longo=50, span=10, min_periods=10):
+        self.media_curta = MediaMovel(curto)
+        self.media_longa = MediaMovel(longo)
+        self.ema = MediaExponencial(span, min_periods)
+        self.volatilidade = VolatilidadeIncremental()
+        self.preco_atual = math.nan
+
+    def atualizar(self, preco):
+        preco = float(preco)
+        if not math.isnan(preco):
+            self.preco_atual = preco
+            self.media_curta.atualizar(preco)
+            self.media_longa.atualizar(preco)
+            self.ema.atualizar(preco)
+            self.volatilidade.atualizar(preco)
+        return self.estado()
+
+    # Valores atuais, com as mesmas chaves das colunas de calcular_indicadores (mais a EMA)
+    def estado(self):
+        return {
+            "Preço atual": self.preco_atual,
+            "Média curta": self.media_curta.valor,
+            "Média longa": self.media_longa.valor,
+            "Tendência": classificar_tendencia(self.preco_atual, self.media_curta.valor, self.media_longa.valor),
+            "Volatilidade (%)": self.volatilidade.valor,
+            "EMA": self.ema.valor,
+        }
+
+
+# Consome um fluxo de preços (qualquer iterável, como um gerador de cotações)
+# e devolve, a cada preço, o estado atualizado dos indicadores
+def acompanhar(fluxo, indicadores=None):
+    indicadores = indicadores if indicadores is not None else IndicadoresIncrementais()
+    for preco in fluxo:
+        yield indicadores.atualizar(preco)
+
+
+# Versão assíncrona de acompanhar, para fluxos "async for" (websocket, fila assíncrona etc.)
+async def acompanhar_async(fluxo, indicadores=None):
+    indicadores = indicadores if indicadores is not None else IndicadoresIncrementais()
+    async for preco in fluxo:
+        yield indicadores.atualizar(preco)
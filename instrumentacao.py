@@ -0,0 +1,264 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Instrumentação dos caminhos principais (busca de dados, otimização, simplex):
+# etapas cronometradas, contadores e, opcionalmente, perfil com cProfile e/ou tracemalloc
+# As métricas são do processo (compartilhadas entre reruns e sessões do Streamlit); trabalhos feitos
+# em pools de processos não aparecem aqui
+# Uso:
+#   with etapa("precos.lote"): ...        ou        @etapa("otimizacao.slsqp")
+#   contar("simplex.pivoteamentos", pivos)
+
+# Perfil das etapas de nível mais externo: "" (desligado), "cprofile", "tracemalloc" ou "ambos"
+# (variável de ambiente CN1_PERFIL, ou configurar() em tempo de execução)
+PERFIL = os.environ.get("CN1_PERFIL", "")
+
+# Arquivo em que exportar_json() grava as métricas (variável de ambiente CN1_ARQUIVO_METRICAS)
+ARQUIVO_METRICAS = os.environ.get(
+    "CN1_ARQUIVO_METRICAS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "metricas.json")
+)
+
+# Porta do endpoint Prometheus (/metrics) aberto pelos aplicativos (variável de ambiente CN1_PORTA_METRICAS;
+# sem ela, nenhum servidor é aberto)
+PORTA_METRICAS = int(os.environ["CN1_PORTA_METRICAS"]) if os.environ.get("CN1_PORTA_METRICAS") else None
+
+# Número de linhas guardadas do relatório do cProfile e de locais de alocação do tracemalloc
+LINHAS_PERFIL = 25
+
+
+# Registro das métricas do processo, protegido por uma trava (as etapas podem rodar em threads)
+class Metricas:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        with self._trava:
+            self.contadores = defaultdict(float)
+            self.etapas = {}
+            self.perfis = {}
+
+    def contar(self, nome, valor=1):
+        with self._trava:
+            self.contadores[nome] += valor
+
+    # Acumula a duração de uma etapa: número de chamadas, tempo total, maior e última duração
+    def registrar_etapa(self, nome, segundos):
+        with self._trava:
+            registro = self.etapas.get(nome)
+            if registro is None:
+                registro = self.etapas[nome] = {"chamadas": 0, "total": 0.0, "maximo": 0.0, "ultima": 0.0}
+            registro["chamadas"] += 1
+            registro["total"] += segundos
+            registro["maximo"] = max(registro["maximo"], segundos)
+            registro["ultima"] = segundos
+
+    def registrar_perfil(self, nome, perfil):
+        with self._trava:
+            self.perfis[nome] = perfil
+
+    # Cópia das métricas, com as estatísticas dos caches memorizados (acertos e falhas)
+    def instantaneo(self):
+        from cache import estatisticas_caches
+
+        with self._trava:
+            return {
+                "contadores": dict(self.contadores),
+                "etapas": {nome: dict(registro) for nome, registro in self.etapas.items()},
+                "perfis": dict(self.perfis),
+                "caches": estatisticas_caches(),
+                "gerado_em": time.time(),
+            }
+
+
+METRICAS = Metricas()
+
+# Profundidade de etapas abertas em cada thread: o perfil só envolve a etapa mais externa
+_local = threading.local()
+
+# cProfile e tracemalloc são globais ao processo: um perfil por vez (as outras etapas só são cronometradas)
+_trava_perfil = threading.Lock()
+
+
+def configurar(perfil=None):
+    global PERFIL
+    PERFIL = perfil or ""
+
+
+def contar(nome, valor=1):
+    METRICAS.contar(nome, valor)
+
+
+# Perfil de um trecho: cProfile (funções mais caras por tempo acumulado) e/ou tracemalloc
+# (pico de memória e linhas que mais alocaram); o perfil em texto é guardado em METRICAS.perfis
+# Se outro trecho já estiver sendo perfilado (em outra thread), este só é cronometrado
+@contextmanager
+def _perfilar(nome, modo):
+    if not _trava_perfil.acquire(blocking=False):
+        yield
+        return
+    try:
+        with _perfilar_sozinho(nome, modo):
+            yield
+    finally:
+        _trava_perfil.release()
+
+
+# Liga o cProfile e/ou o tracemalloc em volta do trecho e guarda o resultado
+@contextmanager
+def _perfilar_sozinho(nome, modo):
+    perfilador = None
+    rastreando = False
+    if modo in ("cprofile", "ambos"):
+        import cProfile
+
+        perfilador = cProfile.Profile()
+    if modo in ("tracemalloc", "ambos"):
+        import tracemalloc
+
+        rastreando = not tracemalloc.is_tracing()
+        if rastreando:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    if perfilador is not None:
+        perfilador.enable()
+    try:
+        yield
+    finally:
+        perfil = {}
+        if perfilador is not None:
+            import io
+            import pstats
+
+            perfilador.disable()
+            texto = io.StringIO()
+            pstats.Stats(perfilador, stream=texto).sort_stats("cumulative").print_stats(LINHAS_PERFIL)
+            perfil["cprofile"] = texto.getvalue()
+        if modo in ("tracemalloc", "ambos"):
+            import tracemalloc
+
+            _, pico = tracemalloc.get_traced_memory()
+            estatisticas = tracemalloc.take_snapshot().statistics("lineno")[:LINHAS_PERFIL]
+            perfil["memoria_pico"] = pico
+            perfil["alocacoes"] = [str(estatistica) for estatistica in estatisticas]
+            if rastreando:
+                tracemalloc.stop()
+        METRICAS.registrar_perfil(nome, perfil)
+
+
+# Etapa cronometrada (gerenciador de contexto ou decorador); com perfil ligado, a etapa mais externa
+# de cada thread também é perfilada
+@contextmanager
+def etapa(nome):
+    profundidade = getattr(_local, "profundidade", 0)
+    modo = PERFIL if profundidade == 0 else ""
+    _local.profundidade = profundidade + 1
+    inicio = time.perf_counter()
+    try:
+        if modo:
+            with _perfilar(nome, modo):
+                yield
+        else:
+            yield
+    finally:
+        METRICAS.registrar_etapa(nome, time.perf_counter() - inicio)
+        _local.profundidade = profundidade
+
+
+# Grava as métricas em JSON (de forma atômica, para quem lê o arquivo não pegar uma escrita pela metade)
+def exportar_json(caminho=None):
+    caminho = caminho or ARQUIVO_METRICAS
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    temporario = f"{caminho}.{uuid.uuid4().hex}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(METRICAS.instantaneo(), arquivo, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def _rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Métricas no formato de texto do Prometheus
+def texto_prometheus():
+    metricas = METRICAS.instantaneo()
+    linhas = ["# TYPE cn1_contador_total counter"]
+    linhas += [f'cn1_contador_total{{nome="{_rotulo(nome)}"}} {valor:g}'
+               for nome, valor in sorted(metricas["contadores"].items())]
+    for campo, tipo, nome_metrica in (("chamadas", "counter", "cn1_etapa_chamadas_total"),
+                                      ("total", "counter", "cn1_etapa_segundos_total"),
+                                      ("maximo", "gauge", "cn1_etapa_segundos_maximo"),
+                                      ("ultima", "gauge", "cn1_etapa_segundos_ultima")):
+        linhas.append(f"# TYPE {nome_metrica} {tipo}")
+        linhas += [f'{nome_metrica}{{etapa="{_rotulo(nome)}"}} {registro[campo]:g}'
+                   for nome, registro in sorted(metricas["etapas"].items())]
+    for campo, tipo in (("acertos", "counter"), ("falhas", "counter"), ("itens", "gauge")):
+        nome_metrica = f"cn1_cache_{campo}_total" if tipo == "counter" else f"cn1_cache_{campo}"
+        linhas.append(f"# TYPE {nome_metrica} {tipo}")
+        linhas += [f'{nome_metrica}{{funcao="{_rotulo(nome)}"}} {estatisticas[campo]:g}'
+                   for nome, estatisticas in sorted(metricas["caches"].items())]
+    return "\n".join(linhas) + "\n"
+
+
+_servidores = {}
+_trava_servidores = threading.Lock()
+
+
+# Servidor HTTP em segundo plano com as métricas em /metrics (formato Prometheus)
+# Um servidor por porta no processo: chamadas repetidas (reruns do Streamlit) devolvem o mesmo
+def servir_prometheus(porta=9464, endereco="127.0.0.1"):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Tratador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            corpo = texto_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    with _trava_servidores:
+        if porta not in _servidores:
+            servidor = ThreadingHTTPServer((endereco, porta), Tratador)
+            threading.Thread(target=servidor.serve_forever, daemon=True).start()
+            _servidores[porta] = servidor
+        return _servidores[porta]
+
+
+# Painel de diagnóstico no Streamlit (destino: st, st.sidebar ou um container)
+def mostrar_diagnostico(destino):
+    import pandas as pd
+
+    metricas = METRICAS.instantaneo()
+    destino.subheader("Diagnóstico de desempenho")
+    if metricas["etapas"]:
+        etapas = pd.DataFrame(metricas["etapas"]).T.sort_values("total", ascending=False)
+        destino.write("Etapas (segundos):")
+        destino.dataframe(etapas)
+    if metricas["contadores"]:
+        destino.write("Contadores:")
+        destino.dataframe(pd.Series(metricas["contadores"], name="Valor").sort_index())
+    if metricas["caches"]:
+        destino.write("Caches:")
+        destino.dataframe(pd.DataFrame(metricas["caches"]).T)
+    for nome, perfil in metricas["perfis"].items():
+        expansor = destino.expander(f"Perfil: {nome}")
+        if "memoria_pico" in perfil:
+            expansor.write(f"Pico de memória: {perfil['memoria_pico'] / 2**20:.1f} MiB")
+            expansor.code("\n".join(perfil["alocacoes"]))
+        if "cprofile" in perfil:
+            expansor.code(perfil["cprofile"])
+    return metricas
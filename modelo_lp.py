@@ -0,0 +1,659 @@
+import gzip
+import io
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from instrumentacao import contar, etapa
+
+# Modelos de programação linear para o simplex: montagem programática (ModeloLP) e leitura de arquivos
+# MPS, CSV de coordenadas e NumPy (.npz), inclusive compactados com gzip
+# Os coeficientes são guardados como triplas (restrição, variável, valor) em vetores NumPy que crescem
+# por blocos; os arquivos são lidos em blocos (nunca inteiros na memória) e a matriz esparsa só é montada
+# uma vez, em para_simplex(), no formato que simplex_method recebe
+# Uso:
+#   modelo = ModeloLP()
+#   x = modelo.adicionar_variavel("x", custo=3)
+#   y = modelo.adicionar_variavel("y", custo=5, superior=4)
+#   modelo.adicionar_restricao({"x": 1, "y": 2}, "<=", 14, nome="horas")
+#   solucao = modelo.resolver()
+# ou: solucao = ler_modelo("problema.mps").resolver()
+
+# Sentidos das restrições (na ordem dos códigos guardados em ModeloLP)
+SENTIDOS = ("<=", ">=", "=")
+_CODIGOS = {"<=": 0, ">=": 1, "=": 2, "=<": 0, "=>": 1, "==": 2, "L": 0, "G": 1, "E": 2}
+
+# Custo das variáveis artificiais (Big-M) por unidade do maior custo do modelo, ver ModeloLP.para_simplex
+PENALIDADE_ARTIFICIAL = 1e6
+
+# Linhas de coeficientes acumuladas antes de passar para os vetores NumPy (MPS) e linhas lidas por bloco (CSV)
+LINHAS_POR_BLOCO = 500_000
+
+# Nomes especiais do CSV de coordenadas (colunas linha, coluna, valor e, opcionalmente, sentido):
+#   linha "objetivo": custo da variável da coluna
+#   linha "inferior" / "superior": limites da variável da coluna
+#   coluna "lado_direito": lado direito da restrição da linha (com o sentido na coluna "sentido"; padrão <=)
+OBJETIVO = "objetivo"
+INFERIOR = "inferior"
+SUPERIOR = "superior"
+LADO_DIREITO = "lado_direito"
+
+
+# Vetor NumPy que cresce dobrando de tamanho (acréscimos em blocos sem realocar a cada item)
+class _Vetor:
+    def __init__(self, dtype):
+        self.dados = np.empty(1024, dtype=dtype)
+        self.tamanho = 0
+
+    def __len__(self):
+        return self.tamanho
+
+    # Acrescenta os valores e devolve o intervalo de índices ocupado por eles
+    def acrescentar(self, valores):
+        valores = np.asarray(valores, dtype=self.dados.dtype).ravel()
+        fim = self.tamanho + len(valores)
+        if fim > len(self.dados):
+            novos = np.empty(max(fim, 2 * len(self.dados)), dtype=self.dados.dtype)
+            novos[:self.tamanho] = self.dados[:self.tamanho]
+            self.dados = novos
+        self.dados[self.tamanho:fim] = valores
+        inicio, self.tamanho = self.tamanho, fim
+        return np.arange(inicio, fim)
+
+    @property
+    def valores(self):
+        return self.dados[:self.tamanho]
+
+
+# Acrescenta os nomes ao índice nome -> posição (a partir de inicio), recusando nomes repetidos
+def _registrar_nomes(indice, nomes, inicio, tipo):
+    novos = dict(zip(nomes, range(inicio, inicio + len(nomes))))
+    repetidos = [nome for nome in novos if nome in indice] if len(novos) == len(nomes) else \
+        pd.Index(nomes)[pd.Index(nomes).duplicated()].tolist()
+    if repetidos:
+        raise ValueError(f"{tipo} repetida: {repetidos[0]}")
+    indice.update(novos)
+
+
+# Verdadeiro se cada variável artificial chegou ao seu limite r (a restrição original está satisfeita)
+def _artificiais_completas(artificiais, limites, tolerancia=1e-7):
+    return bool(np.all(limites - artificiais <= tolerancia * (1 + limites)))
+
+
+# Solução de um ModeloLP: valores das variáveis e valor do objetivo no sentido do modelo
+# (lucro máximo ou custo mínimo, incluindo a constante do objetivo)
+class SolucaoLP:
+    def __init__(self, valores, objetivo, nomes, maximizar, segundos):
+        self.valores = valores
+        self.objetivo = objetivo
+        self.nomes = nomes
+        self.maximizar = maximizar
+        self.segundos = segundos
+
+    # Variáveis e valores, só as não nulas por padrão (problemas grandes têm muitos zeros)
+    def tabela(self, apenas_nao_nulas=True):
+        indices = np.flatnonzero(np.abs(self.valores) > 1e-12) if apenas_nao_nulas else np.arange(len(self.valores))
+        return pd.DataFrame({"Variável": [self.nomes[i] for i in indices], "Valor": self.valores[indices]})
+
+    def resumo(self):
+        return {
+            "Lucro máximo" if self.maximizar else "Custo mínimo": self.objetivo,
+            "Variáveis não nulas": int(np.count_nonzero(np.abs(self.valores) > 1e-12)),
+            "Tempo (s)": self.segundos,
+        }
+
+
+# Modelo de LP: variáveis (custo e limites), restrições (sentido e lado direito) e coeficientes
+# Variáveis e restrições podem ser referidas pelo nome ou pelo índice
+class ModeloLP:
+    def __init__(self, nome="", maximizar=True):
+        self.nome = nome
+        self.maximizar = maximizar
+        self.constante = 0.0
+        self.nomes_variaveis = []
+        self.nomes_restricoes = []
+        self.inteiras = []
+        self._indice_variavel = {}
+        self._indice_restricao = {}
+        self._custos = _Vetor(np.float64)
+        self._inferiores = _Vetor(np.float64)
+        self._superiores = _Vetor(np.float64)
+        self._sentidos = _Vetor(np.int8)
+        self._lados = _Vetor(np.float64)
+        self._linhas = _Vetor(np.int64)
+        self._colunas = _Vetor(np.int64)
+        self._valores = _Vetor(np.float64)
+
+    @property
+    def num_variaveis(self):
+        return len(self.nomes_variaveis)
+
+    @property
+    def num_restricoes(self):
+        return len(self.nomes_restricoes)
+
+    @property
+    def num_coeficientes(self):
+        return len(self._valores)
+
+    @property
+    def custos(self):
+        return self._custos.valores
+
+    @property
+    def inferiores(self):
+        return self._inferiores.valores
+
+    @property
+    def superiores(self):
+        return self._superiores.valores
+
+    @property
+    def lados_direitos(self):
+        return self._lados.valores
+
+    @property
+    def sentidos(self):
+        return np.array(SENTIDOS)[self._sentidos.valores]
+
+    def variavel(self, nome):
+        return nome if isinstance(nome, (int, np.integer)) else self._indice_variavel[nome]
+
+    def restricao(self, nome):
+        return nome if isinstance(nome, (int, np.integer)) else self._indice_restricao[nome]
+
+    # Acrescenta variáveis em bloco (quantidade ou lista de nomes); custos e limites podem ser escalares
+    # Devolve os índices das novas variáveis
+    def adicionar_variaveis(self, nomes, custos=0.0, inferiores=0.0, superiores=np.inf):
+        inicio = self.num_variaveis
+        if isinstance(nomes, (int, np.integer)):
+            nomes = [f"x{inicio + i + 1}" for i in range(nomes)]
+        nomes = [str(nome) for nome in nomes]
+        _registrar_nomes(self._indice_variavel, nomes, inicio, "Variável")
+        self.nomes_variaveis.extend(nomes)
+        self._custos.acrescentar(np.broadcast_to(np.asarray(custos, dtype=float), len(nomes)))
+        self._inferiores.acrescentar(np.broadcast_to(np.asarray(inferiores, dtype=float), len(nomes)))
+        return self._superiores.acrescentar(np.broadcast_to(np.asarray(superiores, dtype=float), len(nomes)))
+
+    def adicionar_variavel(self, nome=None, custo=0.0, inferior=0.0, superior=np.inf):
+        return int(self.adicionar_variaveis([nome] if nome is not None else 1, custo, inferior, superior)[0])
+
+    # Acrescenta restrições em bloco, sem coeficientes (ver adicionar_coeficientes); devolve os índices
+    def adicionar_restricoes(self, nomes, sentidos="<=", lados_direitos=0.0):
+        inicio = self.num_restricoes
+        if isinstance(nomes, (int, np.integer)):
+            nomes = [f"r{inicio + i + 1}" for i in range(nomes)]
+        nomes = [str(nome) for nome in nomes]
+        if isinstance(sentidos, str):
+            sentidos = [sentidos]
+        try:
+            codigos = [_CODIGOS[sentido] for sentido in sentidos]
+        except KeyError as erro:
+            raise ValueError(f"Sentido de restrição desconhecido: {erro.args[0]}") from None
+        _registrar_nomes(self._indice_restricao, nomes, inicio, "Restrição")
+        self.nomes_restricoes.extend(nomes)
+        self._sentidos.acrescentar(np.broadcast_to(np.asarray(codigos, dtype=np.int8), len(nomes)))
+        return self._lados.acrescentar(np.broadcast_to(np.asarray(lados_direitos, dtype=float), len(nomes)))
+
+    # Acrescenta uma restrição; coeficientes: {variável: valor} ou par (variáveis, valores)
+    def adicionar_restricao(self, coeficientes, sentido="<=", lado_direito=0.0, nome=None):
+        linha = int(self.adicionar_restricoes([nome] if nome is not None else 1, sentido, lado_direito)[0])
+        variaveis, valores = (zip(*coeficientes.items()) if coeficientes else ((), ())) \
+            if isinstance(coeficientes, dict) else coeficientes
+        colunas = [self.variavel(variavel) for variavel in variaveis]
+        self.adicionar_coeficientes(np.full(len(colunas), linha), colunas, valores)
+        return linha
+
+    # Acrescenta coeficientes em bloco como triplas de índices (restrição, variável, valor)
+    # Coeficientes repetidos para o mesmo par são somados na montagem da matriz
+    def adicionar_coeficientes(self, linhas, colunas, valores):
+        linhas = np.asarray(linhas, dtype=np.int64).ravel()
+        colunas = np.asarray(colunas, dtype=np.int64).ravel()
+        valores = np.asarray(valores, dtype=float).ravel()
+        if not len(linhas) == len(colunas) == len(valores):
+            raise ValueError("linhas, colunas e valores devem ter o mesmo tamanho.")
+        if len(linhas) and (linhas.min() < 0 or linhas.max() >= self.num_restricoes
+                            or colunas.min() < 0 or colunas.max() >= self.num_variaveis):
+            raise ValueError("Coeficiente fora das restrições ou variáveis do modelo.")
+        self._linhas.acrescentar(linhas)
+        self._colunas.acrescentar(colunas)
+        self._valores.acrescentar(valores)
+
+    # Matriz de coeficientes (restrições x variáveis) em CSR
+    def matriz(self):
+        return sp.csr_matrix((self._valores.valores, (self._linhas.valores, self._colunas.valores)),
+                             shape=(self.num_restricoes, self.num_variaveis))
+
+    # Modelo a partir de uma matriz de coeficientes (lista, array ou scipy.sparse), lados direitos e sentidos
+    @classmethod
+    def de_matriz(cls, c, A, b, sentidos="<=", maximizar=True):
+        modelo = cls(maximizar=maximizar)
+        c = np.asarray(c, dtype=float).ravel()
+        modelo.adicionar_variaveis(len(c), c)
+        A = sp.coo_matrix(A if sp.issparse(A) else np.asarray(A, dtype=float).reshape(-1, len(c)))
+        linhas = modelo.adicionar_restricoes(A.shape[0], sentidos, np.asarray(b, dtype=float).ravel())
+        modelo.adicionar_coeficientes(linhas[A.row], A.col, A.data)
+        return modelo
+
+    # Converte para os blocos de simplex_method (c, A_eq, b_eq, A_ineq, b_ineq), com matrizes CSR:
+    # - minimização vira maximização de -c
+    # - limites inferiores finitos são deslocados para zero (x = x' + inferior)
+    # - restrições >= são multiplicadas por -1, restrições = viram um par <= e >=, e limites superiores
+    #   finitos viram restrições <=
+    # - o simplex parte da origem (base de folgas), então as linhas que a origem não satisfaz (>= com lado
+    #   direito positivo, <= com lado direito negativo e = com lado direito não nulo), escritas como
+    #   g.x >= r com r > 0, ganham uma variável artificial u (Big-M): -g.x + u <= 0 e u <= r, com custo
+    #   penalidade por unidade. A origem (x = 0, u = 0) é viável e, se o modelo for viável e a penalidade
+    #   bastar, o ótimo tem u = r, ou seja, g.x >= r (ver resolver). As artificiais vêm depois das variáveis
+    # Todas as linhas vão para o bloco A_eq, o único cujas folgas voltam à base (ver _juntar_restricoes
+    # em simplex.py); A_ineq fica vazia
+    def para_simplex(self, penalidade=None):
+        inferiores, superiores = self.inferiores, self.superiores
+        livres = np.flatnonzero(~np.isfinite(inferiores))
+        if len(livres):
+            nomes = ", ".join(self.nomes_variaveis[j] for j in livres[:5])
+            raise ValueError(f"O simplex só trata variáveis com limite inferior finito (ex.: {nomes}).")
+
+        limitadas = np.flatnonzero(np.isfinite(superiores))
+        folgas_limites = superiores[limitadas] - inferiores[limitadas]
+        invertidas = limitadas[folgas_limites < 0]
+        if len(invertidas):
+            nomes = ", ".join(self.nomes_variaveis[j] for j in invertidas[:5])
+            raise ValueError(f"Limite superior menor que o inferior (ex.: {nomes}).")
+
+        A = self.matriz()
+        b = self.lados_direitos - A @ inferiores if inferiores.any() else self.lados_direitos.copy()
+        b[np.abs(b) <= 1e-12] = 0.0
+        codigos = self._sentidos.valores
+        sem_maior, sem_menor = codigos != _CODIGOS[">="], codigos != _CODIGOS["<="]
+
+        # Linhas <= como estão e >= com sinal trocado, quando a origem as satisfaz (= entra nas duas)
+        menores = np.flatnonzero(sem_maior & (b >= 0))
+        maiores = np.flatnonzero(sem_menor & (b <= 0))
+        # Linhas g.x >= r com r > 0, que precisam de artificial
+        negativas = np.flatnonzero(sem_maior & (b < 0))
+        positivas = np.flatnonzero(sem_menor & (b > 0))
+
+        n, k = self.num_variaveis, len(negativas) + len(positivas)
+        A_limites = sp.csr_matrix((np.ones(len(limitadas)), (np.arange(len(limitadas)), limitadas)),
+                                  shape=(len(limitadas), n))
+        A_eq = sp.vstack([A[menores], -A[maiores], A_limites], format="csr")
+        b_eq = np.concatenate([b[menores], -b[maiores], folgas_limites])
+        c = self.custos if self.maximizar else -self.custos
+        if not k:
+            return c.copy(), A_eq, b_eq, sp.csr_matrix((0, n)), np.empty(0)
+
+        contar("modelo_lp.artificiais", k)
+        if penalidade is None:
+            penalidade = PENALIDADE_ARTIFICIAL * max(1.0, float(np.abs(c).max(initial=0.0)))
+        G = sp.vstack([-A[negativas], A[positivas]], format="csr")
+        r = np.concatenate([-b[negativas], b[positivas]])
+        identidade = sp.identity(k, format="csr")
+        A_eq = sp.vstack([
+            sp.hstack([A_eq, sp.csr_matrix((A_eq.shape[0], k))]),
+            sp.hstack([-G, identidade]),
+            sp.hstack([sp.csr_matrix((k, n)), identidade]),
+        ], format="csr")
+        b_eq = np.concatenate([b_eq, np.zeros(k), r])
+        c = np.concatenate([c, np.full(k, penalidade)])
+        return c, A_eq, b_eq, sp.csr_matrix((0, n + k)), np.empty(0)
+
+    # Resolve com simplex_method e devolve a solução nas variáveis originais
+    # (o objetivo é recalculado a partir dos valores, no sentido do modelo)
+    # Com artificiais, o ótimo só vale se todas chegaram ao lado direito r; se não chegaram, uma fase 1
+    # (maximizar só as artificiais) diz se o modelo é inviável ou se a penalidade foi pequena, e nesse caso
+    # ela é multiplicada por 1000 e o modelo é resolvido de novo
+    def resolver(self, modo="auto"):
+        from simplex import simplex_method
+
+        inicio = time.perf_counter()
+        n = self.num_variaveis
+        penalidade = None
+        for _ in range(4):
+            c, A_eq, b_eq, A_ineq, b_ineq = self.para_simplex(penalidade)
+            solucao, _ = simplex_method(c, A_eq, b_eq, A_ineq, b_ineq, modo=modo)
+            solucao = np.asarray(solucao, dtype=float)
+            k = len(c) - n
+            if not k or _artificiais_completas(solucao[n:], b_eq[-k:]):
+                break
+            fase1 = np.zeros(len(c))
+            fase1[n:] = 1.0
+            viavel, _ = simplex_method(fase1, A_eq, b_eq, A_ineq, b_ineq, modo=modo)
+            if not _artificiais_completas(np.asarray(viavel, dtype=float)[n:], b_eq[-k:]):
+                raise ValueError("O modelo é inviável: nenhuma solução satisfaz todas as restrições.")
+            penalidade = c[n] * 1000
+        else:
+            raise ValueError("A penalidade das variáveis artificiais não bastou; reescale o modelo.")
+        valores = solucao[:n] + self.inferiores
+        objetivo = float(self.custos @ valores + self.constante)
+        return SolucaoLP(valores, objetivo, self.nomes_variaveis, self.maximizar, time.perf_counter() - inicio)
+
+    def resumo(self):
+        codigos = self._sentidos.valores
+        celulas = self.num_variaveis * self.num_restricoes
+        return {
+            "Objetivo": "maximizar" if self.maximizar else "minimizar",
+            "Variáveis": self.num_variaveis,
+            "Restrições": self.num_restricoes,
+            **{f"Restrições {sentido}": int(np.count_nonzero(codigos == i)) for i, sentido in enumerate(SENTIDOS)},
+            "Coeficientes não nulos": self.num_coeficientes,
+            "Densidade (%)": 100 * self.num_coeficientes / celulas if celulas else 0.0,
+            "Limites superiores": int(np.isfinite(self.superiores).sum()),
+            "Variáveis inteiras (relaxadas)": len(self.inteiras),
+        }
+
+    # Grava o modelo em .npz (triplas de coeficientes e nomes), relido rapidamente por ler_npz
+    def salvar_npz(self, caminho):
+        np.savez(caminho, c=self.custos, linhas=self._linhas.valores, colunas=self._colunas.valores,
+                 valores=self._valores.valores, sentidos=self._sentidos.valores, lados=self.lados_direitos,
+                 inferiores=self.inferiores, superiores=self.superiores, maximizar=self.maximizar,
+                 constante=self.constante, inteiras=np.asarray(self.inteiras, dtype=np.int64),
+                 nomes_variaveis=np.asarray(self.nomes_variaveis, dtype=str),
+                 nomes_restricoes=np.asarray(self.nomes_restricoes, dtype=str))
+
+    # Grava o modelo no CSV de coordenadas lido por ler_csv (sem a constante do objetivo)
+    def salvar_csv(self, caminho):
+        A = self.matriz().tocoo()
+        variaveis, restricoes = np.asarray(self.nomes_variaveis), np.asarray(self.nomes_restricoes)
+        limitadas = np.flatnonzero(np.isfinite(self.superiores))
+        deslocadas = np.flatnonzero(self.inferiores)
+        partes = [
+            pd.DataFrame({"linha": OBJETIVO, "coluna": variaveis, "valor": self.custos}),
+            pd.DataFrame({"linha": restricoes[A.row], "coluna": variaveis[A.col], "valor": A.data}),
+            pd.DataFrame({"linha": restricoes, "coluna": LADO_DIREITO, "valor": self.lados_direitos,
+                          "sentido": self.sentidos}),
+            pd.DataFrame({"linha": SUPERIOR, "coluna": variaveis[limitadas], "valor": self.superiores[limitadas]}),
+            pd.DataFrame({"linha": INFERIOR, "coluna": variaveis[deslocadas], "valor": self.inferiores[deslocadas]}),
+        ]
+        pd.concat(partes, ignore_index=True)[["linha", "coluna", "valor", "sentido"]].to_csv(caminho, index=False)
+
+    # Grava o modelo em MPS livre (colunas em ordem, como o formato exige)
+    def salvar_mps(self, caminho):
+        A = self.matriz().tocsc()
+        sentidos = "LGE"
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            arquivo.write(f"NAME {self.nome or 'MODELO'}\n")
+            if self.maximizar:
+                arquivo.write("OBJSENSE\n    MAX\n")
+            arquivo.write("ROWS\n N OBJ\n")
+            arquivo.writelines(f" {sentidos[codigo]} {nome}\n"
+                               for codigo, nome in zip(self._sentidos.valores, self.nomes_restricoes))
+            arquivo.write("COLUMNS\n")
+            for j, nome in enumerate(self.nomes_variaveis):
+                if self.custos[j]:
+                    arquivo.write(f"    {nome} OBJ {self.custos[j]:.17g}\n")
+                inicio, fim = A.indptr[j], A.indptr[j + 1]
+                arquivo.writelines(f"    {nome} {self.nomes_restricoes[i]} {valor:.17g}\n"
+                                   for i, valor in zip(A.indices[inicio:fim], A.data[inicio:fim]))
+            arquivo.write("RHS\n")
+            if self.constante:
+                arquivo.write(f"    RHS OBJ {-self.constante:.17g}\n")
+            arquivo.writelines(f"    RHS {self.nomes_restricoes[i]} {self.lados_direitos[i]:.17g}\n"
+                               for i in np.flatnonzero(self.lados_direitos))
+            arquivo.write("BOUNDS\n")
+            for j, nome in enumerate(self.nomes_variaveis):
+                inferior, superior = self.inferiores[j], self.superiores[j]
+                if inferior == superior:
+                    arquivo.write(f" FX BND {nome} {inferior:.17g}\n")
+                    continue
+                if inferior == -np.inf:
+                    arquivo.write(f" MI BND {nome}\n")
+                elif inferior:
+                    arquivo.write(f" LO BND {nome} {inferior:.17g}\n")
+                if superior != np.inf:
+                    arquivo.write(f" UP BND {nome} {superior:.17g}\n")
+            arquivo.write("ENDATA\n")
+
+
+# Abre um caminho, bytes ou arquivo aberto como fluxo binário, descompactando gzip se preciso
+# (detectado pelos dois primeiros bytes, não pela extensão); só fecha o que ele mesmo abriu
+@contextmanager
+def _abrir_binario(arquivo):
+    if isinstance(arquivo, (bytes, bytearray, memoryview)):
+        fluxo = io.BytesIO(arquivo)
+    elif isinstance(arquivo, (str, os.PathLike)):
+        fluxo = open(arquivo, "rb")
+    else:
+        fluxo = arquivo
+    try:
+        inicio = fluxo.read(2)
+        fluxo.seek(0)
+        yield gzip.GzipFile(fileobj=fluxo) if inicio == b"\x1f\x8b" else fluxo
+    finally:
+        if fluxo is not arquivo:
+            fluxo.close()
+
+
+# Lê um MPS (formato livre: campos separados por espaços, nomes sem espaços), linha a linha
+# Seções aceitas: NAME, OBJSENSE, ROWS, COLUMNS, RHS, BOUNDS e ENDATA; RANGES não é suportada
+# Marcadores de variáveis inteiras e limites BV/LI/UI são lidos, mas o problema é resolvido relaxado
+# Sem OBJSENSE, o objetivo é de minimização (padrão do formato)
+@etapa("modelo_lp.ler_mps")
+def ler_mps(arquivo):
+    modelo = ModeloLP(maximizar=False)
+    objetivo = None
+    secao = None
+    inteiras = False
+    linhas, colunas, valores = [], [], []
+    indice_restricao = modelo._indice_restricao
+    custos = {}
+    sentidos_linhas = []
+    # Variáveis novas do bloco, criadas de uma vez junto com os coeficientes
+    indice_variavel = {}
+    pendentes = []
+
+    def descarregar():
+        modelo.adicionar_variaveis(pendentes)
+        pendentes.clear()
+        modelo.adicionar_coeficientes(linhas, colunas, valores)
+        contar("modelo_lp.coeficientes", len(valores))
+        linhas.clear()
+        colunas.clear()
+        valores.clear()
+
+    with _abrir_binario(arquivo) as fluxo:
+        for numero, bruto in enumerate(fluxo, start=1):
+            texto = bruto.decode("utf-8", "replace")
+            if not texto.strip() or texto.startswith("*"):
+                continue
+            campos = texto.split()
+            if not texto[0].isspace():
+                if secao == "COLUMNS":
+                    descarregar()
+                secao = campos[0].upper()
+                if secao == "NAME":
+                    modelo.nome = campos[1] if len(campos) > 1 else ""
+                elif secao == "OBJSENSE" and len(campos) > 1:
+                    modelo.maximizar = campos[1].upper().startswith("MAX")
+                elif secao == "RANGES":
+                    raise ValueError("Seção RANGES do MPS não é suportada.")
+                elif secao == "ENDATA":
+                    break
+                elif secao == "COLUMNS":
+                    # Todas as restrições são criadas de uma vez, antes dos coeficientes
+                    nomes, sentidos = zip(*sentidos_linhas) if sentidos_linhas else ((), ())
+                    modelo.adicionar_restricoes(list(nomes), list(sentidos))
+                elif secao not in ("OBJSENSE", "ROWS", "RHS", "BOUNDS"):
+                    raise ValueError(f"Linha {numero}: seção desconhecida do MPS: {secao}")
+                continue
+
+            try:
+                if secao == "OBJSENSE":
+                    modelo.maximizar = campos[0].upper().startswith("MAX")
+                elif secao == "ROWS":
+                    if campos[0].upper() == "N":
+                        # Só a primeira linha N é o objetivo; as demais são ignoradas
+                        objetivo = objetivo or campos[1]
+                    else:
+                        sentidos_linhas.append((campos[1], campos[0].upper()))
+                elif secao == "COLUMNS":
+                    if len(campos) >= 3 and campos[1].strip("'\"").upper() == "MARKER":
+                        inteiras = campos[2].strip("'\"").upper() == "INTORG"
+                        continue
+                    j = indice_variavel.get(campos[0])
+                    if j is None:
+                        j = indice_variavel[campos[0]] = len(indice_variavel)
+                        pendentes.append(campos[0])
+                        if inteiras:
+                            modelo.inteiras.append(j)
+                    for restricao, valor in zip(campos[1::2], campos[2::2]):
+                        if restricao == objetivo:
+                            custos[j] = float(valor)
+                        elif restricao in indice_restricao:
+                            linhas.append(indice_restricao[restricao])
+                            colunas.append(j)
+                            valores.append(float(valor))
+                    if len(valores) >= LINHAS_POR_BLOCO:
+                        descarregar()
+                elif secao == "RHS":
+                    # O nome do vetor (primeiro campo) é opcional no formato livre
+                    pares = campos[1:] if len(campos) % 2 else campos
+                    for restricao, valor in zip(pares[::2], pares[1::2]):
+                        if restricao == objetivo:
+                            modelo.constante = -float(valor)
+                        elif restricao in indice_restricao:
+                            modelo._lados.dados[indice_restricao[restricao]] = float(valor)
+                elif secao == "BOUNDS":
+                    tipo = campos[0].upper()
+                    if tipo in ("FR", "MI", "PL", "BV"):
+                        nome, valor = campos[2] if len(campos) > 2 else campos[1], None
+                    else:
+                        nome, valor = campos[-2], float(campos[-1])
+                    _aplicar_limite(modelo, modelo.variavel(nome), tipo, valor)
+            except (IndexError, KeyError, ValueError):
+                raise ValueError(f"Linha {numero} do MPS inválida ({secao}): {texto.strip()}") from None
+
+    if secao is None:
+        raise ValueError("Arquivo MPS vazio.")
+    if valores or pendentes:
+        descarregar()
+    if custos:
+        modelo._custos.dados[list(custos)] = list(custos.values())
+    return modelo
+
+
+# Aplica um limite da seção BOUNDS do MPS à variável j
+def _aplicar_limite(modelo, j, tipo, valor):
+    inferiores, superiores = modelo._inferiores.dados, modelo._superiores.dados
+    if tipo in ("UP", "UI"):
+        superiores[j] = valor
+    elif tipo in ("LO", "LI"):
+        inferiores[j] = valor
+    elif tipo == "FX":
+        inferiores[j] = superiores[j] = valor
+    elif tipo == "FR":
+        inferiores[j], superiores[j] = -np.inf, np.inf
+    elif tipo == "MI":
+        inferiores[j] = -np.inf
+    elif tipo == "PL":
+        superiores[j] = np.inf
+    elif tipo == "BV":
+        inferiores[j], superiores[j] = 0.0, 1.0
+    else:
+        raise ValueError(f"Limite desconhecido: {tipo}")
+    if tipo in ("UI", "LI", "BV") and j not in modelo.inteiras:
+        modelo.inteiras.append(j)
+
+
+# Índices dos nomes (criando as variáveis ou restrições que ainda não existem), processando cada nome
+# distinto do bloco uma única vez
+def _indices_criando(nomes, indice, criar):
+    codigos, unicos = pd.factorize(nomes)
+    novos = [nome for nome in unicos if nome not in indice]
+    if novos:
+        criar(novos)
+    return np.array([indice[nome] for nome in unicos], dtype=np.int64)[codigos]
+
+
+# Lê um CSV de coordenadas (colunas linha, coluna, valor e, opcionalmente, sentido) em blocos de
+# linhas_por_bloco linhas; variáveis e restrições são criadas na ordem em que aparecem
+# Nomes especiais: ver OBJETIVO, INFERIOR, SUPERIOR e LADO_DIREITO
+@etapa("modelo_lp.ler_csv")
+def ler_csv(arquivo, maximizar=True, linhas_por_bloco=LINHAS_POR_BLOCO):
+    modelo = ModeloLP(maximizar=maximizar)
+    with _abrir_binario(arquivo) as fluxo, pd.read_csv(
+            fluxo, chunksize=linhas_por_bloco, skipinitialspace=True,
+            dtype={"linha": str, "coluna": str, "valor": float, "sentido": str}) as blocos:
+        for bloco in blocos:
+            _ler_bloco_csv(modelo, bloco)
+    return modelo
+
+
+# Acrescenta ao modelo um bloco do CSV de coordenadas
+def _ler_bloco_csv(modelo, bloco):
+    faltando = {"linha", "coluna", "valor"} - set(bloco.columns)
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes no CSV: {', '.join(sorted(faltando))}")
+    linha, coluna, valor = bloco["linha"].to_numpy(), bloco["coluna"].to_numpy(), bloco["valor"].to_numpy()
+    if pd.isna(valor).any():
+        raise ValueError("O CSV tem valores vazios ou não numéricos.")
+
+    lados = coluna == LADO_DIREITO
+    variaveis = ~lados & np.isin(linha, [OBJETIVO, INFERIOR, SUPERIOR])
+    coeficientes = ~lados & ~variaveis
+    criar_variaveis, criar_restricoes = modelo.adicionar_variaveis, modelo.adicionar_restricoes
+
+    j = _indices_criando(coluna[coeficientes], modelo._indice_variavel, criar_variaveis)
+    i = _indices_criando(linha[coeficientes], modelo._indice_restricao, criar_restricoes)
+    modelo.adicionar_coeficientes(i, j, valor[coeficientes])
+    contar("modelo_lp.coeficientes", len(j))
+
+    for nome, vetor in ((OBJETIVO, modelo._custos), (INFERIOR, modelo._inferiores),
+                        (SUPERIOR, modelo._superiores)):
+        selecao = variaveis & (linha == nome)
+        if selecao.any():
+            vetor.dados[_indices_criando(coluna[selecao], modelo._indice_variavel, criar_variaveis)] = \
+                valor[selecao]
+
+    if lados.any():
+        i = _indices_criando(linha[lados], modelo._indice_restricao, criar_restricoes)
+        modelo._lados.dados[i] = valor[lados]
+        if "sentido" in bloco.columns:
+            sentidos = bloco["sentido"].to_numpy()[lados]
+            informados = ~pd.isna(sentidos)
+            try:
+                codigos = [_CODIGOS[sentido.strip()] for sentido in sentidos[informados]]
+            except KeyError as erro:
+                raise ValueError(f"Sentido de restrição desconhecido: {erro.args[0]}") from None
+            modelo._sentidos.dados[i[informados]] = codigos
+
+
+# Lê um .npz: o gravado por ModeloLP.salvar_npz (triplas) ou o dos jobs da CLI (c, A_eq, b_eq, A_ineq e
+# b_ineq densos), cujas linhas dos dois blocos viram restrições <=
+@etapa("modelo_lp.ler_npz")
+def ler_npz(arquivo, maximizar=True):
+    with _abrir_binario(arquivo) as fluxo, np.load(fluxo) as dados:
+        if "valores" not in dados:
+            c = np.asarray(dados["c"], dtype=float)
+            blocos = [(np.asarray(dados[A], dtype=float).reshape(-1, len(c)), np.asarray(dados[b], dtype=float).ravel())
+                      for A, b in (("A_eq", "b_eq"), ("A_ineq", "b_ineq")) if A in dados]
+            A = np.vstack([A for A, _ in blocos]) if blocos else np.empty((0, len(c)))
+            b = np.concatenate([b for _, b in blocos]) if blocos else np.empty(0)
+            return ModeloLP.de_matriz(c, A, b, "<=", maximizar)
+        modelo = ModeloLP(maximizar=bool(dados["maximizar"]))
+        modelo.adicionar_variaveis(dados["nomes_variaveis"].tolist(), dados["c"], dados["inferiores"],
+                                   dados["superiores"])
+        modelo.adicionar_restricoes(dados["nomes_restricoes"].tolist(), "<=", dados["lados"])
+        modelo._sentidos.dados[:modelo.num_restricoes] = dados["sentidos"]
+        modelo.adicionar_coeficientes(dados["linhas"], dados["colunas"], dados["valores"])
+        modelo.constante = float(dados["constante"])
+        modelo.inteiras = dados["inteiras"].tolist()
+        return modelo
+
+
+# Lê um modelo pelo formato (extensão do nome, ignorando .gz): .mps, .csv ou .npz
+# arquivo pode ser um caminho, bytes ou um arquivo aberto em modo binário (nesse caso, informe nome)
+# maximizar vale para CSV e para o .npz de simplex_method (o MPS traz o próprio sentido)
+def ler_modelo(arquivo, nome=None, maximizar=True):
+    nome = str(nome or getattr(arquivo, "name", None) or arquivo).lower().removesuffix(".gz")
+    if nome.endswith(".mps"):
+        return ler_mps(arquivo)
+    if nome.endswith(".csv"):
+        return ler_csv(arquivo, maximizar)
+    if nome.endswith(".npz"):
+        return ler_npz(arquivo, maximizar)
+    raise ValueError(f"Formato de modelo desconhecido: {nome} (use .mps, .csv ou .npz)")
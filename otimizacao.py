@@ -0,0 +1,187 @@
+import numpy as np
+
+from covariancia import estimar_covariancia
+from instrumentacao import contar, etapa
+
+# Número de dias úteis em um ano
+DIAS_UTEIS = 252
+
+# Taxa livre de risco anual usada no índice de Sharpe (exemplo: 5% ao ano)
+TAXA_LIVRE_DE_RISCO = 0.05
+
+
+# Estatísticas da carteira calculadas uma única vez a partir dos preços:
+# retornos médios anualizados e matriz de covariância anualizada, em arrays NumPy
+class EstatisticasCarteira:
+    def __init__(self, retornos_diarios_medios, covariancia_diaria, tickers=None):
+        self.retornos_anuais = np.asarray(retornos_diarios_medios, dtype=float) * DIAS_UTEIS
+        self.covariancia_anual = np.asarray(covariancia_diaria, dtype=float) * DIAS_UTEIS
+        self.tickers = list(tickers) if tickers is not None else list(range(len(self.retornos_anuais)))
+
+    # Mesmas estatísticas que calculate_sharpe_ratio calculava a cada chamada
+    # estimador escolhe a covariância (ver covariancia.ESTIMADORES); "amostral" é igual a daily_returns.cov()
+    @classmethod
+    def de_precos(cls, df_prices, estimador="amostral", **opcoes):
+        daily_returns = df_prices.pct_change()
+        return cls.de_retornos(daily_returns.to_numpy(dtype=float), df_prices.columns, estimador, **opcoes)
+
+    # Mesmas estatísticas a partir de retornos diários já calculados (dias x ativos, NaN onde falta dado),
+    # como os do painel alinhado (alinhamento.PainelAlinhado); a média de cada ativo usa os dias com dado
+    @classmethod
+    def de_retornos(cls, retornos, tickers=None, estimador="amostral", **opcoes):
+        with etapa("otimizacao.estatisticas"):
+            retornos = np.asarray(retornos, dtype=float)
+            validos = ~np.isnan(retornos)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                medias = np.where(validos, retornos, 0.0).sum(axis=0) / validos.sum(axis=0)
+            return cls(medias, estimar_covariancia(retornos, estimador, **opcoes), tickers)
+
+    @property
+    def num_ativos(self):
+        return len(self.retornos_anuais)
+
+    # Estatísticas só dos ativos em indices, recortadas das já calculadas (sem voltar aos preços)
+    def subconjunto(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        return EstatisticasCarteira(self.retornos_anuais[indices] / DIAS_UTEIS,
+                                    self.covariancia_anual[np.ix_(indices, indices)] / DIAS_UTEIS,
+                                    [self.tickers[i] for i in indices])
+
+    # Retorno e volatilidade anualizados da carteira
+    def retorno_e_volatilidade(self, pesos):
+        pesos = np.asarray(pesos, dtype=float)
+        retorno = self.retornos_anuais @ pesos
+        volatilidade = np.sqrt(pesos @ self.covariancia_anual @ pesos)
+        return retorno, volatilidade
+
+    # Índice de Sharpe da carteira
+    def sharpe(self, pesos, taxa_livre_de_risco=TAXA_LIVRE_DE_RISCO):
+        retorno, volatilidade = self.retorno_e_volatilidade(pesos)
+        return (retorno - taxa_livre_de_risco) / volatilidade
+
+    # Índice de Sharpe e seu gradiente analítico em relação aos pesos:
+    # dS/dw = mu / sigma - (mu.w - rf) * (Sigma w) / sigma^3
+    def sharpe_e_gradiente(self, pesos, taxa_livre_de_risco=TAXA_LIVRE_DE_RISCO):
+        pesos = np.asarray(pesos, dtype=float)
+        sigma_w = self.covariancia_anual @ pesos
+        volatilidade = np.sqrt(pesos @ sigma_w)
+        excesso = self.retornos_anuais @ pesos - taxa_livre_de_risco
+        sharpe = excesso / volatilidade
+        gradiente = self.retornos_anuais / volatilidade - excesso * sigma_w / volatilidade ** 3
+        return sharpe, gradiente
+
+
+# Contadores de uma execução do SLSQP: iterações e avaliações do objetivo e do gradiente
+def _contar_slsqp(result):
+    contar("otimizacao.execucoes_slsqp")
+    contar("otimizacao.iteracoes", result.nit)
+    contar("otimizacao.avaliacoes_objetivo", result.nfev)
+    contar("otimizacao.avaliacoes_gradiente", result.njev)
+
+
+# Encontra os pesos que maximizam o índice de Sharpe (0 <= peso <= 1, soma dos pesos = 1)
+# O SLSQP recebe o gradiente analítico, em vez de estimá-lo por diferenças finitas
+# limites: um par (mínimo, máximo) para todos os ativos ou uma lista com um par por ativo
+def maximizar_sharpe(estatisticas, taxa_livre_de_risco=TAXA_LIVRE_DE_RISCO, pesos_iniciais=None,
+                     limites=(0, 1), tolerancia=1e-9, max_iteracoes=500):
+    n = estatisticas.num_ativos
+
+    def objetivo(pesos):
+        sharpe, gradiente = estatisticas.sharpe_e_gradiente(pesos, taxa_livre_de_risco)
+        return -sharpe, -gradiente
+
+    # Restrição: a soma dos pesos deve ser igual a 1
+    constraints = ({'type': 'eq', 'fun': lambda pesos: np.sum(pesos) - 1, 'jac': lambda pesos: np.ones(n)})
+    bounds = limites if isinstance(limites, list) else [limites] * n
+    if pesos_iniciais is None:
+        pesos_iniciais = np.ones(n) / n
+
+    from scipy.optimize import minimize  # importação lenta: só quando o otimizador roda
+
+    with etapa("otimizacao.slsqp"):
+        result = minimize(objetivo, pesos_iniciais, jac=True, method='SLSQP', bounds=bounds,
+                          constraints=constraints, options={'ftol': tolerancia, 'maxiter': max_iteracoes})
+    _contar_slsqp(result)
+    return result.x
+
+
+# Avalia várias carteiras de uma vez: W é uma matriz (K x N), uma carteira por linha
+# Devolve arrays com retorno, volatilidade e índice de Sharpe de cada uma das K carteiras
+def avaliar_carteiras(estatisticas, W, taxa_livre_de_risco=TAXA_LIVRE_DE_RISCO):
+    W = np.atleast_2d(np.asarray(W, dtype=float))
+    retornos = W @ estatisticas.retornos_anuais
+    volatilidades = np.sqrt(np.einsum("kn,kn->k", W @ estatisticas.covariancia_anual, W))
+    sharpes = (retornos - taxa_livre_de_risco) / volatilidades
+    return retornos, volatilidades, sharpes
+
+
+# Sorteia carteiras aleatórias (pesos uniformes no simplex) e avalia todas em lotes,
+# mantendo a memória limitada a tamanho_lote x N pesos por vez
+def simular_carteiras_aleatorias(estatisticas, num_carteiras=100_000, semente=None, tamanho_lote=20_000,
+                                 taxa_livre_de_risco=TAXA_LIVRE_DE_RISCO):
+    rng = np.random.default_rng(semente)
+    n = estatisticas.num_ativos
+    retornos = np.empty(num_carteiras)
+    volatilidades = np.empty(num_carteiras)
+    sharpes = np.empty(num_carteiras)
+    melhor_sharpe, melhores_pesos = -np.inf, None
+
+    for inicio in range(0, num_carteiras, tamanho_lote):
+        fim = min(inicio + tamanho_lote, num_carteiras)
+        W = rng.dirichlet(np.ones(n), size=fim - inicio)
+        retornos[inicio:fim], volatilidades[inicio:fim], sharpes[inicio:fim] = avaliar_carteiras(
+            estatisticas, W, taxa_livre_de_risco)
+
+        melhor = np.argmax(sharpes[inicio:fim])
+        if sharpes[inicio + melhor] > melhor_sharpe:
+            melhor_sharpe, melhores_pesos = sharpes[inicio + melhor], W[melhor]
+
+    return retornos, volatilidades, sharpes, melhores_pesos
+
+
+# Minimiza a variância da carteira, opcionalmente exigindo um retorno alvo
+def minimizar_variancia(estatisticas, retorno_alvo=None, pesos_iniciais=None, limites=(0, 1),
+                        tolerancia=1e-10, max_iteracoes=500):
+    n = estatisticas.num_ativos
+    sigma = estatisticas.covariancia_anual
+    mu = estatisticas.retornos_anuais
+
+    def objetivo(pesos):
+        sigma_w = sigma @ pesos
+        return pesos @ sigma_w, 2 * sigma_w
+
+    constraints = [{'type': 'eq', 'fun': lambda pesos: np.sum(pesos) - 1, 'jac': lambda pesos: np.ones(n)}]
+    if retorno_alvo is not None:
+        constraints.append({'type': 'eq', 'fun': lambda pesos: mu @ pesos - retorno_alvo, 'jac': lambda pesos: mu})
+    if pesos_iniciais is None:
+        pesos_iniciais = np.ones(n) / n
+
+    from scipy.optimize import minimize
+
+    with etapa("otimizacao.variancia_minima"):
+        result = minimize(objetivo, pesos_iniciais, jac=True, method='SLSQP', bounds=[limites] * n,
+                          constraints=constraints, options={'ftol': tolerancia, 'maxiter': max_iteracoes})
+    _contar_slsqp(result)
+    return result
+
+
+# Gera a fronteira eficiente: resolve a carteira de variância mínima para cada retorno alvo,
+# partindo sempre da solução do alvo anterior (warm start)
+# Sem alvos informados, usa num_pontos retornos entre a carteira de variância mínima e o maior retorno
+def fronteira_eficiente(estatisticas, retornos_alvo=None, num_pontos=50, limites=(0, 1)):
+    variancia_minima = minimizar_variancia(estatisticas, limites=limites)
+    pesos = variancia_minima.x
+    if retornos_alvo is None:
+        retorno_minimo = estatisticas.retornos_anuais @ pesos
+        retornos_alvo = np.linspace(retorno_minimo, estatisticas.retornos_anuais.max(), num_pontos)
+
+    retornos_alvo = np.asarray(retornos_alvo, dtype=float)
+    W = np.full((len(retornos_alvo), estatisticas.num_ativos), np.nan)
+    for i, alvo in enumerate(retornos_alvo):
+        resultado = minimizar_variancia(estatisticas, alvo, pesos_iniciais=pesos, limites=limites)
+        if resultado.success:
+            pesos = resultado.x
+            W[i] = pesos
+
+    _, volatilidades, _ = avaliar_carteiras(estatisticas, W)
+    return retornos_alvo, volatilidades, W
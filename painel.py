@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# Diretório padrão dos painéis gravados em disco (pode ser trocado pela variável de ambiente CN1_DIR_PAINEIS)
+DIRETORIO_PAINEIS = os.environ.get(
+    "CN1_DIR_PAINEIS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "paineis")
+)
+
+# Painéis mantidos em disco: as chaves mudam com as datas pedidas (e com o dia corrente), então a cada
+# painel novo os menos usados recentemente são apagados. Sessões que estão com um deles mapeado em
+# memória continuam funcionando: o sistema só libera os arquivos quando o último mapeamento é fechado
+PAINEIS_GUARDADOS = 16
+
+
+# Painel compacto de preços (datas x tickers): um único array contíguo (float32 por padrão),
+# um índice de datas e um mapa ticker -> coluna
+# Aberto do disco com abrir(), o array é mapeado em memória (somente leitura): sessões e processos
+# que abrem o mesmo painel compartilham as mesmas páginas do cache do sistema operacional
+class PainelPrecos:
+    def __init__(self, valores, datas, tickers):
+        self.valores = valores
+        self.datas = pd.DatetimeIndex(datas)
+        self.tickers = list(tickers)
+        self._colunas = {ticker: i for i, ticker in enumerate(self.tickers)}
+        if self.valores.shape != (len(self.datas), len(self.tickers)):
+            raise ValueError("Formato dos valores não confere com as datas e os tickers.")
+
+    @classmethod
+    def de_dataframe(cls, df, dtype=np.float32):
+        valores = np.ascontiguousarray(df.to_numpy(dtype=dtype))
+        return cls(valores, df.index, df.columns)
+
+    # Grava o painel em um diretório (valores.npy, datas.npy e tickers.json), de forma atômica
+    def salvar(self, diretorio):
+        temporario = f"{diretorio.rstrip(os.sep)}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(temporario)
+        np.save(os.path.join(temporario, "valores.npy"), np.ascontiguousarray(self.valores))
+        np.save(os.path.join(temporario, "datas.npy"), self.datas.to_numpy(dtype="datetime64[ns]"))
+        with open(os.path.join(temporario, "tickers.json"), "w") as arquivo:
+            json.dump([str(ticker) for ticker in self.tickers], arquivo)
+        shutil.rmtree(diretorio, ignore_errors=True)
+        try:
+            os.replace(temporario, diretorio)
+        except OSError:
+            # Outro processo gravou o mesmo painel ao mesmo tempo: fica valendo o dele
+            shutil.rmtree(temporario, ignore_errors=True)
+            if not os.path.isdir(diretorio):
+                raise
+
+    # Abre um painel gravado, com os valores mapeados em memória (sem ler o arquivo inteiro)
+    @classmethod
+    def abrir(cls, diretorio):
+        valores = np.load(os.path.join(diretorio, "valores.npy"), mmap_mode="r")
+        datas = pd.DatetimeIndex(np.load(os.path.join(diretorio, "datas.npy")))
+        with open(os.path.join(diretorio, "tickers.json")) as arquivo:
+            tickers = json.load(arquivo)
+        return cls(valores, datas, tickers)
+
+    # Interface mínima de DataFrame usada pelas funções de indicadores
+    @property
+    def shape(self):
+        return self.valores.shape
+
+    @property
+    def index(self):
+        return self.datas
+
+    @property
+    def columns(self):
+        return pd.Index(self.tickers)
+
+    def to_numpy(self, dtype=None):
+        return self.valores if dtype is None else np.asarray(self.valores, dtype=dtype)
+
+    # Série de preços de um ticker (visão da coluna, sem cópia)
+    def coluna(self, ticker):
+        return pd.Series(self.valores[:, self._colunas[ticker]], index=self.datas, name=ticker, copy=False)
+
+    # Sub-painel das datas em [inicio, fim): as linhas são contíguas, então é uma visão sem cópia
+    def fatia(self, inicio=None, fim=None):
+        a = 0 if inicio is None else self.datas.searchsorted(pd.Timestamp(inicio))
+        b = len(self.datas) if fim is None else self.datas.searchsorted(pd.Timestamp(fim))
+        return PainelPrecos(self.valores[a:b], self.datas[a:b], self.tickers)
+
+    # Sub-painel com alguns tickers (seleção de colunas: gera uma cópia só dessas colunas)
+    def selecionar(self, tickers):
+        indices = [self._colunas[ticker] for ticker in tickers]
+        return PainelPrecos(np.ascontiguousarray(self.valores[:, indices]), self.datas, tickers)
+
+    # DataFrame sobre o mesmo array (sem cópia), para o código que espera pandas
+    def como_dataframe(self):
+        return pd.DataFrame(self.valores, index=self.datas, columns=self.tickers, copy=False)
+
+
+# Nome do diretório de um painel a partir dos parâmetros que o definem
+def chave_painel(*partes):
+    return hashlib.sha1(json.dumps([str(parte) for parte in partes]).encode("utf-8")).hexdigest()[:16]
+
+
+# Apaga os painéis menos usados recentemente (pela data de modificação do diretório, renovada a cada
+# abertura), mantendo no máximo guardados painéis além do indicado em manter
+def _remover_antigos(diretorio, guardados, manter):
+    paineis = []
+    for nome in os.listdir(diretorio):
+        caminho = os.path.join(diretorio, nome)
+        if nome != manter and os.path.isdir(caminho) and not nome.endswith(".tmp"):
+            paineis.append((os.path.getmtime(caminho), nome))
+    for _, nome in sorted(paineis, reverse=True)[max(guardados - 1, 0):]:
+        shutil.rmtree(os.path.join(diretorio, nome), ignore_errors=True)
+
+
+# Abre o painel gravado para a chave ou, se ainda não existir, monta o DataFrame com construir(),
+# grava no tipo dtype (float32 por padrão) e o abre mapeado em memória
+# completo (opcional) é chamado depois de construir(): se devolver False (ex.: download com falhas),
+# o painel é devolvido sem ser gravado, para ser montado de novo na próxima vez
+def obter_painel(chave, construir, diretorio=DIRETORIO_PAINEIS, dtype=np.float32, guardados=PAINEIS_GUARDADOS,
+                 completo=None):
+    caminho = os.path.join(diretorio, chave)
+    if os.path.exists(os.path.join(caminho, "tickers.json")):
+        try:
+            os.utime(caminho)
+            return PainelPrecos.abrir(caminho)
+        except FileNotFoundError:
+            pass  # apagado por outro processo entre a verificação e a abertura: é montado de novo
+    df = construir()
+    if df.empty or (completo is not None and not completo()):
+        # Painel vazio ou parcial (falha no download) não é gravado, para ser montado de novo na próxima vez
+        return PainelPrecos.de_dataframe(df, dtype)
+    os.makedirs(diretorio, exist_ok=True)
+    PainelPrecos.de_dataframe(df, dtype).salvar(caminho)
+    _remover_antigos(diretorio, guardados, chave)
+    return PainelPrecos.abrir(caminho)
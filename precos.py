@@ -0,0 +1,116 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from instrumentacao import contar, etapa
+
+# Sufixo usado pelo Yahoo Finance para as ações negociadas na B3
+SUFIXO_B3 = ".SA"
+
+
+# Fonte padrão de preços: baixa um lote inteiro de tickers em uma única chamada ao yfinance
+# Toda fonte recebe (tickers, start_date, end_date) e devolve um dicionário {ticker: Series}
+def fonte_yfinance(tickers, start_date, end_date, coluna="Adj Close"):
+    import yfinance as yf
+
+    simbolos = [ticker + SUFIXO_B3 for ticker in tickers]
+    data = yf.download(simbolos, start=start_date, end=end_date, auto_adjust=False,
+                       group_by="column", progress=False, threads=False)
+    if data is None or data.empty or coluna not in data.columns.get_level_values(0):
+        return {}
+
+    precos = data[coluna]
+    if isinstance(precos, pd.Series):
+        precos = precos.to_frame(simbolos[0])
+
+    series = {}
+    for ticker, simbolo in zip(tickers, simbolos):
+        if simbolo in precos.columns:
+            serie = precos[simbolo].dropna()
+            if not serie.empty:
+                series[ticker] = serie
+    return series
+
+
+# Divide a lista de tickers em lotes de tamanho fixo
+def dividir_em_lotes(tickers, tamanho_lote):
+    return [tickers[i:i + tamanho_lote] for i in range(0, len(tickers), tamanho_lote)]
+
+
+# Chama a fonte com novas tentativas e espera exponencial entre elas
+def _chamar_com_tentativas(fonte, tickers, start_date, end_date, tentativas, espera):
+    erro = None
+    tentativas = max(1, tentativas)
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return fonte(tickers, start_date, end_date), tentativa, None
+        except Exception as e:
+            erro = e
+            if tentativa < tentativas:
+                time.sleep(espera * 2 ** (tentativa - 1))
+    return {}, tentativas, erro
+
+
+# Baixa um lote; os tickers que falharem no lote são tentados um a um,
+# de modo que um ticker com problema não derruba os demais
+@etapa("precos.lote")
+def _baixar_lote(numero, tickers, fonte, start_date, end_date, tentativas, espera):
+    inicio = time.perf_counter()
+    series, usadas, erro = _chamar_com_tentativas(fonte, tickers, start_date, end_date, tentativas, espera)
+    series = {ticker: serie for ticker, serie in series.items() if ticker in tickers and len(serie) > 0}
+
+    faltantes = [ticker for ticker in tickers if ticker not in series]
+    if len(tickers) > 1:
+        for ticker in faltantes:
+            individual, _, _ = _chamar_com_tentativas(fonte, [ticker], start_date, end_date, 1, espera)
+            if ticker in individual and len(individual[ticker]) > 0:
+                series[ticker] = individual[ticker]
+
+    contar("precos.lotes")
+    contar("precos.tickers_baixados", len(series))
+    contar("precos.tickers_com_falha", len(tickers) - len(series))
+    contar("precos.novas_tentativas", usadas - 1 + len(faltantes) * (len(tickers) > 1))
+
+    relatorio = {
+        "lote": numero,
+        "tickers": list(tickers),
+        "segundos": time.perf_counter() - inicio,
+        "tentativas": usadas,
+        "falhas": [ticker for ticker in tickers if ticker not in series],
+        "erro": str(erro) if erro is not None else None,
+    }
+    return series, relatorio
+
+
+# Baixa os preços de todo o universo de tickers em lotes, com um número limitado de workers,
+# e monta o painel alinhado (datas x tickers) uma única vez no final
+def baixar_precos(tickers, start_date, end_date, fonte=None, tamanho_lote=20, max_workers=4,
+                  tentativas=3, espera=0.5):
+    if fonte is None:
+        fonte = fonte_yfinance
+
+    # Remove duplicatas preservando a ordem original
+    tickers = list(dict.fromkeys(tickers))
+    lotes = dividir_em_lotes(tickers, tamanho_lote)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(lotes) or 1))) as executor:
+        futuros = [executor.submit(_baixar_lote, numero, lote, fonte, start_date, end_date, tentativas, espera)
+                   for numero, lote in enumerate(lotes)]
+        resultados = [futuro.result() for futuro in futuros]
+
+    series = {}
+    relatorio = []
+    for series_lote, relatorio_lote in resultados:
+        series.update(series_lote)
+        relatorio.append(relatorio_lote)
+
+    # Mantém a ordem original dos tickers; os que falharam ficam de fora do painel
+    colunas = [ticker for ticker in tickers if ticker in series]
+    if colunas:
+        df_prices = pd.concat([series[ticker] for ticker in colunas], axis=1, keys=colunas).sort_index()
+    else:
+        df_prices = pd.DataFrame()
+    df_prices.columns.name = None
+
+    return df_prices, relatorio
@@ -1,24 +1,13 @@
 # Salve este código em um arquivo chamado "app.py"
 
 import streamlit as st
-import matplotlib.pyplot as plt
-import yfinance as yf
-from bs4 import BeautifulSoup
-import requests
 
-# Função para obter a lista de empresas da Ibovespa
-def obter_empresas_ibovespa():
-    url = "https://pt.wikipedia.org/wiki/Lista_de_companhias_citadas_no_Ibovespa"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
-    table = soup.find("table", {"class": "wikitable"})
+from armazenamento import ArmazemPrecos
+from graficos import mostrar_grafico
+from ibovespa import obter_empresas_ibovespa
 
-    empresas = []
-    for row in table.find_all("tr")[1:]:
-        cols = row.find_all("td")
-        empresas.append(cols[0].text.strip())
-
-    return empresas
+# Armazém local de preços: as consultas repetidas são lidas do disco
+ARMAZEM = ArmazemPrecos()
 
 # Função para inverter texto
 def inverte_texto(texto):
@@ -37,9 +26,7 @@ if b1:
 
 b2 = st.button("Gráfico")
 if b2:
-    fig, ax = plt.subplots()
-    ax.scatter([1, 2, 3], [1, 2, 3])
-    st.pyplot(fig)
+    st.scatter_chart({"x": [1, 2, 3], "y": [1, 2, 3]}, x="x", y="y")
 
 # Pegar ticker de uma ação da Ibovespa e baixar os dados e plotar o gráfico
 st.header('Dados da Ação na Ibovespa')
@@ -58,8 +45,8 @@ if b3:
     # Loading
     st.write('Carregando...')
 
-    # Baixar dados da ação
-    acao = yf.download(ticker + '.SA', start=data_inicio, end=data_fim)
-    st.line_chart(acao['Close'])
+    # Baixar dados da ação (ou ler do armazém local)
+    acao = ARMAZEM.ler(ticker + '.SA', data_inicio, data_fim)
+    mostrar_grafico(st, acao['Close'].rename(ticker))
     st.write(acao)
     st.write(acao.describe())
@@ -1,6 +1,10 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import yfinance as yf   
+
+from armazenamento import ArmazemPrecos
+from graficos import mostrar_grafico
+
+# Armazém local de preços: as consultas repetidas são lidas do disco
+ARMAZEM = ArmazemPrecos()
 
 st.title('Meu primeiro programa de web')
 st.text('Nome')
@@ -21,9 +25,7 @@ if b1:
 
 b2 = st.button("Gráfico")
 if b2:
-    fig, ax = plt.subplots()
-    ax.scatter([1, 2, 3], [1, 2, 3])
-    st.pyplot(fig)
+    st.scatter_chart({"x": [1, 2, 3], "y": [1, 2, 3]}, x="x", y="y")
 
 # pegar ticker de uma ação da ibovespa e baixar os dados e plotar o gráfico
     
@@ -35,7 +37,7 @@ b3 = st.button('Buscar')
 if b3:
     # loading
     st.write('Carregando...')
-    acao = yf.download(ticker + '.SA', start=data_inicio, end=data_fim)
-    st.line_chart(acao['Close'])
+    acao = ARMAZEM.ler(ticker + '.SA', data_inicio, data_fim)
+    mostrar_grafico(st, acao['Close'].rename(ticker))
     st.write(acao)
     st.write(acao.describe())
\ No newline at end of file
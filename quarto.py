@@ -1,8 +1,15 @@
+import time
+
+import pandas as pd
 import streamlit as st
-import matplotlib.pyplot as plt
-import yfinance as yf
-from bs4 import BeautifulSoup
-import requests
+
+from armazenamento import ArmazemPrecos
+from graficos import MAX_PONTOS, decimar, mostrar_series
+from ibovespa import obter_empresas_ibovespa
+from indicadores import IndicadoresIncrementais
+
+# Armazém local de preços: as consultas repetidas são lidas do disco
+ARMAZEM = ArmazemPrecos()
 
 # Classe para representar uma ação
 class Acao:
@@ -12,28 +19,58 @@ class Acao:
         self.data_fim = data_fim
         self.data = None
 
-    # Método para baixar os dados da ação
+    # Método para baixar os dados da ação (lidos do armazém local quando já disponíveis)
     def download_data(self):
         try:
-            self.data = yf.download(self.ticker + '.SA', start=self.data_inicio, end=self.data_fim)
+            self.data = ARMAZEM.ler(self.ticker + '.SA', self.data_inicio, self.data_fim)
             return True
         except Exception as e:
             st.error(f"Erro ao baixar dados da ação {self.ticker}: {str(e)}")
             return False
 
-# Função para obter a lista de empresas da Ibovespa
-def obter_empresas_ibovespa():
-    url = "https://pt.wikipedia.org/wiki/Lista_de_companhias_citadas_no_Ibovespa"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
-    table = soup.find("table", {"class": "wikitable"})
 
-    empresas = []
-    for row in table.find_all("tr")[1:]:
-        cols = row.find_all("td")
-        empresas.append(cols[0].text.strip())
+# Gerador de cotações: reproduz os preços de fechamento baixados, um por tick
+# (ponto de troca por uma fonte de preços ao vivo que devolva um preço por iteração)
+def fluxo_de_precos(precos, ticks_por_segundo=50.0):
+    intervalo = 1.0 / ticks_por_segundo if ticks_por_segundo > 0 else 0.0
+    for data, preco in precos.items():
+        yield data, preco
+        if intervalo:
+            time.sleep(intervalo)
+
+
+# Histórico do gráfico em tempo real com tamanho limitado: os pontos antigos já decimados (no máximo
+# graficos.MAX_PONTOS por série) mais os ticks recentes ainda sem decimar; quando os recentes chegam a
+# MAX_PONTOS, os dois são decimados juntos. Redesenhar custa O(MAX_PONTOS), por maior que seja o histórico
+class HistoricoTicks:
+    NOMES = ('Preço', 'EMA', 'Média curta', 'Média longa')
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.decimado = {nome: pd.Series(dtype=float) for nome in self.NOMES}
+        self.recentes = []
+
+    def __bool__(self):
+        return bool(self.recentes) or not self.decimado['Preço'].empty
+
+    # Acrescenta um tick ({'Data': ..., 'Preço': ..., ...}) em O(1), amortizado
+    def acrescentar(self, linha):
+        self.recentes.append(linha)
+        if len(self.recentes) >= MAX_PONTOS:
+            self.decimado = {nome: decimar(serie) for nome, serie in self._series().items()}
+            self.recentes = []
+
+    def _series(self):
+        if not self.recentes:
+            return self.decimado
+        df = pd.DataFrame(self.recentes).set_index('Data')
+        return {nome: pd.concat([self.decimado[nome], df[nome]]) if not self.decimado[nome].empty else df[nome]
+                for nome in self.NOMES}
+
+    # Séries no formato de graficos.mostrar_series
+    def series(self):
+        return {(self.ticker, nome): serie for nome, serie in self._series().items()}
 
-    return empresas
 
 st.title('Meu primeiro programa de web')
 st.text('Nome')
@@ -52,9 +89,7 @@ if b1:
 
 b2 = st.button("Gráfico")
 if b2:
-    fig, ax = plt.subplots()
-    ax.scatter([1, 2, 3], [1, 2, 3])
-    st.pyplot(fig)
+    st.scatter_chart({"x": [1, 2, 3], "y": [1, 2, 3]}, x="x", y="y")
 
 # Pegar ticker de uma ação da Ibovespa e baixar os dados e plotar o gráfico
 st.header('Dados da Ação na Ibovespa')
@@ -76,5 +111,52 @@ if b3:
     # Criando objeto de ação e baixando dados
     acao = Acao(ticker, data_inicio, data_fim)
     if acao.download_data():
-        # Plotando gráfico em tempo real
-        st.line_chart(acao.data['Close'])
+        # Guardando a ação na sessão: os reruns do Streamlit não precisam baixar de novo
+        # e o estado dos indicadores começa do zero para o novo ticker
+        st.session_state['acao'] = acao
+        st.session_state['indicadores'] = IndicadoresIncrementais()
+        st.session_state['posicao'] = 0
+        st.session_state['historico'] = HistoricoTicks(ticker)
+
+# Desenha o histórico sem decimar de novo: ele já tem no máximo 2 * MAX_PONTOS pontos por série
+def desenhar_historico(grafico, historico):
+    mostrar_series(grafico, historico.series(), max_pontos=2 * MAX_PONTOS)
+
+
+# Plotando gráfico em tempo real
+# Cada tick atualiza os indicadores e o histórico em O(1); o gráfico é redesenhado com o histórico limitado,
+# então o navegador recebe no máximo 2 * graficos.MAX_PONTOS pontos por série, por maior que seja a série
+if 'acao' in st.session_state:
+    acao = st.session_state['acao']
+    st.subheader(f'Gráfico em tempo real: {acao.ticker}')
+    ticks_por_segundo = st.slider('Ticks por segundo', 1, 1000, 50)
+
+    historico = st.session_state['historico']
+    grafico = st.empty()
+    if historico:
+        desenhar_historico(grafico, historico)
+    painel_estado = st.empty()
+
+    if st.button('Iniciar tempo real'):
+        indicadores = st.session_state['indicadores']
+        precos = acao.data['Close'].iloc[st.session_state['posicao']:]
+        ultimo_desenho = 0.0
+        for data, preco in fluxo_de_precos(precos, ticks_por_segundo):
+            estado = indicadores.atualizar(preco)
+            historico.acrescentar({'Data': data, 'Preço': estado['Preço atual'], 'EMA': estado['EMA'],
+                                   'Média curta': estado['Média curta'], 'Média longa': estado['Média longa']})
+            st.session_state['posicao'] += 1
+
+            # Em taxas altas, agrupa os ticks e redesenha no máximo 10 vezes por segundo
+            agora = time.monotonic()
+            if agora - ultimo_desenho >= 0.1:
+                desenhar_historico(grafico, historico)
+                painel_estado.write(f"Tendência: {estado['Tendência']} | "
+                                    f"Volatilidade: {estado['Volatilidade (%)']:.2f}%")
+                ultimo_desenho = agora
+
+        if historico:
+            desenhar_historico(grafico, historico)
+        estado = indicadores.estado()
+        painel_estado.write(f"Tendência: {estado['Tendência']} | "
+                            f"Volatilidade: {estado['Volatilidade (%)']:.2f}%")
@@ -1,69 +1,26 @@
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
 import streamlit as st
-import yfinance as yf
-from sympy import *
-
-# Função para obter a lista de empresas da Ibovespa
-def obter_empresas_ibovespa():
-  url ="https://pt.wikipedia.org/wiki/Lista_de_companhias_citadas_no_Ibovespa"
-  response = requests.get(url)
-  soup = BeautifulSoup(response.text, "html.parser")
-  table = soup.find("table", {"class": "wikitable"})
-
-  empresas = []
-  for row in table.find_all("tr")[1:]:
-    cols = row.find_all("td")
-    empresas.append(cols[0].text.strip())
-
-  return empresas
-
-# Função para obter os dados da ação selecionada
-def get_stock_data(symbol):
-  stock_data = yf.download(symbol, start="2024-01-01", end="2024-03-06")
-  return stock_data
-
-# Função para determinar a tendência da ação com base no preço atual e média móvel
-def determinar_tendencia(stock_data):
-  current_price = stock_data['Close'][-1]
-  short_term_avg = stock_data['Close'][-10:].mean()
-  long_term_avg = stock_data['Close'][-50:].mean()
-
-  if current_price > short_term_avg > long_term_avg:
-    return "Tendência de alta"
-  elif current_price < short_term_avg < long_term_avg:
-    return "Tendência de baixa"
-  else:
-    return "Sem tendência clara"
-
-# Função para determinar a volatilidade da ação
-def determinar_volatilidade(stock_data):
-  return stock_data['Close'].pct_change().std() * 100
 
-# Função para plotar o gráfico da ação
-def plot_stock_chart(stock_data, symbol):
-
-  # Cria um objeto sympy para o tempo
-  t = Symbol('t')
-
-  # Cria uma função sympy para o preço da ação
-  # Fechando o preço com a média móvel exponencial de 10 dias
-  close_prices = stock_data['Close']
-  ema_10 = close_prices.ewm(span=10, min_periods=10).mean()
-  price = ema_10
+from aquisicao import iterar_ohlcv
+from armazenamento import ArmazemPrecos
+from graficos import mostrar_grafico
+from ibovespa import obter_empresas_ibovespa
+from indicadores import calcular_indicadores, montar_painel
 
-  # Plota o gráfico
-  plot(price, (t, 0, len(close_prices)), title=f'Preço da Ação {symbol}', xlabel='Tempo (dias)', ylabel='Preço (R$)')
+# Armazém local de preços: as consultas repetidas são lidas do disco
+ARMAZEM = ArmazemPrecos()
 
-  # Plotando a média móvel exponencial de 10 dias
-  plot(ema_10, (t, 0, len(close_prices)), color='orange', linestyle='dashed', legend=True)
+# Função para obter os dados das ações selecionadas
+# Os dados vêm do armazém local; os intervalos que faltam são baixados em paralelo (asyncio)
+# e cada ação é entregue como (symbol, dados) assim que chega
+def get_stock_data(symbols, start="2024-01-01", end="2024-03-06"):
+  return iterar_ohlcv(symbols, start, end, armazem=ARMAZEM)
 
-  # Adicionando legendas
-  legend()
-
-  # Mostra o gráfico
-  st.pyplot()
+# Função para plotar o gráfico da ação
+# Preço de fechamento e média móvel exponencial de 10 dias em um único gráfico (graficos.py),
+# com a série decimada: o navegador recebe um número limitado de pontos mesmo com anos de dados
+def plot_stock_chart(stock_data, symbol, destino=st):
+  mostrar_grafico(destino, stock_data['Close'].rename(symbol), span_ema=10, titulo=f'Preço da Ação {symbol}')
 
 # Obtendo a lista de empresas da Ibovespa
 empresas_ibovespa = obter_empresas_ibovespa()
@@ -81,26 +38,52 @@ selected_companies = st.multiselect(
 st.write("Empresas selecionadas:")
 st.write(selected_companies)
 
-# Exibindo os dados da ação para as empresas selecionadas
-for company in selected_companies:
+# Reservando um espaço para cada empresa, na ordem da seleção
+# Adicionando ".SA" para o símbolo de cada empresa
+symbols = [company + ".SA" for company in selected_companies]
+secoes = {}
+for company, symbol in zip(selected_companies, symbols):
   st.subheader(f"Dados da ação para {company}")
-  stock_data = get_stock_data(company + ".SA") # Adicionando ".SA" para o símbolo da empresa
-  st.write(stock_data)
+  secoes[symbol] = st.empty()
+  secoes[symbol].info("Carregando...")
+
+# Exibindo os dados de cada ação assim que eles chegam, sem esperar pela mais lenta
+fechamentos = {}
+recebidos = {}
+resumos = {}
+for symbol, stock_data in get_stock_data(symbols):
+  secao = secoes[symbol].container()
+  if stock_data.empty:
+    secao.warning(f"Sem dados de preço para {symbol}.")
+    continue
+  secao.write(stock_data)
+  plot_stock_chart(stock_data, symbol, secao)
+  fechamentos[symbol] = stock_data['Close']
+  recebidos[symbol] = stock_data
 
   # Chatbot para inserir o valor a ser investido
-  valor_investido = st.number_input("Valor a ser investido:", min_value=0.01)
+  valor_investido = secao.number_input("Valor a ser investido:", min_value=0.01, key=f"valor_{symbol}")
+  resumos[symbol] = (valor_investido, secao.empty())
+  resumos[symbol][1].info("Calculando indicadores...")
+
+# Indicadores de todas as ações recebidas em uma única passada vetorizada sobre o painel
+indicadores = calcular_indicadores(montar_painel(recebidos, "Close")) if recebidos else None
+for symbol, (valor_investido, resumo) in resumos.items():
+  if symbol not in indicadores.index:
+    resumo.warning(f"Sem dados de preço para {symbol}.")
+    continue
+  resumo = resumo.container()
 
   # Determinar a quantidade de ações que podem ser compradas
-  quantidade_acoes = valor_investido / stock_data['Close'][-1]
+  quantidade_acoes = valor_investido / indicadores.at[symbol, "Preço atual"]
 
   # Mostrar a quantidade de ações que podem ser compradas
-  st.write(f"Quantidade de ações que podem ser compradas: {quantidade_acoes:.2f}")
+  resumo.write(f"Quantidade de ações que podem ser compradas: {quantidade_acoes:.2f}")
 
   # Determinar a tendência da ação
-  trend = determinar_tendencia(stock_data)
-  st.write(f"Tendência: {trend}")
-
-
-
-
+  resumo.write(f"Tendência: {indicadores.at[symbol, 'Tendência']}")
 
+# Comparativo das ações selecionadas (base 100) com as EMAs, em um único gráfico
+if len(fechamentos) > 1:
+  st.subheader("Comparativo das ações (base 100)")
+  mostrar_grafico(st, pd.DataFrame(fechamentos), span_ema=10, normalizar=True, rotulo_y="Base 100")
@@ -0,0 +1,220 @@
+import heapq
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import contar, etapa
+from otimizacao import TAXA_LIVRE_DE_RISCO, maximizar_sharpe
+
+# Seleção dos k melhores ativos: carteira de Sharpe máximo com exatamente k ativos, cada um com peso
+# entre peso_minimo e peso_maximo (com peso_minimo = 0, equivale a "no máximo k ativos")
+# 1. Relaxação contínua (todos os ativos, sem a cardinalidade): limite superior para qualquer escolha
+# 2. Busca local: parte dos k maiores pesos da relaxação e troca um ativo por vez enquanto o Sharpe melhora
+# 3. Branch-and-bound, melhor limite primeiro: cada nó fixa ativos dentro (forçados) ou fora da carteira,
+#    e a relaxação do nó limita o Sharpe de todas as escolhas abaixo dele; nós que não superam a melhor
+#    carteira encontrada são podados. Parando por tempo, o maior limite entre os nós abertos dá o gap
+# As estatísticas (médias e covariância) são calculadas uma vez e só recortadas para cada avaliação;
+# com processos > 1, as avaliações de cada rodada (trocas da busca local, nós do branch-and-bound)
+# são distribuídas entre um pool de processos
+
+# Peso abaixo do qual um ativo é considerado fora da carteira
+PESO_NULO = 1e-6
+
+# Estatísticas compartilhadas com os processos do pool (preenchido pelo inicializador de cada processo)
+_estatisticas_pool = None
+
+
+# Sharpe máximo usando só os ativos permitidos (índices em estatisticas); os forçados têm peso de pelo
+# menos peso_minimo, os demais podem ficar com zero. Devolve o Sharpe e os pesos (na ordem de permitidos)
+def resolver_restrito(estatisticas, permitidos, forcados, peso_minimo, peso_maximo,
+                      taxa_livre_de_risco=TAXA_LIVRE_DE_RISCO, pesos_iniciais=None):
+    sub = estatisticas.subconjunto(permitidos)
+    forcados = set(forcados)
+    limites = [(peso_minimo if i in forcados else 0.0, peso_maximo) for i in permitidos]
+    pesos = maximizar_sharpe(sub, taxa_livre_de_risco, pesos_iniciais=pesos_iniciais, limites=limites)
+    return float(sub.sharpe(pesos, taxa_livre_de_risco)), pesos
+
+
+def _iniciar_pool(estatisticas):
+    global _estatisticas_pool
+    _estatisticas_pool = estatisticas
+
+
+def _resolver_no_pool(tarefa):
+    return resolver_restrito(_estatisticas_pool, *tarefa)
+
+
+# Resultado da seleção: pesos (um por ativo do universo), Sharpe da melhor carteira encontrada e
+# o limite superior provado para o Sharpe de qualquer carteira com k ativos
+class ResultadoSelecao:
+    def __init__(self, pesos, sharpe, limite_superior, tickers, nos, avaliacoes, segundos, exato):
+        self.pesos = pesos
+        self.sharpe = sharpe
+        self.limite_superior = limite_superior
+        self.tickers = tickers
+        self.nos = nos
+        self.avaliacoes = avaliacoes
+        self.segundos = segundos
+        self.exato = exato
+
+    # Gap de otimalidade relativo: quanto o ótimo ainda pode superar a carteira encontrada
+    @property
+    def gap(self):
+        if self.exato:
+            return 0.0
+        return max(self.limite_superior - self.sharpe, 0.0) / abs(self.limite_superior)
+
+    @property
+    def selecionados(self):
+        return [self.tickers[i] for i in np.flatnonzero(self.pesos > PESO_NULO)]
+
+    # Ativos escolhidos e seus pesos, do maior para o menor
+    def tabela(self):
+        escolhidos = np.flatnonzero(self.pesos > PESO_NULO)
+        df = pd.DataFrame({"Ação": [self.tickers[i] for i in escolhidos], "Peso": self.pesos[escolhidos]})
+        return df.sort_values("Peso", ascending=False, ignore_index=True)
+
+    def resumo(self):
+        return {
+            "Índice de Sharpe": self.sharpe,
+            "Limite superior": self.limite_superior,
+            "Gap de otimalidade": self.gap,
+            "Ótimo provado": self.exato,
+            "Nós explorados": self.nos,
+            "Carteiras avaliadas": self.avaliacoes,
+            "Tempo (s)": self.segundos,
+        }
+
+
+# Carteira de Sharpe máximo com exatamente k ativos (ver o comentário do módulo)
+# pesos_relaxados: pesos de maximizar_sharpe com limites (0, peso_maximo), se já calculados (evita refazer
+# a relaxação da raiz); tempo_limite e max_nos encerram o branch-and-bound, e o resultado informa o gap
+def melhores_k(estatisticas, k, peso_minimo=0.0, peso_maximo=1.0, taxa_livre_de_risco=TAXA_LIVRE_DE_RISCO,
+               pesos_relaxados=None, tempo_limite=10.0, max_nos=None, tolerancia_gap=1e-4, processos=None):
+    n = estatisticas.num_ativos
+    if not 1 <= k <= n:
+        raise ValueError(f"k deve estar entre 1 e o número de ativos ({n}).")
+    if k * peso_maximo < 1 - 1e-12 or k * peso_minimo > 1 + 1e-12 or peso_minimo > peso_maximo:
+        raise ValueError("Limites de peso inviáveis para k ativos (k * peso_maximo >= 1 >= k * peso_minimo).")
+
+    inicio = time.perf_counter()
+    executor = None
+    if processos and processos > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_pool, initargs=(estatisticas,))
+
+    # Resolve uma rodada de tarefas (permitidos, forçados, pesos iniciais) de uma vez
+    def avaliar(tarefas):
+        tarefas = [(np.asarray(permitidos), tuple(forcados), peso_minimo, peso_maximo, taxa_livre_de_risco, iniciais)
+                   for permitidos, forcados, iniciais in tarefas]
+        contar("selecao.avaliacoes", len(tarefas))
+        if executor is None or len(tarefas) < 2:
+            return [resolver_restrito(estatisticas, *tarefa) for tarefa in tarefas]
+        return list(executor.map(_resolver_no_pool, tarefas, chunksize=max(1, len(tarefas) // (4 * processos))))
+
+    def pesos_completos(permitidos, pesos):
+        completos = np.zeros(n)
+        completos[np.asarray(permitidos)] = pesos
+        return completos
+
+    # A solução da relaxação de um nó já é uma carteira válida se usa no máximo k ativos com pesos válidos
+    def viavel(pesos, forcados):
+        suporte = set(np.flatnonzero(pesos > PESO_NULO)) | set(forcados)
+        if len(suporte) > k or (peso_minimo > 0 and len(suporte) < k):
+            return False
+        return all(pesos[i] >= peso_minimo - PESO_NULO for i in suporte)
+
+    try:
+        with etapa("selecao.melhores_k"):
+            todos = np.arange(n)
+            if pesos_relaxados is None:
+                limite_raiz, pesos_relaxados = avaliar([(todos, (), None)])[0]
+            else:
+                pesos_relaxados = np.asarray(pesos_relaxados, dtype=float)
+                limite_raiz = float(estatisticas.sharpe(pesos_relaxados, taxa_livre_de_risco))
+            avaliacoes = 1
+            if viavel(pesos_relaxados, ()):
+                return ResultadoSelecao(pesos_relaxados, limite_raiz, limite_raiz, list(estatisticas.tickers), 1,
+                                        avaliacoes, time.perf_counter() - inicio, exato=True)
+
+            # Busca local a partir dos k maiores pesos da relaxação: a cada rodada avalia todas as trocas de
+            # um ativo escolhido por um de fora e fica com a melhor, enquanto houver melhora
+            escolhidos = sorted(np.argsort(-pesos_relaxados, kind="stable")[:k].tolist())
+            melhor_sharpe, pesos = avaliar([(escolhidos, escolhidos, None)])[0]
+            melhores_pesos = pesos_completos(escolhidos, pesos)
+            avaliacoes += 1
+            while k < n and time.perf_counter() - inicio < tempo_limite:
+                trocas = [sorted(set(escolhidos) - {sai} | {entra})
+                          for sai in escolhidos for entra in todos if entra not in escolhidos]
+                resultados = avaliar([(troca, troca, None) for troca in trocas])
+                avaliacoes += len(trocas)
+                melhor = max(range(len(trocas)), key=lambda t: resultados[t][0])
+                if resultados[melhor][0] <= melhor_sharpe + 1e-12 * abs(melhor_sharpe):
+                    break
+                escolhidos = trocas[melhor]
+                melhor_sharpe = resultados[melhor][0]
+                melhores_pesos = pesos_completos(escolhidos, resultados[melhor][1])
+
+            # Branch-and-bound: nós (-limite, desempate, forçados, excluídos, pesos da relaxação)
+            def supera(limite):
+                return limite > melhor_sharpe + tolerancia_gap * abs(melhor_sharpe)
+
+            desempate = itertools.count()
+            abertos = []
+            if supera(limite_raiz):
+                abertos.append((-limite_raiz, next(desempate), (), (), pesos_relaxados))
+            nos = 1
+
+            while abertos and time.perf_counter() - inicio < tempo_limite and (max_nos is None or nos < max_nos):
+                # Uma rodada: os melhores nós abertos (um por processo), cada um dividido no ativo de maior peso
+                # da sua relaxação que ainda não foi forçado
+                rodada = []
+                while abertos and len(rodada) < max(1, processos or 1):
+                    limite, _, forcados, excluidos, pesos = heapq.heappop(abertos)
+                    if supera(-limite):
+                        rodada.append((forcados, excluidos, pesos))
+                if not rodada:
+                    break
+
+                tarefas, filhos = [], []
+                for forcados, excluidos, pesos in rodada:
+                    livres = [i for i in todos if i not in excluidos and i not in forcados]
+                    ramo = max(livres, key=lambda i: pesos[i])
+                    for novos_forcados, novos_excluidos in ((forcados + (ramo,), excluidos),
+                                                            (forcados, excluidos + (ramo,))):
+                        permitidos = [i for i in todos if i not in novos_excluidos]
+                        if len(permitidos) < k:
+                            continue
+                        # Com k forçados (ou só k permitidos) a escolha está fechada: o nó é uma carteira
+                        if len(novos_forcados) == k or len(permitidos) == k:
+                            fechados = sorted(novos_forcados) if len(novos_forcados) == k else permitidos
+                            tarefas.append((fechados, fechados, None))
+                            filhos.append(None)
+                            continue
+                        iniciais = pesos[permitidos]
+                        iniciais = iniciais / iniciais.sum() if iniciais.sum() > PESO_NULO else None
+                        tarefas.append((permitidos, novos_forcados, iniciais))
+                        filhos.append((novos_forcados, novos_excluidos))
+
+                resultados = avaliar(tarefas)
+                avaliacoes += len(tarefas)
+                nos += len(tarefas)
+                contar("selecao.nos", len(tarefas))
+                for (permitidos, _, _), filho, (sharpe, pesos_filho) in zip(tarefas, filhos, resultados):
+                    pesos_filho = pesos_completos(permitidos, pesos_filho)
+                    if filho is None or viavel(pesos_filho, filho[0]):
+                        if sharpe > melhor_sharpe:
+                            melhor_sharpe, melhores_pesos = sharpe, pesos_filho
+                    elif supera(sharpe):
+                        heapq.heappush(abertos, (-sharpe, next(desempate), filho[0], filho[1], pesos_filho))
+
+            abertos = [no for no in abertos if supera(-no[0])]
+            limite_superior = max([-no[0] for no in abertos] + [melhor_sharpe])
+            return ResultadoSelecao(melhores_pesos, melhor_sharpe, limite_superior, list(estatisticas.tickers), nos,
+                                    avaliacoes, time.perf_counter() - inicio, exato=not abertos)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
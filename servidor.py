@@ -0,0 +1,382 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+from dados_sinteticos import gerar_precos
+from instrumentacao import contar, etapa
+from painel import PainelPrecos, chave_painel
+
+# Modo servidor: um único atualizador em segundo plano mantém a lista do Ibovespa e os preços de uma janela
+# de datas atualizados, em intervalos fixos, e publica cada versão como um snapshot somente leitura em disco
+# (painel float32 mapeado em memória + JSON com a lista). As sessões só leem o snapshot publicado: nenhuma
+# consulta à rede por sessão, e todas compartilham as mesmas páginas do painel
+# CN1_MODO_SERVIDOR:
+#   "" (padrão): desligado, cada sessão busca os dados como antes
+#   "thread": o atualizador roda em uma thread do próprio processo do Streamlit (iniciado pela primeira sessão)
+#   "externo": o atualizador roda em outro processo (python servidor.py atualizar ...) e as sessões só leem
+# Exemplos:
+#   python servidor.py atualizar --inicio 2022-01-01 --fim 2022-12-31 --intervalo 900
+#   python servidor.py carga --sessoes 1 10 50 --latencia 0.3
+MODO_SERVIDOR = os.environ.get("CN1_MODO_SERVIDOR", "")
+
+# Diretório dos snapshots publicados (pode ser trocado pela variável de ambiente CN1_DIR_SNAPSHOTS)
+DIRETORIO_SNAPSHOTS = os.environ.get(
+    "CN1_DIR_SNAPSHOTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "snapshots")
+)
+
+# Intervalo (em segundos) entre duas atualizações (variável de ambiente CN1_INTERVALO_ATUALIZACAO)
+INTERVALO_ATUALIZACAO = float(os.environ.get("CN1_INTERVALO_ATUALIZACAO", 15 * 60))
+
+# Versões antigas mantidas em disco (sessões que ainda estão com uma delas aberta continuam funcionando)
+VERSOES_GUARDADAS = 3
+
+# Espera máxima (em segundos) de uma sessão pela primeira rodada do atualizador no modo "thread"; depois
+# dela (ou se a rodada falhar), a sessão segue pelo caminho direto, sem snapshot
+ESPERA_PRIMEIRA_RODADA = 30.0
+
+
+# Snapshot publicado: lista de empresas e painel de preços da janela [inicio, fim), somente leitura
+# Os valores do painel são mapeados do disco: abrir o snapshot não copia os preços para a memória da sessão
+class Snapshot:
+    def __init__(self, versao, empresas, painel, inicio, fim, criado_em, falhas=()):
+        self.versao = versao
+        self.empresas = tuple(empresas)
+        self.painel = painel
+        self.inicio = inicio
+        self.fim = fim
+        self.criado_em = criado_em
+        self.falhas = tuple(falhas)
+
+    @classmethod
+    def abrir(cls, diretorio, info):
+        painel = PainelPrecos.abrir(os.path.join(diretorio, info["versao"]))
+        return cls(info["versao"], info["empresas"], painel, info["inicio"], info["fim"], info["criado_em"],
+                   info.get("falhas", ()))
+
+    @property
+    def idade(self):
+        return time.time() - self.criado_em
+
+    # O snapshot atende a um pedido se todos os tickers pedidos estão na lista publicada
+    def cobre(self, tickers):
+        return set(tickers) <= set(self.empresas)
+
+    # Preços (datas x tickers) como DataFrame sobre o painel mapeado; sem tickers, o painel inteiro (sem cópia)
+    # Tickers sem dados na janela (falhas no download) ficam de fora, como em precos.baixar_precos
+    def precos(self, tickers=None):
+        if tickers is None or list(tickers) == self.painel.tickers:
+            return self.painel.como_dataframe()
+        presentes = set(self.painel.tickers)
+        return self.painel.selecionar([ticker for ticker in tickers if ticker in presentes]).como_dataframe()
+
+
+def _arquivo_atual(diretorio, inicio, fim):
+    return os.path.join(diretorio, f"atual-{chave_painel(inicio, fim)}.json")
+
+
+def _gravar_json(caminho, conteudo):
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(conteudo, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+# Versão de um painel: hash do conteúdo (datas, tickers e valores); dados iguais não geram versão nova
+def versao_painel(df_prices, empresas):
+    resumo = hashlib.sha1()
+    resumo.update(json.dumps([list(empresas), [str(ticker) for ticker in df_prices.columns]]).encode("utf-8"))
+    resumo.update(df_prices.index.to_numpy(dtype="datetime64[ns]").tobytes())
+    resumo.update(df_prices.to_numpy(dtype="float32").tobytes())
+    return resumo.hexdigest()[:16]
+
+
+# Atualizador dos dados compartilhados: a cada intervalo segundos, lê a lista de empresas (lista()),
+# baixa os preços da janela (fonte no formato de precos.baixar_precos; padrão: armazém local, que só busca
+# os trechos faltantes) e, se algo mudou, publica um snapshot novo
+# A publicação é atômica: o painel é gravado em um diretório novo e só depois o arquivo "atual" passa a
+# apontar para ele; quem está lendo a versão anterior não é afetado
+class Atualizador:
+    def __init__(self, inicio, fim, intervalo=INTERVALO_ATUALIZACAO, diretorio=DIRETORIO_SNAPSHOTS, lista=None,
+                 fonte=None, coluna="Adj Close"):
+        self.inicio = inicio
+        self.fim = fim
+        self.intervalo = intervalo
+        self.diretorio = diretorio
+        self.lista = lista
+        self.fonte = fonte
+        self.coluna = coluna
+        self.atual = None
+        self.atualizacoes = 0
+        self.ultimo_erro = None
+        self._parar = threading.Event()
+        # Marcado ao fim de cada rodada, com ou sem sucesso: quem espera em aguardar() é acordado também
+        # quando a rodada falha
+        self._rodada_concluida = threading.Event()
+        self._thread = None
+
+    # Uma rodada de atualização; devolve o snapshot publicado (o novo ou o atual, se nada mudou)
+    @etapa("servidor.atualizacao")
+    def atualizar(self):
+        from precos import baixar_precos
+
+        if self.lista is None:
+            from ibovespa import obter_empresas_ibovespa
+
+            self.lista = obter_empresas_ibovespa
+        if self.fonte is None:
+            from armazenamento import ArmazemPrecos
+
+            self.fonte = ArmazemPrecos().como_fonte(self.coluna)
+
+        empresas = list(self.lista())
+        df_prices, relatorio = baixar_precos(empresas, self.inicio, self.fim, fonte=self.fonte)
+        if df_prices.empty:
+            raise RuntimeError("Nenhum preço obtido na atualização.")
+        versao = versao_painel(df_prices, empresas)
+        self.atualizacoes += 1
+        contar("servidor.atualizacoes")
+
+        if self.atual is None or self.atual.versao != versao:
+            os.makedirs(self.diretorio, exist_ok=True)
+            caminho = os.path.join(self.diretorio, versao)
+            if not os.path.exists(os.path.join(caminho, "tickers.json")):
+                PainelPrecos.de_dataframe(df_prices).salvar(caminho)
+            info = {"versao": versao, "empresas": empresas, "inicio": self.inicio, "fim": self.fim,
+                    "criado_em": time.time(), "falhas": [t for lote in relatorio for t in lote["falhas"]]}
+            _gravar_json(_arquivo_atual(self.diretorio, self.inicio, self.fim), info)
+            self.atual = Snapshot.abrir(self.diretorio, info)
+            contar("servidor.publicacoes")
+            self._remover_antigas()
+        self._rodada_concluida.set()
+        return self.atual
+
+    # Apaga as versões mais antigas, menos as apontadas por algum arquivo "atual" (de qualquer janela)
+    def _remover_antigas(self):
+        em_uso = set()
+        versoes = []
+        for nome in os.listdir(self.diretorio):
+            caminho = os.path.join(self.diretorio, nome)
+            if nome.startswith("atual-") and nome.endswith(".json"):
+                try:
+                    with open(caminho, encoding="utf-8") as arquivo:
+                        em_uso.add(json.load(arquivo)["versao"])
+                except (OSError, ValueError, KeyError):
+                    pass
+            elif os.path.isdir(caminho) and not nome.endswith(".tmp"):
+                versoes.append((os.path.getmtime(caminho), nome))
+        for _, nome in sorted(versoes, reverse=True)[VERSOES_GUARDADAS:]:
+            if nome not in em_uso:
+                shutil.rmtree(os.path.join(self.diretorio, nome), ignore_errors=True)
+
+    # Laço do atualizador: uma falha mantém o snapshot anterior publicado e tenta de novo no próximo intervalo
+    def _laco(self):
+        while not self._parar.is_set():
+            try:
+                self.atualizar()
+                self.ultimo_erro = None
+            except Exception as e:
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+                contar("servidor.falhas")
+                self._rodada_concluida.set()
+            self._parar.wait(self.intervalo)
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._laco, name="cn1-atualizador", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self, timeout=None):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # Espera o fim da primeira rodada (no máximo timeout segundos) e devolve o snapshot atual: None se a
+    # rodada falhou (o erro fica em ultimo_erro) ou ainda não terminou
+    def aguardar(self, timeout=ESPERA_PRIMEIRA_RODADA):
+        self._rodada_concluida.wait(timeout)
+        return self.atual
+
+
+_atualizadores = {}
+_trava_atualizadores = threading.Lock()
+
+
+# Atualizador em thread do processo para a janela [inicio, fim): um só por janela e diretório,
+# mesmo com várias sessões (e reruns do Streamlit) chamando ao mesmo tempo
+def iniciar_atualizador(inicio, fim, intervalo=INTERVALO_ATUALIZACAO, diretorio=DIRETORIO_SNAPSHOTS):
+    with _trava_atualizadores:
+        chave = (diretorio, inicio, fim)
+        if chave not in _atualizadores:
+            _atualizadores[chave] = Atualizador(inicio, fim, intervalo, diretorio).iniciar()
+        return _atualizadores[chave]
+
+
+_abertos = {}
+_trava_abertos = threading.Lock()
+
+
+# Snapshot publicado mais recente da janela [inicio, fim) (None se nenhum foi publicado ainda)
+# Leitura barata: um stat do arquivo "atual" por chamada; o snapshot só é reaberto quando ele muda,
+# e o mesmo objeto é devolvido a todas as sessões do processo
+def obter_snapshot(inicio, fim, diretorio=DIRETORIO_SNAPSHOTS):
+    caminho = _arquivo_atual(diretorio, inicio, fim)
+    try:
+        marca = os.stat(caminho).st_mtime_ns
+    except OSError:
+        return None
+    with _trava_abertos:
+        aberto = _abertos.get(caminho)
+        if aberto is not None and aberto[0] == marca:
+            return aberto[1]
+        try:
+            with open(caminho, encoding="utf-8") as arquivo:
+                info = json.load(arquivo)
+            snapshot = Snapshot.abrir(diretorio, info)
+        except (OSError, ValueError, KeyError):
+            # Arquivo trocado no meio da leitura ou versão já removida: continua com a anterior
+            return aberto[1] if aberto is not None else None
+        if aberto is not None and aberto[1].versao == snapshot.versao:
+            snapshot = aberto[1]
+        _abertos[caminho] = (marca, snapshot)
+        return snapshot
+
+
+# Snapshot para as páginas no modo servidor: no modo "thread", garante o atualizador do processo e espera
+# o fim da primeira rodada (até espera segundos); no modo "externo", só lê o que o outro processo publicou
+# None se ainda não há snapshot (primeira rodada falhou ou demorou): a página usa o caminho direto
+def snapshot_compartilhado(inicio, fim, espera=ESPERA_PRIMEIRA_RODADA, diretorio=DIRETORIO_SNAPSHOTS):
+    if MODO_SERVIDOR == "thread":
+        iniciar_atualizador(inicio, fim, diretorio=diretorio).aguardar(espera)
+    return obter_snapshot(inicio, fim, diretorio)
+
+
+# Versão dos dados compartilhados (None fora do modo servidor ou sem snapshot), para entrar nas chaves
+# dos caches: resultados calculados sobre uma versão antiga deixam de ser usados quando outra é publicada
+def versao_dados(inicio, fim, diretorio=DIRETORIO_SNAPSHOTS):
+    if not MODO_SERVIDOR:
+        return None
+    snapshot = obter_snapshot(inicio, fim, diretorio)
+    return snapshot.versao if snapshot is not None else None
+
+
+# Fonte simulada para o teste de carga (sem rede): lista de empresas e preços sintéticos, com latência fixa
+# por chamada (como a da Wikipedia e a do Yahoo Finance) e contagem das chamadas
+class FonteSimulada:
+    def __init__(self, num_tickers=90, num_dias=250, latencia=0.3):
+        self.painel = gerar_precos(num_tickers, num_dias)
+        self.latencia = latencia
+        self.chamadas = 0
+        self._trava = threading.Lock()
+
+    def _chamar(self):
+        with self._trava:
+            self.chamadas += 1
+        time.sleep(self.latencia)
+
+    def lista(self):
+        self._chamar()
+        return list(self.painel.columns)
+
+    def precos(self, tickers, inicio, fim):
+        self._chamar()
+        return {ticker: self.painel[ticker].copy() for ticker in tickers if ticker in self.painel.columns}
+
+
+# Teste de carga local: num_sessoes sessões simultâneas (threads) abrem a página, isto é, leem a lista e o
+# painel de preços e calculam os indicadores do último dia
+# modo "direto": cada sessão busca a lista e os preços na fonte (o comportamento sem o modo servidor)
+# modo "servidor": o atualizador publica o snapshot antes e as sessões só leem o snapshot compartilhado
+# Devolve latência por sessão (mediana e p95), chamadas à fonte e o pico de memória alocada pelas sessões
+def teste_carga(num_sessoes, modo, fonte, diretorio, inicio="2022-01-03", fim="2023-01-01"):
+    import tracemalloc
+    from concurrent.futures import ThreadPoolExecutor
+
+    import numpy as np
+
+    from precos import baixar_precos
+
+    if modo == "servidor":
+        Atualizador(inicio, fim, diretorio=diretorio, lista=fonte.lista, fonte=fonte.precos).atualizar()
+    chamadas_antes = fonte.chamadas
+
+    def sessao(_):
+        comeco = time.perf_counter()
+        if modo == "servidor":
+            snapshot = obter_snapshot(inicio, fim, diretorio)
+            empresas, df_prices = snapshot.empresas, snapshot.precos()
+        else:
+            empresas = fonte.lista()
+            df_prices, _ = baixar_precos(empresas, inicio, fim, fonte=fonte.precos)
+        valores = df_prices.to_numpy()
+        float(np.nanmean(valores[-1] / valores[-2] - 1))
+        return time.perf_counter() - comeco
+
+    tracemalloc.start()
+    try:
+        with ThreadPoolExecutor(max_workers=num_sessoes) as executor:
+            latencias = list(executor.map(sessao, range(num_sessoes)))
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"modo": modo, "sessoes": num_sessoes, "mediana_s": float(np.median(latencias)),
+            "p95_s": float(np.percentile(latencias, 95)), "chamadas_fonte": fonte.chamadas - chamadas_antes,
+            "memoria_pico_mib": pico / 2 ** 20}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Atualizador compartilhado de dados e teste de carga do modo servidor")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    atualizar = subparsers.add_parser("atualizar", help="roda o atualizador neste processo (modo externo)")
+    atualizar.add_argument("--inicio", required=True)
+    atualizar.add_argument("--fim", required=True)
+    atualizar.add_argument("--intervalo", type=float, default=INTERVALO_ATUALIZACAO)
+    atualizar.add_argument("--diretorio", default=DIRETORIO_SNAPSHOTS)
+    atualizar.add_argument("--uma-vez", action="store_true", help="publica uma vez e sai")
+
+    carga = subparsers.add_parser("carga", help="sessões simultâneas simuladas, com e sem o modo servidor")
+    carga.add_argument("--sessoes", type=int, nargs="+", default=[1, 10, 50])
+    carga.add_argument("--tickers", type=int, default=90)
+    carga.add_argument("--dias", type=int, default=250)
+    carga.add_argument("--latencia", type=float, default=0.3, help="latência simulada de cada chamada à fonte (s)")
+
+    args = parser.parse_args(argv)
+    if args.comando == "atualizar":
+        atualizador = Atualizador(args.inicio, args.fim, args.intervalo, args.diretorio)
+        if args.uma_vez:
+            snapshot = atualizador.atualizar()
+            print(f"versão {snapshot.versao}: {len(snapshot.empresas)} empresas, painel {snapshot.painel.shape}")
+            return 0
+        atualizador.iniciar()
+        try:
+            while True:
+                time.sleep(max(1.0, args.intervalo))
+                atual = atualizador.atual
+                print(f"{time.strftime('%H:%M:%S')} versão {atual.versao if atual else '-'} "
+                      f"atualizações={atualizador.atualizacoes} erro={atualizador.ultimo_erro}", flush=True)
+        except KeyboardInterrupt:
+            atualizador.parar()
+            return 0
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        for num_sessoes in args.sessoes:
+            for modo in ("direto", "servidor"):
+                fonte = FonteSimulada(args.tickers, args.dias, args.latencia)
+                resultado = teste_carga(num_sessoes, modo, fonte, diretorio)
+                print(f"sessões={num_sessoes:<4} {modo:<9} mediana={resultado['mediana_s'] * 1000:8.1f}ms  "
+                      f"p95={resultado['p95_s'] * 1000:8.1f}ms  chamadas à fonte={resultado['chamadas_fonte']:<5} "
+                      f"memória={resultado['memoria_pico_mib']:7.1f}MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
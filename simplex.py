@@ -0,0 +1,376 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.linalg import lu_factor, lu_solve, solve_triangular
+from scipy.sparse.linalg import splu
+
+from instrumentacao import contar, etapa
+
+# Tolerância numérica usada nos testes de otimalidade e de razão
+TOLERANCIA = 1e-12
+
+# Menor valor absoluto aceito como pivô no teste de razão do simplex dual
+TOLERANCIA_PIVO = 1e-9
+
+# Número de pivoteamentos entre duas refatorações completas da base (modo revisado)
+REFATORAR_A_CADA = 64
+
+
+# Converte um bloco de restrições para matriz (k x n), preservando matrizes esparsas
+def _como_matriz(M, num_vars):
+    if sp.issparse(M):
+        return sp.csc_matrix(M, dtype=float)
+    return np.asarray(M, dtype=float).reshape(-1, num_vars)
+
+
+# Junta as restrições em uma única matriz A (m x n) e um vetor b
+# Se algum bloco for esparso (scipy.sparse), A fica no formato CSC
+# Convenção do solver: cada linha i tem uma variável de folga implícita (coluna n + i);
+# as folgas das restrições de igualdade (m1 primeiras linhas) podem voltar à base,
+# as das restrições de desigualdade não aparecem na tabela e, portanto, nunca voltam
+def _juntar_restricoes(c, A_eq, b_eq, A_ineq, b_ineq):
+    c = np.asarray(c, dtype=float)
+    num_vars = len(c)
+    A_eq = _como_matriz(A_eq, num_vars)
+    A_ineq = _como_matriz(A_ineq, num_vars)
+    if sp.issparse(A_eq) or sp.issparse(A_ineq):
+        A = sp.vstack([sp.csc_matrix(A_eq), sp.csc_matrix(A_ineq)], format="csc")
+    else:
+        A = np.vstack([A_eq, A_ineq])
+    b = np.concatenate([np.asarray(b_eq, dtype=float).ravel(), np.asarray(b_ineq, dtype=float).ravel()])
+    return c, A, b, A_eq.shape[0]
+
+
+# Extrai a solução das variáveis originais a partir dos índices da base
+def _solucao_da_base(base, valores_base, num_vars):
+    solution = np.zeros(num_vars)
+    originais = base < num_vars
+    solution[base[originais]] = valores_base[originais]
+    return solution
+
+
+# Simplex na forma de tabela: o pivoteamento é uma única atualização de posto 1
+def _simplex_tabela(c, A, b, num_eq_constraints, tolerancia):
+    m, num_vars = A.shape
+
+    # Montar a tabela inicial do Simplex (só as folgas das igualdades viram colunas)
+    tableau = np.zeros((m + 1, num_vars + num_eq_constraints + 1))
+    tableau[:-1, :num_vars] = A
+    tableau[np.arange(num_eq_constraints), num_vars + np.arange(num_eq_constraints)] = 1
+    tableau[:-1, -1] = b
+    tableau[-1, :num_vars] = -c
+    base = num_vars + np.arange(m)
+    pivos = 0
+
+    while True:
+        # Passo 1: Encontrar a coluna de entrada (variável entrando na base)
+        pivot_col = np.argmin(tableau[-1, :-1])
+        if tableau[-1, pivot_col] >= -tolerancia:
+            break  # Solução ótima encontrada
+
+        # Passo 2: Encontrar a linha de saída (variável saindo da base)
+        coluna = tableau[:-1, pivot_col]
+        ratios = np.divide(tableau[:-1, -1], coluna, out=np.full(m, np.inf), where=coluna > tolerancia)
+        pivot_row = np.argmin(ratios)
+        if np.isinf(ratios[pivot_row]):
+            raise Exception("Problema não tem solução limitada.")
+
+        # Passo 3: Pivotear (eliminação de todas as linhas em uma única operação)
+        tableau[pivot_row, :] /= tableau[pivot_row, pivot_col]
+        fatores = tableau[:, pivot_col].copy()
+        fatores[pivot_row] = 0
+        tableau -= np.outer(fatores, tableau[pivot_row, :])
+        base[pivot_row] = pivot_col
+        pivos += 1
+
+    contar("simplex.pivoteamentos", pivos)
+    solution = _solucao_da_base(base, tableau[:-1, -1], num_vars)
+    max_profit = -tableau[-1, -1]
+    return solution, max_profit
+
+
+# Base fatorada do simplex revisado: fatoração LU da base em uma refatoração
+# mais as matrizes eta dos pivoteamentos feitos desde então
+# As colunas de folga da base são unitárias, então só o bloco k x k formado pelas
+# colunas originais e pelas linhas sem folga básica precisa ser fatorado
+# Com A esparsa (CSC), esse bloco é fatorado como matriz esparsa (splu)
+class _BaseFatorada:
+    def __init__(self, A, base, max_etas=REFATORAR_A_CADA):
+        self.A = A
+        self.esparsa = sp.issparse(A)
+        self.m, self.num_vars = A.shape
+        # As etas ficam em bloco: colunas u em U, linhas de pivô em R e, em M, o sistema
+        # triangular que aplica todas de uma vez (uma solução triangular e um produto U t)
+        self.U = np.zeros((self.m, max_etas))
+        self.R = np.zeros(max_etas, dtype=int)
+        self.M = np.zeros((max_etas, max_etas))
+        self.refatorar(base)
+
+    # Separa a base em colunas originais e folgas e refaz a fatoração do bloco restante
+    def refatorar(self, base):
+        self.num_etas = 0
+        self.originais = np.flatnonzero(base < self.num_vars)
+        self.folgas = np.flatnonzero(base >= self.num_vars)
+        self.linhas_folga = base[self.folgas] - self.num_vars
+        livres = np.ones(self.m, dtype=bool)
+        livres[self.linhas_folga] = False
+        self.linhas_livres = np.flatnonzero(livres)
+
+        self.lu = None
+        if len(self.originais) == 0:
+            return  # Base só de folgas: identidade, nada a fatorar
+        B_K = self.A[:, base[self.originais]]
+        if self.esparsa:
+            B_K = B_K.tocsr()
+            self.B_SK = B_K[self.linhas_folga]
+            self.lu = splu(B_K[self.linhas_livres].tocsc())
+        else:
+            self.B_SK = B_K[self.linhas_folga]
+            self.lu = lu_factor(B_K[self.linhas_livres], check_finite=False)
+
+    def _resolver_bloco(self, v, transposta=False):
+        if self.esparsa:
+            return self.lu.solve(v, trans="T" if transposta else "N")
+        return lu_solve(self.lu, v, trans=1 if transposta else 0, check_finite=False)
+
+    # Resolve B0 x = a para a base da última refatoração
+    def _resolver(self, a):
+        x = np.zeros(self.m)
+        x[self.folgas] = a[self.linhas_folga]
+        if self.lu is not None:
+            x_K = self._resolver_bloco(a[self.linhas_livres])
+            x[self.originais] = x_K
+            x[self.folgas] -= self.B_SK @ x_K
+        return x
+
+    # Resolve B0^T y = c para a base da última refatoração
+    def _resolver_transposta(self, c):
+        y = np.zeros(self.m)
+        y[self.linhas_folga] = c[self.folgas]
+        if self.lu is not None:
+            y[self.linhas_livres] = self._resolver_bloco(c[self.originais] - self.B_SK.T @ c[self.folgas],
+                                                         transposta=True)
+        return y
+
+    # Resolve B x = a
+    def ftran(self, a):
+        x = self._resolver(np.asarray(a, dtype=float))
+        k = self.num_etas
+        if k:
+            R = self.R[:k]
+            t = solve_triangular(self.M[:k, :k], x[R], lower=True, check_finite=False)
+            x -= self.U[:, :k] @ t
+            np.add.at(x, R, t)
+        return x
+
+    # Resolve B^T y = c
+    def btran(self, c):
+        z = np.array(c, dtype=float)
+        k = self.num_etas
+        if k:
+            R = self.R[:k]
+            w = solve_triangular(self.M[:k, :k], z[R] - self.U[:, :k].T @ z, lower=True, trans="T",
+                                 check_finite=False)
+            np.add.at(z, R, w)
+        return self._resolver_transposta(z)
+
+    # Registra a troca da variável na linha r pela coluna cuja direção é u
+    def atualizar(self, r, u):
+        k = self.num_etas
+        self.U[:, k] = u
+        self.M[k, :k] = self.U[r, :k] - (self.R[:k] == r)
+        self.M[k, k] = u[r]
+        self.R[k] = r
+        self.num_etas += 1
+
+    # Indica se o bloco de etas encheu e a base precisa ser refatorada
+    def cheia(self):
+        return self.num_etas == self.U.shape[1]
+
+    # Coluna j da matriz completa [A | I], como vetor denso
+    def coluna(self, j):
+        coluna = np.zeros(self.m)
+        if j >= self.num_vars:
+            coluna[j - self.num_vars] = 1
+        elif self.esparsa:
+            inicio, fim = self.A.indptr[j], self.A.indptr[j + 1]
+            coluna[self.A.indices[inicio:fim]] = self.A.data[inicio:fim]
+        else:
+            coluna[:] = self.A[:, j]
+        return coluna
+
+
+# Simplex revisado: guarda só a base fatorada, sem a tabela completa
+# Aceita A densa ou esparsa; as colunas de folga nunca são materializadas
+# Segue as mesmas regras de entrada e saída do modo tabela, portanto faz os mesmos pivoteamentos
+# Com base_inicial (warm start), parte da base informada: se ela não for viável para este b,
+# mas for dual viável, o simplex dual a recupera; senão, recomeça da base de folgas
+# O simplex dual também desiste e recomeça do zero se passar de limite_dual pivoteamentos
+# Devolve também a base final, para ser reaproveitada na próxima resolução, e o número de pivoteamentos
+def _simplex_revisado(c, A, b, num_eq_constraints, tolerancia, refatorar_a_cada=REFATORAR_A_CADA,
+                      base_inicial=None, AT=None, limite_dual=None):
+    m, num_vars = A.shape
+    base_folgas = num_vars + np.arange(m)
+    base = base_folgas.copy() if base_inicial is None else np.array(base_inicial)
+    custos = np.concatenate([c, np.zeros(m)])
+    if AT is None:
+        # A transposta é montada uma vez só (em CSR, para o produto A^T y da precificação)
+        AT = A.T.tocsr() if sp.issparse(A) else A.T
+    fatoracao = _BaseFatorada(A, base, refatorar_a_cada)
+    valores_base = fatoracao.ftran(b)
+    pivos = 0
+
+    # Custos reduzidos (com o mesmo sinal da última linha da tabela)
+    # As colunas básicas ficam com zero exato, para que o arredondamento não as traga de volta
+    def custos_reduzidos():
+        y = fatoracao.btran(custos[base])
+        reduzidos = np.concatenate([AT @ y - c, y[:num_eq_constraints]])
+        reduzidos[base[base < len(reduzidos)]] = 0
+        return reduzidos
+
+    # Linha r de B^-1 [A | folgas das igualdades]
+    def linha_tabela(r):
+        rho = fatoracao.btran(np.eye(1, m, r).ravel())
+        return np.concatenate([AT @ rho, rho[:num_eq_constraints]])
+
+    def pivotear(pivot_row, pivot_col, u):
+        nonlocal valores_base, pivos
+        pivos += 1
+        theta = valores_base[pivot_row] / u[pivot_row]
+        valores_base -= theta * u
+        valores_base[pivot_row] = theta
+        base[pivot_row] = pivot_col
+        fatoracao.atualizar(pivot_row, u)
+        if fatoracao.cheia():
+            fatoracao.refatorar(base)
+            valores_base = fatoracao.ftran(b)
+
+    if base_inicial is not None and valores_base.min() < -tolerancia:
+        if custos_reduzidos().min() < -tolerancia:
+            # A base anterior não serve nem para o primal nem para o dual: recomeça do zero
+            return _simplex_revisado(c, A, b, num_eq_constraints, tolerancia, refatorar_a_cada, None, AT)
+
+        # Simplex dual: sai a variável mais negativa, entra a de menor razão custo reduzido / |alfa|
+        # Os custos reduzidos são atualizados a cada pivô e recalculados a cada refatoração
+        reduzidos = custos_reduzidos()
+        while True:
+            pivot_row = np.argmin(valores_base)
+            if valores_base[pivot_row] >= -tolerancia:
+                break
+            if limite_dual is not None and pivos >= limite_dual:
+                # A base anterior está longe demais: sai mais barato recomeçar do zero
+                solution, max_profit, base, pivos_frio = _simplex_revisado(
+                    c, A, b, num_eq_constraints, tolerancia, refatorar_a_cada, None, AT)
+                return solution, max_profit, base, pivos + pivos_frio
+            alfa = linha_tabela(pivot_row)
+            alfa[base[base < len(alfa)]] = 0
+            ratios = np.divide(np.maximum(reduzidos, 0), -alfa, out=np.full(len(alfa), np.inf),
+                               where=alfa < -TOLERANCIA_PIVO)
+            pivot_col = np.argmin(ratios)
+            if np.isinf(ratios[pivot_col]):
+                raise Exception("Problema não tem solução viável.")
+
+            passo = reduzidos[pivot_col] / alfa[pivot_col]
+            saindo = base[pivot_row]
+            pivotear(pivot_row, pivot_col, fatoracao.ftran(fatoracao.coluna(pivot_col)))
+            reduzidos -= passo * alfa
+            if saindo < len(reduzidos):
+                reduzidos[saindo] = -passo
+            if fatoracao.num_etas == 0:
+                reduzidos = custos_reduzidos()
+
+    # Simplex primal
+    while True:
+        reduzidos = custos_reduzidos()
+        pivot_col = np.argmin(reduzidos)
+        if reduzidos[pivot_col] >= -tolerancia:
+            break
+        u = fatoracao.ftran(fatoracao.coluna(pivot_col))
+
+        ratios = np.divide(valores_base, u, out=np.full(m, np.inf), where=u > tolerancia)
+        pivot_row = np.argmin(ratios)
+        if np.isinf(ratios[pivot_row]):
+            raise Exception("Problema não tem solução limitada.")
+        pivotear(pivot_row, pivot_col, u)
+
+    solution = _solucao_da_base(base, valores_base, num_vars)
+    # Mesmo valor que o modo tabela devolve (-tableau[-1, -1])
+    max_profit = -(custos[base] @ valores_base)
+    return solution, max_profit, base, pivos
+
+
+# Resolve: maximizar c.x sujeito às restrições A_eq e A_ineq (com folgas), x >= 0
+# A_eq e A_ineq podem ser arrays NumPy ou matrizes scipy.sparse
+# modo="tableau": tabela densa com pivoteamento vetorizado (matrizes esparsas são densificadas)
+# modo="revisado": simplex revisado com base fatorada (menos memória em problemas grandes)
+# modo="auto": revisado quando há matriz esparsa, tabela caso contrário
+# Os pivoteamentos feitos entram no contador "simplex.pivoteamentos" (instrumentacao)
+@etapa("simplex.resolver")
+def simplex_method(c, A_eq, b_eq, A_ineq, b_ineq, modo="auto", tolerancia=TOLERANCIA):
+    c, A, b, num_eq_constraints = _juntar_restricoes(c, A_eq, b_eq, A_ineq, b_ineq)
+    if modo == "auto":
+        modo = "revisado" if sp.issparse(A) else "tableau"
+    contar("simplex.resolucoes")
+    if modo == "tableau":
+        if sp.issparse(A):
+            A = A.toarray()
+        return _simplex_tabela(c, A, b, num_eq_constraints, tolerancia)
+    if modo == "revisado":
+        solution, max_profit, _, pivos = _simplex_revisado(c, A, b, num_eq_constraints, tolerancia)
+        contar("simplex.pivoteamentos", pivos)
+        return solution, max_profit
+    raise ValueError(f"Modo desconhecido: {modo}")
+
+
+# Resolve em sequência uma cadeia de cenários, usando a base final de um como ponto de partida do próximo
+# O simplex dual de cada warm start pode gastar no máximo metade dos pivoteamentos da primeira resolução
+# (a frio); acima disso é mais barato recomeçar da base de folgas
+def _resolver_cadeia(custos, A, lados_direitos, num_eq_constraints, tolerancia):
+    AT = A.T.tocsr() if sp.issparse(A) else A.T
+    solucoes = np.full((len(custos), A.shape[1]), np.nan)
+    lucros = np.full(len(custos), np.nan)
+    erros = [None] * len(custos)
+    base, limite_dual = None, None
+    for k, (c, b) in enumerate(zip(custos, lados_direitos)):
+        try:
+            solucoes[k], lucros[k], base, pivos = _simplex_revisado(
+                c, A, b, num_eq_constraints, tolerancia, base_inicial=base, AT=AT, limite_dual=limite_dual)
+            contar("simplex.resolucoes")
+            contar("simplex.pivoteamentos", pivos)
+            if limite_dual is None:
+                limite_dual = max(pivos // 2, 1)
+        except Exception as e:
+            erros[k] = str(e)
+    return solucoes, lucros, erros
+
+
+# Resolve vários cenários do mesmo problema de uma vez: as matrizes A_eq e A_ineq são fixas
+# e variam os vetores de custo (custos, K x n) e/ou os lados direitos (lados_direitos, K x (m1 + m2),
+# com b_eq seguido de b_ineq). Cenários não informados usam c, b_eq e b_ineq.
+# Cada cenário parte da base ótima do anterior; com processos > 1, blocos de cenários
+# independentes são distribuídos entre processos
+# Devolve as soluções (K x n), os valores devolvidos por simplex_method e a mensagem de erro de cada cenário
+def resolver_lote(c, A_eq, b_eq, A_ineq, b_ineq, custos=None, lados_direitos=None, processos=None,
+                  tolerancia=TOLERANCIA):
+    c, A, b, num_eq_constraints = _juntar_restricoes(c, A_eq, b_eq, A_ineq, b_ineq)
+    num_cenarios = len(custos) if custos is not None else len(lados_direitos) if lados_direitos is not None else 1
+    custos = np.broadcast_to(c, (num_cenarios, len(c))) if custos is None else np.asarray(custos, dtype=float)
+    lados_direitos = (np.broadcast_to(b, (num_cenarios, len(b))) if lados_direitos is None
+                      else np.asarray(lados_direitos, dtype=float))
+    if len(custos) != len(lados_direitos):
+        raise ValueError("custos e lados_direitos devem ter o mesmo número de cenários.")
+
+    if not processos or processos <= 1 or num_cenarios < 2:
+        return _resolver_cadeia(custos, A, lados_direitos, num_eq_constraints, tolerancia)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    blocos = np.array_split(np.arange(num_cenarios), processos)
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = [executor.submit(_resolver_cadeia, custos[bloco], A, lados_direitos[bloco],
+                                   num_eq_constraints, tolerancia) for bloco in blocos if len(bloco)]
+        resultados = [futuro.result() for futuro in futuros]
+
+    solucoes = np.vstack([r[0] for r in resultados])
+    lucros = np.concatenate([r[1] for r in resultados])
+    erros = [erro for r in resultados for erro in r[2]]
+    return solucoes, lucros, erros
@@ -0,0 +1,87 @@
+import numpy as np
+
+from otimizacao import DIAS_UTEIS
+
+
+# Resultado da simulação: valor final de cada caminho e alguns caminhos completos para gráfico
+class ResultadoSimulacao:
+    def __init__(self, valores_finais, caminhos_amostra, investimento):
+        self.valores_finais = valores_finais
+        self.caminhos_amostra = caminhos_amostra
+        self.investimento = investimento
+
+    # Percentis do valor final (em unidades do investimento)
+    def percentis(self, niveis=(5, 25, 50, 75, 95)):
+        return dict(zip(niveis, np.percentile(self.valores_finais, niveis)))
+
+    # Value at Risk: perda (investimento - valor final) que só é superada com probabilidade 1 - nivel
+    def var(self, nivel=0.95):
+        return self.investimento - np.quantile(self.valores_finais, 1 - nivel)
+
+    # Conditional VaR (expected shortfall): perda média nos cenários além do VaR
+    def cvar(self, nivel=0.95):
+        limite = np.quantile(self.valores_finais, 1 - nivel)
+        return self.investimento - self.valores_finais[self.valores_finais <= limite].mean()
+
+    def resumo(self, nivel=0.95):
+        resumo = {f"Percentil {p}%": valor for p, valor in self.percentis().items()}
+        resumo["Valor médio"] = self.valores_finais.mean()
+        resumo[f"VaR {nivel:.0%}"] = self.var(nivel)
+        resumo[f"CVaR {nivel:.0%}"] = self.cvar(nivel)
+        resumo["Probabilidade de perda"] = np.mean(self.valores_finais < self.investimento)
+        return resumo
+
+
+# Simula o valor de uma carteira com pesos constantes (rebalanceada diariamente, como no modelo de Sharpe)
+# ao longo de horizonte pregões, para num_caminhos caminhos, em lotes de tamanho_lote caminhos por vez
+# (a memória usada é de tamanho_lote x horizonte números do tipo dtype)
+# metodo="cholesky": retornos diários normais multivariados com a média e a covariância estimadas;
+#   como o retorno da carteira é w.r e r = mu + L z (L L^T = cov), o choque da carteira é (L^T w).z, uma
+#   normal com desvio ||L^T w|| = sqrt(w^T cov w): sorteada diretamente, sem fatorar a covariância e sem
+#   sortear os N choques de cada ativo
+# metodo="bootstrap": sorteia dias do histórico (retornos_historicos, dias x ativos), com reposição,
+#   preservando a correlação e as caudas observadas
+def simular_carteira(pesos, estatisticas=None, horizonte=DIAS_UTEIS, num_caminhos=100_000, metodo="cholesky",
+                     retornos_historicos=None, investimento=1.0, semente=None, tamanho_lote=10_000,
+                     dtype=np.float64, caminhos_guardados=100):
+    pesos = np.asarray(pesos, dtype=float)
+    dtype = np.dtype(dtype)
+    rng = np.random.default_rng(semente)
+
+    if metodo == "cholesky":
+        if estatisticas is None:
+            raise ValueError("O método cholesky precisa das estatísticas da carteira.")
+        media = estatisticas.retornos_anuais @ pesos / DIAS_UTEIS
+        desvio = np.sqrt(max(pesos @ estatisticas.covariancia_anual @ pesos / DIAS_UTEIS, 0.0))
+
+        def sortear(tamanho):
+            choques = rng.standard_normal((tamanho, horizonte), dtype=dtype)
+            choques *= dtype.type(desvio)
+            choques += dtype.type(media)
+            return choques
+    elif metodo == "bootstrap":
+        if retornos_historicos is None:
+            raise ValueError("O método bootstrap precisa dos retornos históricos.")
+        # Retorno faltante de um ativo em um dia conta como zero para a carteira
+        historico = np.nan_to_num(np.asarray(retornos_historicos, dtype=float)) @ pesos
+        historico = historico.astype(dtype)
+
+        def sortear(tamanho):
+            return historico[rng.integers(0, len(historico), (tamanho, horizonte))]
+    else:
+        raise ValueError(f"Método desconhecido: {metodo}")
+
+    valores_finais = np.empty(num_caminhos, dtype=dtype)
+    caminhos_amostra = None
+    for inicio in range(0, num_caminhos, tamanho_lote):
+        fim = min(inicio + tamanho_lote, num_caminhos)
+        caminhos = sortear(fim - inicio)
+        caminhos += 1
+        np.cumprod(caminhos, axis=1, out=caminhos)
+        valores_finais[inicio:fim] = caminhos[:, -1]
+        if caminhos_amostra is None:
+            caminhos_amostra = caminhos[:caminhos_guardados].copy()
+
+    valores_finais *= dtype.type(investimento)
+    caminhos_amostra *= dtype.type(investimento)
+    return ResultadoSimulacao(valores_finais, caminhos_amostra, investimento)
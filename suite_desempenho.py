@@ -0,0 +1,355 @@
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from alinhamento import alinhar
+from armazenamento import ArmazemPrecos
+from dados_sinteticos import gerar_lp, gerar_lp_esparso, gerar_precos
+from ibovespa import URL_IBOVESPA, extrair_empresas
+from indicadores import calcular_ema, calcular_indicadores, montar_painel
+from modelo_lp import ModeloLP, ler_modelo
+from otimizacao import DIAS_UTEIS, EstatisticasCarteira, maximizar_sharpe
+from painel import PainelPrecos
+from simplex import simplex_method
+
+# Suíte de desempenho com histórico: mede os caminhos principais (otimizador, simplex, indicadores, alinhamento,
+# raspagem da lista do Ibovespa e carga de dados e de modelos de LP) em grades de tamanho, grava cada execução em um
+# arquivo JSON Lines e marca as regressões em relação às execuções anteriores na mesma máquina
+# Exemplos:
+#   python suite_desempenho.py rodar                      # grade rápida, grava no histórico
+#   python suite_desempenho.py rodar simplex --completo   # só os casos cujo nome contém "simplex"
+#   python suite_desempenho.py gravar-dados ibov --tickers PETR4 VALE3 ITUB4 --inicio 2005-01-01
+#   python suite_desempenho.py historico otimizador
+
+# Diretório dos dados gravados e do histórico (pode ser trocado pela variável de ambiente CN1_DIR_BENCHMARK)
+DIRETORIO_SUITE = os.environ.get(
+    "CN1_DIR_BENCHMARK", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "benchmark")
+)
+
+# Razão (tempo atual / referência) acima da qual um caso é marcado como regressão
+LIMITE_REGRESSAO = 1.25
+
+# Número de execuções anteriores usadas como referência (a mediana delas)
+JANELA_REFERENCIA = 5
+
+# Grades de tamanho: a rápida roda em poucos minutos; a completa vai até 500 tickers e 20 anos
+GRADES = {
+    "rapida": {"ativos": (10, 50, 100), "anos": (1, 5), "lp": (50, 100, 200), "lp_esparso": (200, 500)},
+    "completa": {"ativos": (10, 50, 100, 500), "anos": (1, 5, 20), "lp": (50, 100, 200, 400),
+                 "lp_esparso": (200, 500, 1000, 2000)},
+}
+
+
+# Caso de medição: preparar() monta os dados (fora da medição) e executar(dados) é a parte medida
+class Caso:
+    def __init__(self, grupo, parametros, preparar, executar):
+        self.grupo = grupo
+        self.parametros = parametros
+        self.preparar = preparar
+        self.executar = executar
+
+    @property
+    def nome(self):
+        return f"{self.grupo}[{','.join(f'{chave}={valor}' for chave, valor in self.parametros.items())}]"
+
+
+# Mede executar(dados): uma chamada de aquecimento estima o tempo e define quantas chamadas cabem em cada
+# repetição (pelo menos tempo_minimo / repeticoes segundos); devolve estatísticas do tempo por chamada
+def medir(executar, dados, repeticoes=5, tempo_minimo=0.5):
+    inicio = time.perf_counter()
+    executar(dados)
+    estimativa = max(time.perf_counter() - inicio, 1e-6)
+    chamadas = max(1, math.ceil(tempo_minimo / repeticoes / estimativa))
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(chamadas):
+            executar(dados)
+        tempos.append((time.perf_counter() - inicio) / chamadas)
+    return {"mediana": statistics.median(tempos), "minimo": min(tempos),
+            "desvio": statistics.stdev(tempos) if len(tempos) > 1 else 0.0,
+            "repeticoes": repeticoes, "chamadas": chamadas}
+
+
+# Painel de preços de um caso: sintético (gerado com semente fixa) ou gravado com gravar-dados
+def _painel(origem, ativos, anos):
+    if origem == "sintetico":
+        return gerar_precos(ativos, anos * DIAS_UTEIS)
+    painel = PainelPrecos.abrir(os.path.join(DIRETORIO_SUITE, "paineis", origem))
+    return painel.como_dataframe().iloc[-anos * DIAS_UTEIS:, :ativos].astype(np.float64)
+
+
+# Painéis gravados disponíveis, com o número de tickers e de anos de cada um
+def paineis_gravados():
+    diretorio = os.path.join(DIRETORIO_SUITE, "paineis")
+    if not os.path.isdir(diretorio):
+        return {}
+    gravados = {}
+    for nome in sorted(os.listdir(diretorio)):
+        if os.path.exists(os.path.join(diretorio, nome, "tickers.json")):
+            painel = PainelPrecos.abrir(os.path.join(diretorio, nome))
+            gravados[nome] = (len(painel.tickers), max(1, len(painel.datas) // DIAS_UTEIS))
+    return gravados
+
+
+# Página HTML no formato da lista do Ibovespa: a gravada com gravar-dados ou uma sintética
+# (cabeçalho longo, como o da Wikipedia, seguido da tabela com num_empresas linhas)
+def _pagina_ibovespa(num_empresas=90):
+    caminho = os.path.join(DIRETORIO_SUITE, "ibovespa.html")
+    if os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as arquivo:
+            return arquivo.read()
+    cabecalho = "<div><p>Texto da página</p><a href='#'>link</a></div>\n" * 2000
+    linhas = "".join(f"<tr><td>TCK{i}</td><td>Empresa {i} S.A.</td><td>Setor</td></tr>" for i in range(num_empresas))
+    return f"<html><body>{cabecalho}<table class='wikitable sortable'><tr><th>Código</th></tr>{linhas}</table></body></html>"
+
+
+# Armazém temporário com os OHLCV do painel gravados em disco (a fonte nunca é chamada)
+def _armazem_preenchido(df_prices, diretorio):
+    armazem = ArmazemPrecos(diretorio, fonte=lambda simbolos, inicio, fim: {})
+    intervalo = (df_prices.index[0], df_prices.index[-1] + pd.Timedelta(days=1))
+    for ticker in df_prices.columns:
+        fechamento = df_prices[ticker]
+        df = pd.DataFrame({"Open": fechamento, "High": fechamento, "Low": fechamento, "Close": fechamento,
+                           "Adj Close": fechamento, "Volume": 1000.0})
+        armazem.gravar_buscados(f"{ticker}.SA", [df], [intervalo])
+    return armazem, [f"{ticker}.SA" for ticker in df_prices.columns], intervalo
+
+
+# Monta os casos da grade escolhida, para os painéis sintéticos e para os gravados
+# Os arquivos de preparação (modelos de LP, painéis e armazéns) vão para diretorio_temporario, que é de quem
+# chama (ex.: um tempfile.TemporaryDirectory aberto enquanto os casos rodam)
+def montar_casos(diretorio_temporario, grade="rapida"):
+    tamanhos = GRADES[grade]
+    origens = [("sintetico", tamanhos["ativos"], tamanhos["anos"])]
+    for nome, (num_tickers, num_anos) in paineis_gravados().items():
+        origens.append((nome, [a for a in tamanhos["ativos"] if a <= num_tickers] or [num_tickers],
+                        [a for a in tamanhos["anos"] if a <= num_anos] or [num_anos]))
+
+    casos = []
+    for origem, lista_ativos, lista_anos in origens:
+        for ativos in lista_ativos:
+            # O otimizador depende do número de ativos; a estimação e os indicadores, também do histórico
+            casos.append(Caso("otimizador", {"dados": origem, "ativos": ativos, "anos": min(lista_anos[-1], 5)},
+                              lambda o=origem, a=ativos, n=min(lista_anos[-1], 5):
+                              EstatisticasCarteira.de_precos(_painel(o, a, n)),
+                              maximizar_sharpe))
+            for anos in lista_anos:
+                parametros = {"dados": origem, "ativos": ativos, "anos": anos}
+                preparar = lambda o=origem, a=ativos, n=anos: _painel(o, a, n)
+                casos.append(Caso("estatisticas", parametros, preparar, EstatisticasCarteira.de_precos))
+                casos.append(Caso("alinhamento", parametros, preparar, alinhar))
+                casos.append(Caso("indicadores", parametros, preparar, calcular_indicadores))
+                casos.append(Caso("ema", parametros, preparar, calcular_ema))
+
+    for n in tamanhos["lp"]:
+        casos.append(Caso("simplex", {"restricoes": n, "variaveis": n},
+                          lambda n=n: gerar_lp(n, n),
+                          lambda lp: simplex_method(lp[0], np.empty((0, len(lp[0]))), np.empty(0), lp[1], lp[2])))
+    for n in tamanhos["lp_esparso"]:
+        casos.append(Caso("simplex-esparso", {"restricoes": n, "variaveis": 5 * n},
+                          lambda n=n: gerar_lp_esparso(n, 5 * n),
+                          lambda lp: simplex_method(lp[0], np.empty((0, len(lp[0]))), np.empty(0), lp[1], lp[2])))
+
+    # Leitura de modelos de LP gravados em disco (modelo_lp), em MPS e no CSV de coordenadas
+    for n in tamanhos["lp_esparso"]:
+        for formato in ("mps", "csv"):
+            def preparar_modelo(n=n, formato=formato):
+                caminho = os.path.join(diretorio_temporario, f"modelo-{n}.{formato}")
+                if not os.path.exists(caminho):
+                    getattr(ModeloLP.de_matriz(*gerar_lp_esparso(10 * n, 50 * n)), f"salvar_{formato}")(caminho)
+                return caminho
+
+            casos.append(Caso("carga-modelo-lp", {"restricoes": 10 * n, "variaveis": 50 * n, "formato": formato},
+                              preparar_modelo, ler_modelo))
+
+    casos.append(Caso("raspagem", {"pagina": "gravada" if os.path.exists(os.path.join(DIRETORIO_SUITE, "ibovespa.html"))
+                                   else "sintetica"}, _pagina_ibovespa, extrair_empresas))
+
+    # Carga de dados: abertura do painel mapeado em memória (lendo todas as páginas) e leitura do armazém
+    for ativos in tamanhos["ativos"]:
+        anos = tamanhos["anos"][-1]
+
+        def preparar_painel(a=ativos, n=anos):
+            caminho = os.path.join(diretorio_temporario, f"painel-{a}-{n}")
+            if not os.path.exists(caminho):
+                PainelPrecos.de_dataframe(gerar_precos(a, n * DIAS_UTEIS)).salvar(caminho)
+            return caminho
+
+        casos.append(Caso("carga-painel", {"ativos": ativos, "anos": anos}, preparar_painel,
+                          lambda caminho: float(PainelPrecos.abrir(caminho).to_numpy().sum())))
+        if ativos <= 100:
+            casos.append(Caso("carga-armazem", {"ativos": ativos, "anos": anos},
+                              lambda a=ativos, n=anos: _armazem_preenchido(
+                                  gerar_precos(a, n * DIAS_UTEIS), os.path.join(diretorio_temporario, f"armazem-{a}-{n}")),
+                              lambda dados: dados[0].ler_varios(dados[1], *dados[2])))
+    return casos
+
+
+# Identificação da máquina: só execuções na mesma máquina são comparadas entre si
+def identificar_maquina():
+    return {"host": platform.node(), "sistema": platform.system(), "arquitetura": platform.machine(),
+            "python": platform.python_version(), "cpus": os.cpu_count()}
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ler_historico(caminho):
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding="utf-8") as arquivo:
+        return [json.loads(linha) for linha in arquivo if linha.strip()]
+
+
+# Mediana das últimas JANELA_REFERENCIA medianas do caso na mesma máquina (None se não houver)
+def referencia(historico, caso, maquina, janela=JANELA_REFERENCIA):
+    anteriores = [registro["mediana"] for registro in historico
+                  if registro["caso"] == caso and registro["maquina"] == maquina]
+    return statistics.median(anteriores[-janela:]) if anteriores else None
+
+
+# Compara o tempo atual com a referência: "novo" (caso sem histórico), "REGRESSÃO" (em maiúsculas, para se
+# destacar na saída; é o valor procurado por main), "melhora" ou "" (dentro do limite)
+def classificar(mediana, tempo_referencia, limite=LIMITE_REGRESSAO):
+    if tempo_referencia is None:
+        return "novo"
+    if mediana > limite * tempo_referencia:
+        return "REGRESSÃO"
+    if mediana * limite < tempo_referencia:
+        return "melhora"
+    return ""
+
+
+# Roda os casos (os que contêm algum dos filtros no nome), compara com o histórico e grava a execução
+# Devolve os registros medidos, cada um com a referência e a classificação
+def rodar(filtros=(), grade="rapida", repeticoes=5, tempo_minimo=0.5, caminho_historico=None, gravar=True,
+          limite=LIMITE_REGRESSAO):
+    caminho_historico = caminho_historico or os.path.join(DIRETORIO_SUITE, "historico.jsonl")
+    historico = ler_historico(caminho_historico)
+    maquina = identificar_maquina()
+    execucao = {"data": pd.Timestamp.now().isoformat(timespec="seconds"), "commit": _commit_atual()}
+
+    registros = []
+    with tempfile.TemporaryDirectory() as diretorio_temporario:
+        for caso in montar_casos(diretorio_temporario, grade):
+            if filtros and not any(filtro in caso.nome for filtro in filtros):
+                continue
+            resultado = medir(caso.executar, caso.preparar(), repeticoes, tempo_minimo)
+            tempo_referencia = referencia(historico, caso.nome, maquina)
+            registro = dict(execucao, caso=caso.nome, grupo=caso.grupo, parametros=caso.parametros,
+                            maquina=maquina, **resultado)
+            situacao = classificar(resultado["mediana"], tempo_referencia, limite)
+            print(f"{caso.nome:<60} {resultado['mediana'] * 1000:10.3f}ms  ± {resultado['desvio'] * 1000:.3f}  "
+                  + (f"ref {tempo_referencia * 1000:10.3f}ms  {resultado['mediana'] / tempo_referencia:5.2f}x  "
+                     if tempo_referencia else "") + situacao, flush=True)
+            registros.append(dict(registro, referencia=tempo_referencia, situacao=situacao))
+            if gravar:
+                os.makedirs(os.path.dirname(os.path.abspath(caminho_historico)), exist_ok=True)
+                with open(caminho_historico, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    return registros
+
+
+# Grava um painel real (preços ajustados lidos pelo armazém local), para que a suíte rode depois
+# sem rede e sempre sobre os mesmos dados
+def gravar_painel(nome, tickers, inicio, fim=None, armazem=None):
+    armazem = armazem or ArmazemPrecos()
+    dados = armazem.ler_varios([ticker + ".SA" for ticker in tickers], inicio, fim)
+    df_prices = montar_painel(dados, "Adj Close")
+    df_prices.columns = [simbolo.removesuffix(".SA") for simbolo in df_prices.columns]
+    if df_prices.empty:
+        raise RuntimeError("Nenhum preço obtido para gravar.")
+    os.makedirs(os.path.join(DIRETORIO_SUITE, "paineis"), exist_ok=True)
+    PainelPrecos.de_dataframe(df_prices).salvar(os.path.join(DIRETORIO_SUITE, "paineis", nome))
+    return df_prices.shape
+
+
+# Grava a página atual da lista do Ibovespa, usada no caso de raspagem no lugar da página sintética
+def gravar_pagina_ibovespa(timeout=10):
+    import requests
+
+    resposta = requests.get(URL_IBOVESPA, timeout=timeout, headers={"User-Agent": "Cn1/1.0 (suíte de desempenho)"})
+    resposta.raise_for_status()
+    os.makedirs(DIRETORIO_SUITE, exist_ok=True)
+    with open(os.path.join(DIRETORIO_SUITE, "ibovespa.html"), "w", encoding="utf-8") as arquivo:
+        arquivo.write(resposta.text)
+
+
+# Evolução da mediana de cada caso ao longo das execuções gravadas (nesta máquina)
+def mostrar_historico(filtros=(), caminho_historico=None):
+    caminho_historico = caminho_historico or os.path.join(DIRETORIO_SUITE, "historico.jsonl")
+    maquina = identificar_maquina()
+    por_caso = {}
+    for registro in ler_historico(caminho_historico):
+        if registro["maquina"] == maquina and (not filtros or any(filtro in registro["caso"] for filtro in filtros)):
+            por_caso.setdefault(registro["caso"], []).append(registro)
+    for caso, registros in por_caso.items():
+        print(caso)
+        for registro in registros[-10:]:
+            print(f"  {registro['data']}  {registro['commit'] or '-':>10}  {registro['mediana'] * 1000:10.3f}ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suíte de desempenho com histórico e detecção de regressões")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    sub = subparsers.add_parser("rodar", help="mede os casos e compara com o histórico")
+    sub.add_argument("filtros", nargs="*", help="roda só os casos cujo nome contém algum destes textos")
+    sub.add_argument("--completo", action="store_true", help="grade completa (até 500 tickers e 20 anos)")
+    sub.add_argument("--repeticoes", type=int, default=5)
+    sub.add_argument("--tempo-minimo", type=float, default=0.5, help="segundos mínimos de medição por caso")
+    sub.add_argument("--historico", help="arquivo JSON Lines do histórico")
+    sub.add_argument("--nao-gravar", action="store_true", help="não acrescenta esta execução ao histórico")
+    sub.add_argument("--limite", type=float, default=LIMITE_REGRESSAO, help="razão que conta como regressão")
+    sub.add_argument("--falhar-em-regressao", action="store_true", help="código de saída 1 se houver regressão")
+
+    sub = subparsers.add_parser("gravar-dados", help="grava um painel real e a página do Ibovespa para uso offline")
+    sub.add_argument("nome")
+    sub.add_argument("--tickers", nargs="+", required=True)
+    sub.add_argument("--inicio", required=True)
+    sub.add_argument("--fim")
+    sub.add_argument("--sem-pagina", action="store_true", help="não grava a página da lista do Ibovespa")
+
+    sub = subparsers.add_parser("historico", help="mostra a evolução dos casos nesta máquina")
+    sub.add_argument("filtros", nargs="*")
+    sub.add_argument("--historico")
+
+    args = parser.parse_args(argv)
+    if args.comando == "gravar-dados":
+        linhas, colunas = gravar_painel(args.nome, args.tickers, args.inicio, args.fim)
+        print(f"painel {args.nome}: {linhas} dias x {colunas} tickers gravado em {DIRETORIO_SUITE}")
+        if not args.sem_pagina:
+            gravar_pagina_ibovespa()
+            print("página da lista do Ibovespa gravada")
+        return 0
+    if args.comando == "historico":
+        mostrar_historico(args.filtros, args.historico)
+        return 0
+
+    registros = rodar(args.filtros, "completa" if args.completo else "rapida", args.repeticoes, args.tempo_minimo,
+                      args.historico, not args.nao_gravar, args.limite)
+    regressoes = [registro["caso"] for registro in registros if registro["situacao"] == "REGRESSÃO"]
+    if regressoes:
+        print(f"{len(regressoes)} regressão(ões): " + ", ".join(regressoes))
+    return 1 if regressoes and args.falhar_em_regressao else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+from alinhamento import POLITICAS, alinhar
+from armazenamento import ArmazemPrecos
+from indicadores import calcular_indicadores, montar_painel
+from otimizacao import TAXA_LIVRE_DE_RISCO, maximizar_sharpe
+from precos import baixar_precos
+from selecao import melhores_k
+
+# Funções de cálculo sem interface: recebem um "job" (dicionário, como lido de um arquivo JSON)
+# e devolvem uma lista de linhas (dicionários planos), prontas para JSON Lines ou Parquet
+# Campos comuns dos jobs de preços:
+#   "precos": arquivo CSV/Parquet com o painel largo (datas x tickers), ou
+#   "tickers": lista de tickers da B3 (sem ".SA"), lidos pelo armazém local, com "inicio" e "fim"
+
+_armazem = None
+
+
+def _armazem_padrao():
+    global _armazem
+    if _armazem is None:
+        _armazem = ArmazemPrecos()
+    return _armazem
+
+
+# Lê um painel largo de preços (datas nas linhas, tickers nas colunas) de CSV ou Parquet
+def ler_painel_arquivo(caminho):
+    if str(caminho).endswith(".parquet"):
+        df = pd.read_parquet(caminho)
+    else:
+        df = pd.read_csv(caminho, index_col=0)
+    df.index = pd.to_datetime(df.index)
+    return df.sort_index()
+
+
+# Painel de preços do job: do arquivo informado ou do armazém local (coluna "Adj Close" ou outra)
+def painel_do_job(job, coluna="Adj Close"):
+    if "precos" in job:
+        return ler_painel_arquivo(job["precos"])
+    tickers = job["tickers"]
+    df_prices, _ = baixar_precos(tickers, job.get("inicio"), job.get("fim"),
+                                 fonte=_armazem_padrao().como_fonte(coluna))
+    return df_prices
+
+
+# optimize: pesos da carteira de Sharpe máximo, uma linha por ticker
+# Com "k" no job, a carteira tem exatamente k ativos (selecao.melhores_k, com "peso_minimo", "peso_maximo"
+# e "tempo_limite" opcionais) e só os ativos escolhidos aparecem; "gap" é o gap de otimalidade da seleção
+# "politica" escolhe o tratamento de dados faltantes (alinhamento.POLITICAS); tickers descartados não aparecem
+def otimizar(job):
+    alinhado = alinhar(painel_do_job(job), **POLITICAS[job.get("politica", "preencher")])
+    estatisticas = alinhado.estatisticas(job.get("estimador", "amostral"))
+    taxa = job.get("taxa_livre_de_risco", TAXA_LIVRE_DE_RISCO)
+    if "k" in job:
+        selecao = melhores_k(estatisticas, int(job["k"]), job.get("peso_minimo", 0.0), job.get("peso_maximo", 1.0),
+                             taxa, tempo_limite=job.get("tempo_limite", 10.0))
+        pesos, gap = selecao.pesos, selecao.gap
+    else:
+        pesos, gap = maximizar_sharpe(estatisticas, taxa, limites=tuple(job.get("limites", (0, 1)))), 0.0
+    retorno, volatilidade = estatisticas.retorno_e_volatilidade(pesos)
+    sharpe = estatisticas.sharpe(pesos, taxa)
+    return [{"id": job.get("id"), "ticker": str(ticker), "peso": float(peso), "sharpe": float(sharpe),
+             "retorno": float(retorno), "volatilidade": float(volatilidade), "gap": float(gap)}
+            for ticker, peso in zip(alinhado.tickers, pesos) if "k" not in job or peso > 1e-6]
+
+
+# screen: tendência, médias e volatilidade de cada ticker (mesmos indicadores de terceiro.py)
+def triar(job):
+    if "precos" in job:
+        painel = ler_painel_arquivo(job["precos"])
+    else:
+        simbolos = [ticker + ".SA" for ticker in job["tickers"]]
+        dados = _armazem_padrao().ler_varios(simbolos, job.get("inicio"), job.get("fim"))
+        painel = montar_painel(dados, job.get("coluna", "Close"))
+        painel.columns = [simbolo.removesuffix(".SA") for simbolo in painel.columns]
+    indicadores = calcular_indicadores(painel, job.get("curto", 10), job.get("longo", 50))
+    return [{"id": job.get("id"), "ticker": str(ticker),
+             "preco_atual": float(linha["Preço atual"]), "media_curta": float(linha["Média curta"]),
+             "media_longa": float(linha["Média longa"]), "tendencia": linha["Tendência"],
+             "volatilidade": float(linha["Volatilidade (%)"])}
+            for ticker, linha in indicadores.iterrows()]
+
+
+# Lê os dados do LP: direto do job (listas) ou de um arquivo .npz com c, A_eq, b_eq, A_ineq, b_ineq
+def dados_lp(job):
+    origem = np.load(job["arquivo"]) if "arquivo" in job else job
+    c = np.asarray(origem["c"], dtype=float)
+    n = len(c)
+
+    def matriz(nome):
+        return np.asarray(origem[nome], dtype=float).reshape(-1, n) if nome in origem else np.empty((0, n))
+
+    def vetor(nome):
+        return np.asarray(origem[nome], dtype=float).ravel() if nome in origem else np.empty(0)
+
+    return c, matriz("A_eq"), vetor("b_eq"), matriz("A_ineq"), vetor("b_ineq")
+
+
+# solve-lp: resolve o LP do job com simplex_method
+# Com "modelo" (arquivo .mps, .csv ou .npz, lido por modelo_lp), devolve o objetivo no sentido do modelo e os
+# nomes das variáveis; "maximizar" vale para os modelos em CSV
+# (o solver e o SciPy só são importados por quem resolve LPs, não pelas outras tarefas da CLI)
+def resolver_lp(job):
+    if "modelo" in job:
+        from modelo_lp import ler_modelo
+
+        solucao = ler_modelo(job["modelo"], maximizar=job.get("maximizar", True)).resolver(job.get("modo", "auto"))
+        return [{"id": job.get("id"), "objetivo": solucao.objetivo, "variaveis": list(solucao.nomes),
+                 "solucao": solucao.valores.tolist()}]
+
+    from simplex import simplex_method
+
+    solucao, lucro = simplex_method(*dados_lp(job), modo=job.get("modo", "auto"))
+    return [{"id": job.get("id"), "lucro": float(lucro), "solucao": np.asarray(solucao, dtype=float).tolist()}]
+
+
+TAREFAS = {
+    "optimize": otimizar,
+    "screen": triar,
+    "solve-lp": resolver_lp,
+}
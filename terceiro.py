@@ -1,44 +1,18 @@
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
 import streamlit as st
-import yfinance as yf
 
-# Função para obter a lista de empresas da Ibovespa
-def obter_empresas_ibovespa():
-    url = "https://pt.wikipedia.org/wiki/Lista_de_companhias_citadas_no_Ibovespa"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
-    table = soup.find("table", {"class": "wikitable"})
+from aquisicao import iterar_ohlcv
+from armazenamento import ArmazemPrecos
+from ibovespa import obter_empresas_ibovespa
+from indicadores import calcular_indicadores, montar_painel
 
-    empresas = []
-    for row in table.find_all("tr")[1:]:
-        cols = row.find_all("td")
-        empresas.append(cols[0].text.strip())
+# Armazém local de preços: as consultas repetidas são lidas do disco
+ARMAZEM = ArmazemPrecos()
 
-    return empresas
-
-# Função para obter os dados da ação selecionada
-def get_stock_data(symbol):
-    stock_data = yf.download(symbol, start="2024-01-01", end="2024-03-06")
-    return stock_data
-
-# Função para determinar a tendência da ação com base no preço atual e média móvel
-def determinar_tendencia(stock_data):
-    current_price = stock_data['Close'][-1]
-    short_term_avg = stock_data['Close'][-10:].mean()
-    long_term_avg = stock_data['Close'][-50:].mean()
-
-    if current_price > short_term_avg > long_term_avg:
-        return "Tendência de alta"
-    elif current_price < short_term_avg < long_term_avg:
-        return "Tendência de baixa"
-    else:
-        return "Sem tendência clara"
-
-# Função para determinar a volatilidade da ação
-def determinar_volatilidade(stock_data):
-    return stock_data['Close'].pct_change().std() * 100
+# Função para obter os dados das ações selecionadas
+# Os dados vêm do armazém local; os intervalos que faltam são baixados em paralelo (asyncio)
+# e cada ação é entregue como (symbol, dados) assim que chega
+def get_stock_data(symbols, start="2024-01-01", end="2024-03-06"):
+    return iterar_ohlcv(symbols, start, end, armazem=ARMAZEM)
 
 # Obtendo a lista de empresas da Ibovespa
 empresas_ibovespa = obter_empresas_ibovespa()
@@ -56,16 +30,39 @@ selected_companies = st.multiselect(
 st.write("Empresas selecionadas:")
 st.write(selected_companies)
 
-# Exibindo os dados da ação para as empresas selecionadas
-for company in selected_companies:
+# Reservando um espaço para cada empresa, na ordem da seleção
+# Adicionando ".SA" para o símbolo de cada empresa
+symbols = [company + ".SA" for company in selected_companies]
+secoes = {}
+for company, symbol in zip(selected_companies, symbols):
     st.subheader(f"Dados da ação para {company}")
-    stock_data = get_stock_data(company + ".SA")  # Adicionando ".SA" para o símbolo da empresa
-    st.write(stock_data)
+    secoes[symbol] = st.empty()
+    secoes[symbol].info("Carregando...")
+
+# Exibindo os dados de cada ação assim que eles chegam, sem esperar pela mais lenta
+recebidos = {}
+resumos = {}
+for symbol, stock_data in get_stock_data(symbols):
+    secao = secoes[symbol].container()
+    if stock_data.empty:
+        secao.warning(f"Sem dados de preço para {symbol}.")
+        continue
+    secao.write(stock_data)
+    resumos[symbol] = secao.empty()
+    resumos[symbol].info("Calculando indicadores...")
+    recebidos[symbol] = stock_data
+
+# Indicadores de todas as ações recebidas em uma única passada vetorizada sobre o painel
+if recebidos:
+    indicadores = calcular_indicadores(montar_painel(recebidos, "Close"))
+    for symbol, resumo in resumos.items():
+        if symbol not in indicadores.index:
+            resumo.warning(f"Sem dados de preço para {symbol}.")
+            continue
+        resumo = resumo.container()
 
-    # Determinar a tendência da ação
-    trend = determinar_tendencia(stock_data)
-    st.write(f"Tendência: {trend}")
+        # Determinar a tendência da ação
+        resumo.write(f"Tendência: {indicadores.at[symbol, 'Tendência']}")
 
-    # Determinar a volatilidade da ação
-    volatility = determinar_volatilidade(stock_data)
-    st.write(f"Volatilidade: {volatility:.2f}%")
+        # Determinar a volatilidade da ação
+        resumo.write(f"Volatilidade: {indicadores.at[symbol, 'Volatilidade (%)']:.2f}%")
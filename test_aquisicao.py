@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+# Teste offline do pipeline de aquisição (aquisicao.py) e das páginas que o usam (terceiro.py e quinto.py):
+# um servidor local imita o endpoint /v8/finance/chart do Yahoo Finance e CN1_URL_YAHOO aponta para ele
+# Símbolos especiais do servidor falso: LENTO.SA demora, NADA.SA não existe (404), INSTAVEL.SA responde
+# 503 na primeira requisição, QUEBRADO.SA sempre responde 500 e SEMPREGAO.SA responde sem nenhum pregão
+# Uso: python -m pytest -q test_aquisicao.py
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+_requisicoes = []
+_falhou = set()
+
+
+async def _grafico(pedido):
+    simbolo = pedido.match_info["simbolo"]
+    _requisicoes.append(simbolo)
+    if simbolo == "NADA.SA":
+        return web.json_response({"chart": {"result": None, "error": {"code": "Not Found"}}}, status=404)
+    if simbolo == "INSTAVEL.SA" and simbolo not in _falhou:
+        _falhou.add(simbolo)
+        return web.Response(status=503)
+    if simbolo == "QUEBRADO.SA":
+        return web.Response(status=500)
+    if simbolo == "SEMPREGAO.SA":
+        return web.json_response({"chart": {"result": [{"meta": {}, "indicators": {"quote": [{}]}}], "error": None}})
+    await asyncio.sleep(0.5 if simbolo == "LENTO.SA" else 0.02)
+    inicio = pd.Timestamp(int(pedido.query["period1"]), unit="s")
+    fim = pd.Timestamp(int(pedido.query["period2"]), unit="s")
+    datas = pd.bdate_range(inicio, fim - pd.Timedelta(days=1))
+    marcas = [int((data + pd.Timedelta(hours=13)).timestamp()) for data in datas]
+    precos = np.linspace(10, 20, len(marcas)).tolist()
+    cotacoes = {"open": precos, "high": precos, "low": precos, "close": precos, "volume": [100] * len(marcas)}
+    return web.json_response({"chart": {"result": [{
+        "meta": {"gmtoffset": -10800}, "timestamp": marcas,
+        "indicators": {"quote": [cotacoes], "adjclose": [{"adjclose": precos}]},
+    }], "error": None}})
+
+
+# Sobe o servidor falso em uma thread, numa porta livre, e devolve o endereço base
+def _iniciar_servidor():
+    with socket.socket() as provisorio:
+        provisorio.bind(("127.0.0.1", 0))
+        porta = provisorio.getsockname()[1]
+    pronto = threading.Event()
+
+    async def servir():
+        app = web.Application()
+        app.router.add_get("/v8/finance/chart/{simbolo}", _grafico)
+        executor = web.AppRunner(app)
+        await executor.setup()
+        await web.TCPSite(executor, "127.0.0.1", porta).start()
+        pronto.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(servir()), daemon=True).start()
+    pronto.wait(10)
+    return f"http://127.0.0.1:{porta}"
+
+
+# As configurações são lidas na importação dos módulos: o ambiente é montado antes deles
+URL = _iniciar_servidor()
+_temporario = tempfile.mkdtemp()
+with open(os.path.join(_temporario, "ibovespa.json"), "w", encoding="utf-8") as _arquivo:
+    json.dump({"empresas": ["A", "LENTO", "NADA"], "versao": "teste", "etag": None, "last_modified": None,
+               "atualizado_em": time.time()}, _arquivo)
+os.environ.update(CN1_URL_YAHOO=URL, CN1_DIR_PRECOS=os.path.join(_temporario, "precos"),
+                  CN1_SNAPSHOT_IBOVESPA=os.path.join(_temporario, "ibovespa.json"))
+
+from aquisicao import iterar_ohlcv  # noqa: E402
+from armazenamento import ArmazemPrecos  # noqa: E402
+
+
+def test_entrega_cada_simbolo_ao_chegar():
+    simbolos = ["LENTO.SA", "A.SA", "NADA.SA", "INSTAVEL.SA", "B.SA"]
+    chegadas = list(iterar_ohlcv(simbolos, "2024-01-01", "2024-03-06", por_segundo=100, espera=0.05))
+    ordem = [simbolo for simbolo, _ in chegadas]
+    assert sorted(ordem) == sorted(simbolos)
+    assert ordem[-1] == "LENTO.SA"
+    dados = dict(chegadas)
+    assert dados["NADA.SA"].empty
+    assert len(dados["INSTAVEL.SA"]) == len(dados["A.SA"]) == len(pd.bdate_range("2024-01-01", "2024-03-05"))
+    assert list(dados["A.SA"].columns) == ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+
+
+def test_armazem_busca_so_os_trechos_faltantes():
+    armazem = ArmazemPrecos(tempfile.mkdtemp())
+    list(iterar_ohlcv(["A.SA"], "2024-01-01", "2024-02-01", armazem=armazem))
+    antes = len(_requisicoes)
+    chegadas = dict(iterar_ohlcv(["A.SA"], "2024-01-01", "2024-03-06", armazem=armazem))
+    assert len(_requisicoes) == antes + 1
+    assert chegadas["A.SA"].index.min() == pd.Timestamp("2024-01-01")
+    antes = len(_requisicoes)
+    list(iterar_ohlcv(["A.SA"], "2024-01-10", "2024-03-01", armazem=armazem))
+    assert len(_requisicoes) == antes
+
+
+def test_trecho_passado_vazio_fica_coberto_e_falha_nao():
+    armazem = ArmazemPrecos(tempfile.mkdtemp())
+    chegadas = dict(iterar_ohlcv(["SEMPREGAO.SA", "QUEBRADO.SA"], "2024-01-01", "2024-02-01", armazem=armazem,
+                                 espera=0.01))
+    assert chegadas["SEMPREGAO.SA"].empty and "Close" in chegadas["SEMPREGAO.SA"].columns
+    assert armazem.cobertura("SEMPREGAO.SA") == (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-01"))
+    assert armazem.cobertura("QUEBRADO.SA") is None
+    assert chegadas["QUEBRADO.SA"]["Close"].empty
+
+
+def test_paginas_mostram_dados_e_indicadores():
+    from streamlit.testing.v1 import AppTest
+
+    for pagina in ("terceiro.py", "quinto.py"):
+        app = AppTest.from_file(os.path.join(DIRETORIO, pagina), default_timeout=60).run()
+        app.multiselect[0].set_value(["A", "LENTO", "NADA"]).run()
+        assert not app.exception
+        textos = [markdown.value for markdown in app.markdown]
+        assert sum(texto.startswith("Tendência:") for texto in textos) == 2
+        assert [aviso.value for aviso in app.warning] == ["Sem dados de preço para NADA.SA."]
@@ -0,0 +1,48 @@
+import pandas as pd
+
+from armazenamento import ArmazemPrecos
+
+# Testes do armazém local de preços (armazenamento.py) com fontes falsas, sem rede
+# Uso: python -m pytest -q test_armazenamento.py
+
+
+# Fonte falsa: devolve um pregão por dia útil para os símbolos pedidos, menos os de falhar,
+# e guarda as chamadas recebidas
+class FonteFalsa:
+    def __init__(self, falhar=()):
+        self.falhar = set(falhar)
+        self.chamadas = []
+
+    def __call__(self, simbolos, inicio, fim):
+        self.chamadas.append((list(simbolos), inicio, fim))
+        datas = pd.bdate_range(inicio, pd.Timestamp(fim) - pd.Timedelta(days=1), name="Date")
+        return {simbolo: pd.DataFrame({"Close": 10.0, "Adj Close": 10.0}, index=datas)
+                for simbolo in simbolos if simbolo not in self.falhar}
+
+
+def test_simbolo_nao_devolvido_nao_fica_coberto(tmp_path):
+    falha = ArmazemPrecos(str(tmp_path), fonte=lambda simbolos, inicio, fim: {})
+    assert falha.ler_varios(["A.SA"], "2022-01-01", "2022-12-31") == {}
+    assert falha.cobertura("A.SA") is None
+
+    boa = FonteFalsa()
+    armazem = ArmazemPrecos(str(tmp_path), fonte=boa)
+    assert len(armazem.ler("A.SA", "2022-01-01", "2022-12-31")) == len(pd.bdate_range("2022-01-01", "2022-12-30"))
+    assert len(boa.chamadas) == 1
+
+
+def test_falha_parcial_fica_fora_do_resultado(tmp_path):
+    fonte = FonteFalsa()
+    armazem = ArmazemPrecos(str(tmp_path), fonte=fonte)
+    armazem.ler_varios(["A.SA", "B.SA"], "2022-01-01", "2022-07-01")
+
+    fonte.falhar = {"B.SA"}
+    dados = armazem.ler_varios(["A.SA", "B.SA"], "2022-01-01", "2022-12-31")
+    assert list(dados) == ["A.SA"]
+    assert armazem.cobertura("A.SA") == (pd.Timestamp("2022-01-01"), pd.Timestamp("2022-12-31"))
+    assert armazem.cobertura("B.SA") == (pd.Timestamp("2022-01-01"), pd.Timestamp("2022-07-01"))
+
+    fonte.falhar = set()
+    dados = armazem.ler_varios(["A.SA", "B.SA"], "2022-01-01", "2022-12-31")
+    assert sorted(dados) == ["A.SA", "B.SA"]
+    assert fonte.chamadas[-1] == (["B.SA"], "2022-07-01", "2022-12-31")
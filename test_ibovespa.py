@@ -0,0 +1,67 @@
+import json
+import time
+
+import pytest
+import requests
+
+import ibovespa
+from ibovespa import extrair_empresas, obter_snapshot_ibovespa
+
+# Testes da lista de empresas do Ibovespa (ibovespa.py) com uma sessão HTTP falsa, sem rede
+# Uso: python -m pytest -q test_ibovespa.py
+
+
+# Sessão falsa: conta as consultas e falha com erro de conexão enquanto fora_do_ar for verdadeiro
+class SessaoFalsa:
+    def __init__(self):
+        self.consultas = 0
+        self.fora_do_ar = True
+
+    def get(self, url, headers=None, timeout=None):
+        self.consultas += 1
+        if self.fora_do_ar:
+            raise requests.ConnectionError("site fora do ar")
+        resposta = requests.Response()
+        resposta.status_code = 304
+        return resposta
+
+
+@pytest.fixture
+def sessao(monkeypatch):
+    falsa = SessaoFalsa()
+    monkeypatch.setattr(ibovespa, "_sessao", falsa)
+    monkeypatch.setattr(ibovespa, "_memoria", {})
+    return falsa
+
+
+def test_falha_com_snapshot_vencido_espera_antes_de_tentar_de_novo(tmp_path, sessao):
+    caminho = str(tmp_path / "ibovespa.json")
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({"empresas": ["PETR4"], "versao": "v", "etag": "e", "last_modified": None,
+                   "atualizado_em": time.time() - 2 * ibovespa.TTL_PADRAO}, arquivo)
+
+    for _ in range(5):
+        assert obter_snapshot_ibovespa(caminho=caminho, espera_apos_falha=60)["empresas"] == ["PETR4"]
+    assert sessao.consultas == 1
+
+    # Passada a espera, a consulta é refeita; a resposta 304 renova a validade e some a próxima tentativa
+    ibovespa._memoria[caminho]["proxima_tentativa"] = time.time() - 1
+    sessao.fora_do_ar = False
+    snapshot = obter_snapshot_ibovespa(caminho=caminho, espera_apos_falha=60)
+    assert sessao.consultas == 2 and "proxima_tentativa" not in snapshot
+    with open(caminho, encoding="utf-8") as arquivo:
+        assert "proxima_tentativa" not in json.load(arquivo)
+    obter_snapshot_ibovespa(caminho=caminho)
+    assert sessao.consultas == 2
+
+
+def test_falha_sem_snapshot_levanta_erro(tmp_path, sessao):
+    with pytest.raises(requests.ConnectionError):
+        obter_snapshot_ibovespa(caminho=str(tmp_path / "ibovespa.json"))
+
+
+def test_so_linhas_com_duas_celulas_viram_empresas():
+    html = ("<table class='wikitable sortable'><tr><th>Código</th><th>Nome</th></tr>"
+            "<tr><td>PETR4</td><td>Petrobras</td></tr><tr><td colspan=2>Nota</td></tr>"
+            "<tr><td>VALE3<td>Vale</tr></table>")
+    assert extrair_empresas(html) == ["PETR4", "VALE3"]
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from painel import chave_painel, obter_painel
+from precos import baixar_precos
+
+# Testes dos painéis de preços gravados em disco (painel.py), sem rede
+# Uso: python -m pytest -q test_painel.py
+
+DATAS = pd.bdate_range("2023-01-02", periods=40)
+
+
+# Monta o painel como Projeto 1.carregar_precos: download em lotes por uma fonte falsa sem os tickers
+# de ausentes, e o painel só é gravado se o relatório não tiver falhas
+def _obter(diretorio, tickers, ausentes, construcoes):
+    def fonte(lote, inicio, fim):
+        return {ticker: pd.Series(1.0 + i, index=DATAS) for i, ticker in enumerate(lote) if ticker not in ausentes}
+
+    relatorio = []
+
+    def construir():
+        construcoes.append(1)
+        df, relatorio_download = baixar_precos(tickers, "2023-01-02", "2023-03-01", fonte=fonte, espera=0)
+        relatorio.extend(relatorio_download)
+        return df
+
+    painel = obter_painel(chave_painel(tickers, "2023-01-02", "2023-03-01", None), construir, diretorio=diretorio,
+                          completo=lambda: not any(lote["falhas"] for lote in relatorio))
+    return painel, relatorio
+
+
+def test_painel_parcial_nao_fica_gravado(tmp_path):
+    construcoes = []
+    painel, relatorio = _obter(str(tmp_path), ["AAA", "BBB"], {"BBB"}, construcoes)
+    assert painel.tickers == ["AAA"] and relatorio[0]["falhas"] == ["BBB"]
+
+    painel, relatorio = _obter(str(tmp_path), ["AAA", "BBB"], set(), construcoes)
+    assert painel.tickers == ["AAA", "BBB"] and relatorio[0]["falhas"] == []
+    assert len(construcoes) == 2
+
+    # Completo, o painel fica gravado e é reaberto do disco sem montar de novo
+    painel, relatorio = _obter(str(tmp_path), ["AAA", "BBB"], {"AAA", "BBB"}, construcoes)
+    assert painel.tickers == ["AAA", "BBB"] and relatorio == []
+    assert len(construcoes) == 2
+    assert isinstance(painel.valores, np.memmap)
+
+
+def test_paineis_menos_usados_sao_apagados(tmp_path):
+    df = pd.DataFrame(np.ones((len(DATAS), 2)), index=DATAS, columns=["A", "B"])
+    for chave in ("k1", "k2", "k3"):
+        obter_painel(chave, lambda: df, diretorio=str(tmp_path), guardados=2)
+        obter_painel("k1", lambda: df, diretorio=str(tmp_path), guardados=2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["k1", "k3"]
@@ -0,0 +1,77 @@
+import threading
+
+import pandas as pd
+
+from armazenamento import ArmazemPrecos
+from precos import baixar_precos
+
+# Testes do download em lotes (precos.py) com fontes falsas locais, sem rede
+# Uso: python -m pytest -q test_precos.py
+
+INICIO, FIM = "2023-01-02", "2023-03-01"
+DATAS = pd.bdate_range(INICIO, "2023-02-28")
+
+
+# Fonte falsa no formato de precos.baixar_precos: RUIM nunca volta, as primeiras falhas_lote chamadas
+# com mais de um ticker levantam erro (lote instável) e cada chamada é registrada
+class FonteFalsa:
+    def __init__(self, falhas_lote=0, ausentes=("RUIM",)):
+        self.falhas_lote = falhas_lote
+        self.ausentes = set(ausentes)
+        self.chamadas = []
+        self._trava = threading.Lock()
+
+    def __call__(self, tickers, start_date, end_date):
+        with self._trava:
+            self.chamadas.append(list(tickers))
+            if len(tickers) > 1 and self.falhas_lote:
+                self.falhas_lote -= 1
+                raise ConnectionError("lote instável")
+        return {ticker: pd.Series(float(i + 1), index=DATAS) for i, ticker in enumerate(tickers)
+                if ticker not in self.ausentes}
+
+
+def test_ticker_ruim_e_reportado_e_os_bons_voltam():
+    fonte = FonteFalsa(falhas_lote=1)
+    df, relatorio = baixar_precos(["AAA", "RUIM", "BBB", "CCC"], INICIO, FIM, fonte=fonte, tamanho_lote=2,
+                                  max_workers=1, tentativas=3, espera=0)
+    assert list(df.columns) == ["AAA", "BBB", "CCC"]
+    assert len(df) == len(DATAS)
+    # Primeiro lote: falha uma vez, a segunda tentativa volta sem RUIM, que é tentado sozinho e falha de novo
+    assert relatorio[0]["tentativas"] == 2 and relatorio[0]["falhas"] == ["RUIM"] and relatorio[0]["erro"] is None
+    assert relatorio[1]["tentativas"] == 1 and relatorio[1]["falhas"] == []
+    assert fonte.chamadas == [["AAA", "RUIM"], ["AAA", "RUIM"], ["RUIM"], ["BBB", "CCC"]]
+
+
+def test_lote_que_sempre_falha_e_recuperado_ticker_a_ticker():
+    fonte = FonteFalsa(falhas_lote=10)
+    df, relatorio = baixar_precos(["AAA", "BBB", "RUIM"], INICIO, FIM, fonte=fonte, tamanho_lote=3,
+                                  tentativas=2, espera=0)
+    assert list(df.columns) == ["AAA", "BBB"]
+    assert relatorio[0]["tentativas"] == 2
+    assert relatorio[0]["falhas"] == ["RUIM"]
+    assert relatorio[0]["erro"] == "lote instável"
+    assert fonte.chamadas[2:] == [["AAA"], ["BBB"], ["RUIM"]]
+
+
+# A nova tentativa ticker a ticker passa pelo armazém e chega à fonte: uma falha anterior não fica
+# gravada como intervalo coberto sem dados
+def test_nova_tentativa_pelo_armazem_chega_a_fonte(tmp_path):
+    simbolos = FonteFalsa(ausentes=("RUIM.SA", "BBB.SA"))
+
+    def fonte_ohlcv(lista, inicio, fim):
+        return {simbolo: serie.to_frame("Adj Close") for simbolo, serie in simbolos(lista, inicio, fim).items()}
+
+    armazem = ArmazemPrecos(str(tmp_path), fonte=fonte_ohlcv)
+    df, relatorio = baixar_precos(["AAA", "BBB", "RUIM"], INICIO, FIM, fonte=armazem.como_fonte(), espera=0)
+    assert list(df.columns) == ["AAA"]
+    assert relatorio[0]["falhas"] == ["BBB", "RUIM"]
+    assert simbolos.chamadas == [["AAA.SA", "BBB.SA", "RUIM.SA"], ["BBB.SA"], ["RUIM.SA"]]
+
+    # BBB volta a responder: a próxima leitura busca só o que falhou e o encontra
+    simbolos.ausentes = {"RUIM.SA"}
+    simbolos.chamadas.clear()
+    df, relatorio = baixar_precos(["AAA", "BBB", "RUIM"], INICIO, FIM, fonte=armazem.como_fonte(), espera=0)
+    assert list(df.columns) == ["AAA", "BBB"]
+    assert relatorio[0]["falhas"] == ["RUIM"]
+    assert simbolos.chamadas == [["BBB.SA", "RUIM.SA"], ["RUIM.SA"]]
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from scipy.optimize import linprog
+
+from dados_sinteticos import gerar_lp, gerar_lp_esparso
+from modelo_lp import ModeloLP
+from simplex import resolver_lote, simplex_method
+
+# Equivalência do simplex (simplex.py e modelo_lp.py) com o scipy.optimize.linprog (HiGHS) em LPs
+# limitados que partem da base de folgas (A > 0 e b > 0)
+# simplex_method devolve o valor do objetivo com o sinal do linprog (o ótimo de max c.x com sinal trocado)
+# Uso: python -m pytest -q test_simplex.py
+
+TAMANHOS = [(5, 8), (20, 30), (40, 25), (60, 60)]
+
+
+def _referencia(c, A, b, limites=(0, None)):
+    resultado = linprog(-c, A_ub=A, b_ub=b, bounds=limites, method="highs")
+    assert resultado.status == 0
+    return resultado.fun
+
+
+@pytest.mark.parametrize("modo", ["tableau", "revisado"])
+@pytest.mark.parametrize("num_restricoes, num_vars", TAMANHOS)
+def test_simplex_denso_igual_ao_linprog(modo, num_restricoes, num_vars):
+    c, A, b = gerar_lp(num_restricoes, num_vars, semente=num_restricoes)
+    vazio_A, vazio_b = np.empty((0, num_vars)), np.empty(0)
+    referencia = _referencia(c, A, b)
+    for blocos in ((A, b, vazio_A, vazio_b), (vazio_A, vazio_b, A, b)):
+        solucao, max_profit = simplex_method(c, *blocos, modo=modo)
+        assert max_profit == pytest.approx(referencia, rel=1e-9)
+        assert c @ solucao == pytest.approx(-referencia, rel=1e-9)
+        assert (solucao >= -1e-9).all() and (A @ solucao <= b + 1e-9).all()
+
+
+def test_simplex_esparso_igual_ao_linprog():
+    c, A, b = gerar_lp_esparso(300, 500, semente=3)
+    _, max_profit = simplex_method(c, A, b, sp.csr_matrix((0, 500)), np.empty(0), modo="revisado")
+    assert max_profit == pytest.approx(_referencia(c, A, b), rel=1e-9)
+
+
+def test_lote_igual_ao_linprog():
+    c, A, b = gerar_lp(15, 20, semente=7)
+    rng = np.random.default_rng(7)
+    custos = c * rng.uniform(0.5, 1.5, (6, len(c)))
+    lados = b * rng.uniform(0.5, 1.5, (6, len(b)))
+    solucoes, valores, erros = resolver_lote(c, A, b, np.empty((0, 20)), np.empty(0), custos=custos,
+                                             lados_direitos=lados)
+    assert erros == [None] * 6
+    for k in range(6):
+        referencia = _referencia(custos[k], A, lados[k])
+        assert valores[k] == pytest.approx(referencia, rel=1e-9)
+        assert custos[k] @ solucoes[k] == pytest.approx(-referencia, rel=1e-9)
+
+
+def test_modelo_lp_com_sentidos_e_limites_igual_ao_linprog():
+    c, A, b = gerar_lp(12, 10, semente=11)
+    superiores = np.where(np.arange(10) < 5, np.inf, 0.4)
+    igualdade = np.zeros(10)
+    igualdade[:2] = [1.0, -1.0]
+    # Linhas >= com lado direito <= 0 e = com lado direito 0: a origem continua viável
+    A_total = np.vstack([A, -A[:3], igualdade])
+    b_total = np.concatenate([b, -b[:3], [0.0]])
+    modelo = ModeloLP()
+    modelo.adicionar_variaveis(10, c, superiores=superiores)
+    linhas = modelo.adicionar_restricoes(len(b_total), ["<="] * 12 + [">="] * 3 + ["="], b_total)
+    coordenadas = sp.coo_matrix(A_total)
+    modelo.adicionar_coeficientes(linhas[coordenadas.row], coordenadas.col, coordenadas.data)
+    resultado = linprog(-c, A_ub=np.vstack([A, A[:3]]), b_ub=np.concatenate([b, b[:3]]),
+                        A_eq=igualdade[None, :], b_eq=[0.0], bounds=[(0, s if np.isfinite(s) else None)
+                                                                    for s in superiores], method="highs")
+    assert resultado.status == 0
+    for modo in ("tableau", "revisado"):
+        assert modelo.resolver(modo).objetivo == pytest.approx(-resultado.fun, rel=1e-9)
+    assert ModeloLP.de_matriz(c, A, b).resolver().objetivo == pytest.approx(-_referencia(c, A, b), rel=1e-9)
+
+
+# Linhas que a origem não satisfaz (>= com lado direito positivo, = com lado direito não nulo, <= negativo)
+# passam pelas variáveis artificiais de ModeloLP.para_simplex
+@pytest.mark.parametrize("semente", range(12))
+def test_modelo_lp_com_linhas_que_a_origem_nao_satisfaz_igual_ao_linprog(semente):
+    rng = np.random.default_rng(semente)
+    num_restricoes, num_vars = 8, 10
+    A = rng.uniform(0, 3, (num_restricoes, num_vars)) * (rng.random((num_restricoes, num_vars)) > 0.3)
+    viavel = rng.uniform(0.5, 2, num_vars)
+    sentidos = np.array(["<=", ">=", "=", ">="] * 2)
+    folga = rng.uniform(0.1, 1, num_restricoes)
+    b = A @ viavel + np.select([sentidos == "<=", sentidos == ">="], [folga, -folga], 0.0)
+    b[0] = -abs(b[0])
+    A[0] = -np.abs(A[0]) - 0.1
+    inferiores = np.where(np.arange(num_vars) < 3, 0.2, 0.0)
+    c = rng.uniform(1, 3, num_vars)
+    modelo = ModeloLP(maximizar=False)
+    modelo.adicionar_variaveis(num_vars, c, inferiores=inferiores, superiores=10.0)
+    linhas = modelo.adicionar_restricoes(num_restricoes, list(sentidos), b)
+    coordenadas = sp.coo_matrix(A)
+    modelo.adicionar_coeficientes(linhas[coordenadas.row], coordenadas.col, coordenadas.data)
+
+    menores, maiores, iguais = sentidos == "<=", sentidos == ">=", sentidos == "="
+    resultado = linprog(c, A_ub=np.vstack([A[menores], -A[maiores]]), b_ub=np.concatenate([b[menores], -b[maiores]]),
+                        A_eq=A[iguais], b_eq=b[iguais], bounds=list(zip(inferiores, np.full(num_vars, 10.0))),
+                        method="highs")
+    assert resultado.status == 0
+    for modo in ("tableau", "revisado"):
+        solucao = modelo.resolver(modo)
+        assert solucao.objetivo == pytest.approx(resultado.fun, rel=1e-7)
+        assert (A[iguais] @ solucao.valores == pytest.approx(b[iguais], rel=1e-7))
+
+
+def test_modelo_lp_inviavel_e_recusado():
+    modelo = ModeloLP()
+    modelo.adicionar_variaveis(["x", "y"], 1.0)
+    modelo.adicionar_restricao({"x": 1}, ">=", 5)
+    modelo.adicionar_restricao({"x": 1, "y": 1}, "<=", 3)
+    with pytest.raises(ValueError, match="inviável"):
+        modelo.resolver()